@@ -0,0 +1,188 @@
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+# Results on disk (this cache's master_df, app.incremental's sheet results) are
+# pickled rather than written as Parquet: A3 columns such as Documento mix text and
+# numbers, which Parquet cannot round-trip. Pickles run code when loaded, so they are
+# only read from folders written by this application.
+PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def content_hash(input_file_bytes, settings):
+    """Hash the uploaded bytes together with the settings that affect the result"""
+    digest = hashlib.sha256(input_file_bytes)
+    digest.update(repr(sorted(settings.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of consolidation results keyed by :func:`content_hash`.
+
+    The in-process tier is an LRU of the last ``max_entries`` results, holding at
+    most ``max_memory_bytes`` of output bytes plus ``master_df`` memory; a larger
+    result is never kept in memory. When ``cache_dir`` is given, results are also
+    written to disk (one folder per key with the output workbook and the pickled
+    ``master_df``) and the least recently used entries are evicted once the folder
+    grows past ``max_disk_bytes``.
+
+    :meth:`get_file` and :meth:`put_file` work with output files instead of bytes,
+    so a result spilled to disk is cached without reading it into memory.
+
+    ``master_df`` is stored as a pickle (see PICKLE_PROTOCOL), so only point
+    ``cache_dir`` at a folder written by this application.
+    """
+
+    OUTPUT_NAME = "output.xlsx"
+    MASTER_NAME = "master.pkl"
+
+    def __init__(self, max_entries=8, cache_dir=None, max_disk_bytes=1024 ** 3, max_memory_bytes=256 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_sizes = {}
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key):
+        """Return ``(output_bytes, master_df)`` for ``key`` or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        result = self._read_disk(key)
+        if result is not None:
+            self._remember(key, result)
+        return result
+
+    def put(self, key, output_bytes, master_df):
+        """Store a result in memory and, when enabled, on disk"""
+        self._remember(key, (output_bytes, master_df))
+        if self.cache_dir:
+            self._write_disk(key, output_bytes, master_df)
+            self._evict_disk()
+
+    def get_file(self, key, output_path):
+        """Copy the cached output for ``key`` to ``output_path`` and return ``master_df``, or None.
+
+        A result found on disk is copied file to file and not loaded into memory.
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+        if result is not None:
+            output_bytes, master_df = result
+            with open(output_path, "wb") as handle:
+                handle.write(output_bytes)
+            return master_df
+
+        if not self.cache_dir:
+            return None
+        entry = self.cache_dir / key
+        try:
+            master_df = pd.read_pickle(entry / self.MASTER_NAME)
+            shutil.copyfile(entry / self.OUTPUT_NAME, output_path)
+        except (OSError, EOFError):
+            return None
+        os.utime(entry)
+        return master_df
+
+    def put_file(self, key, output_path, master_df):
+        """Store the output file at ``output_path`` with its ``master_df``.
+
+        The file is only read into memory when the result fits the memory tier;
+        otherwise it is just copied to the disk tier, if enabled.
+        """
+        size = self._result_size(os.path.getsize(output_path), master_df)
+        if self.max_entries > 0 and size <= self.max_memory_bytes:
+            with open(output_path, "rb") as handle:
+                self._remember(key, (handle.read(), master_df), size)
+        if self.cache_dir:
+            self._write_disk(key, output_path, master_df)
+            self._evict_disk()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_sizes.clear()
+        if self.cache_dir:
+            for entry in self.cache_dir.iterdir():
+                shutil.rmtree(entry, ignore_errors=True)
+
+    @staticmethod
+    def _result_size(output_size, master_df):
+        return output_size + int(master_df.memory_usage(index=True, deep=True).sum())
+
+    def _remember(self, key, result, size=None):
+        if size is None:
+            size = self._result_size(len(result[0]), result[1])
+        if self.max_entries <= 0 or size > self.max_memory_bytes:
+            return
+        with self._lock:
+            self._memory[key] = result
+            self._memory_sizes[key] = size
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries or sum(self._memory_sizes.values()) > self.max_memory_bytes:
+                evicted, _ = self._memory.popitem(last=False)
+                del self._memory_sizes[evicted]
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        entry = self.cache_dir / key
+        try:
+            output_bytes = (entry / self.OUTPUT_NAME).read_bytes()
+            master_df = pd.read_pickle(entry / self.MASTER_NAME)
+        except (OSError, EOFError):
+            return None
+        # Touch the entry so eviction treats it as recently used
+        os.utime(entry)
+        return output_bytes, master_df
+
+    def _write_disk(self, key, output, master_df):
+        """Write an entry from the output bytes or, for a path, a copy of the output file"""
+        entry = self.cache_dir / key
+        # Write to a temporary folder first so readers never see a partial entry
+        tmp_entry = self.cache_dir / f".{key}.{os.getpid()}.{threading.get_ident()}"
+        tmp_entry.mkdir(parents=True, exist_ok=True)
+        if isinstance(output, bytes):
+            (tmp_entry / self.OUTPUT_NAME).write_bytes(output)
+        else:
+            shutil.copyfile(output, tmp_entry / self.OUTPUT_NAME)
+        master_df.to_pickle(tmp_entry / self.MASTER_NAME, protocol=PICKLE_PROTOCOL)
+        try:
+            os.replace(tmp_entry, entry)
+        except OSError:
+            # Another process stored the same key first
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def _evict_disk(self):
+        entries = []
+        total_size = 0
+        for entry in self.cache_dir.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                # Evicted concurrently by another process
+                continue
+            total_size += size
+
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_disk_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,357 @@
+"""Consolidate many A3 libro diario workbooks from the command line.
+
+Usage:
+    python -m app.cli carpeta/ --output-dir salida/ --workers 4
+    python -m app.cli "diarios/*.xlsx" --report informe.json
+    python -m app.cli grupo/ --merge grupo_consolidado.xlsx
+    python -m app.cli contaplus/ --profile sage
+    python -m app.cli "diarios/*.xlsx" --database diarios.db
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.consolidator import ExcelConsolidator
+from app.incremental import SheetStore
+from app.instrumentation import Instrumentation
+from app.profiles import PROFILE_CHOICES
+
+
+def find_input_files(inputs):
+    """Expand directories, globs and plain paths into a sorted list of Excel files"""
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        candidates = path.iterdir() if path.is_dir() else (Path(p) for p in glob.glob(item))
+        for candidate in candidates:
+            if candidate.suffix.lower() not in (".xlsx", ".xls"):
+                continue
+            # Skip Excel lock files and previous outputs
+            if candidate.name.startswith("~$") or candidate.stem.endswith("_consolidated"):
+                continue
+            files.add(candidate)
+    return sorted(files)
+
+
+def output_path_for(input_path, output_dir=None):
+    """Build the ``<stem>_consolidated.xlsx`` path, next to the input unless ``output_dir`` is given"""
+    input_path = Path(input_path)
+    return Path(output_dir or input_path.parent) / f"{input_path.stem}_consolidated.xlsx"
+
+
+def rows_per_sheet(master_df):
+    """Count MASTER rows per original sheet, in sheet order"""
+    return {
+        str(sheet): int(count)
+        for sheet, count in master_df["Sheet_Origin"].value_counts(sort=False).items()
+    }
+
+
+def consolidate_file(
+    input_path,
+    output_dir=None,
+    streaming=False,
+    preserve_format=False,
+    incremental_store=None,
+    stage_metrics=False,
+    validate=False,
+    profile="auto",
+    database=None,
+    canonical_columns=False,
+):
+    """Consolidate one workbook and return its entry for the summary report.
+
+    With ``stage_metrics`` the entry also lists the instrumentation events under "stages",
+    and with ``validate`` the counts of the asiento checks under "validation". With
+    ``database`` MASTER is loaded into that SQLite file instead of writing a workbook.
+    """
+    input_path = Path(input_path)
+    output_path = output_path_for(input_path, output_dir)
+    result = {
+        "file": str(input_path),
+        "output": None,
+        "status": "ok",
+        "seconds": None,
+        "master_rows": 0,
+        "rows_per_sheet": {},
+        "total_rows_dropped": {},
+        "master_memory_bytes": {},
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        file_bytes = input_path.read_bytes()
+        instrumentation = Instrumentation() if stage_metrics else None
+        consolidator = ExcelConsolidator(
+            sheet_store=SheetStore(incremental_store) if incremental_store else None,
+            instrumentation=instrumentation,
+            validate=validate,
+            profile=profile,
+            canonical_columns=canonical_columns,
+        )
+        messages = []
+
+        if database:
+            # The full path identifies the file, so same-named files of other folders
+            # (2020/diario.xlsx, 2021/diario.xlsx) do not replace each other's rows
+            master_df = consolidator.export_to_database(
+                file_bytes, input_path.name, database, progress_callback=messages.append,
+                file_origin=str(input_path.resolve()),
+            )
+            if master_df is not None:
+                result["output"] = str(database)
+                result["master_rows"] = len(master_df)
+                result["rows_per_sheet"] = rows_per_sheet(master_df)
+        elif preserve_format:
+            master_df = consolidator.write_package(
+                file_bytes, input_path.name, output_path, progress_callback=messages.append
+            )
+            if master_df is not None:
+                result["output"] = str(output_path)
+                result["master_rows"] = len(master_df)
+                result["rows_per_sheet"] = rows_per_sheet(master_df)
+        elif streaming:
+            master_rows = consolidator.stream_excel_file(
+                file_bytes, input_path.name, output_path, progress_callback=messages.append
+            )
+            if master_rows:
+                result["output"] = str(output_path)
+                result["master_rows"] = master_rows
+            else:
+                output_path.unlink()
+        else:
+            output_workbook, master_df = consolidator.process_excel_file(
+                file_bytes, input_path.name, progress_callback=messages.append
+            )
+            if output_workbook is not None:
+                output_workbook.save(output_path)
+                result["output"] = str(output_path)
+                result["master_rows"] = len(master_df)
+                result["rows_per_sheet"] = rows_per_sheet(master_df)
+
+        result["total_rows_dropped"] = dict(consolidator.total_rows_dropped)
+        result["master_memory_bytes"] = dict(consolidator.master_memory_bytes)
+        if instrumentation is not None:
+            result["stages"] = instrumentation.events
+        if consolidator.validation is not None:
+            result["validation"] = consolidator.validation.summary()
+        if not result["master_rows"]:
+            result["status"] = "empty"
+            result["error"] = "¡No se encontraron datos válidos en ninguna hoja!"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def consolidate_files(
+    files,
+    output_dir=None,
+    workers=1,
+    streaming=False,
+    preserve_format=False,
+    incremental_store=None,
+    progress_callback=None,
+    stage_metrics=False,
+    validate=False,
+    profile="auto",
+    database=None,
+    canonical_columns=False,
+):
+    """Consolidate ``files`` with up to ``workers`` processes, returning results in input order"""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if workers <= 1 or len(files) <= 1:
+        results = []
+        for path in files:
+            result = consolidate_file(
+                path, output_dir, streaming, preserve_format, incremental_store, stage_metrics, validate,
+                profile, database, canonical_columns,
+            )
+            if progress_callback:
+                progress_callback(result)
+            results.append(result)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+        futures = [
+            executor.submit(
+                consolidate_file,
+                path, output_dir, streaming, preserve_format, incremental_store, stage_metrics, validate,
+                profile, database, canonical_columns,
+            )
+            for path in files
+        ]
+        results = []
+        for future in futures:
+            result = future.result()
+            if progress_callback:
+                progress_callback(result)
+            results.append(result)
+        return results
+
+
+def merge_files(files, output, workers=1, stage_metrics=False, profile="auto", canonical_columns=False):
+    """Merge every workbook into a single MASTER at ``output`` and return the summary report.
+
+    The output format follows the extension of ``output`` (.xlsx or .csv).
+    """
+    output = Path(output)
+    instrumentation = Instrumentation() if stage_metrics else None
+    consolidator = ExcelConsolidator(
+        instrumentation=instrumentation, profile=profile, canonical_columns=canonical_columns
+    )
+    start = time.perf_counter()
+    summary = consolidator.merge_files(
+        files, output, fmt=output.suffix.lower().lstrip("."), workers=workers, progress_callback=print
+    )
+    report = {
+        "files": len(files),
+        "output": str(output) if summary["master_rows"] else None,
+        "seconds": round(time.perf_counter() - start, 3),
+        **summary,
+    }
+    if instrumentation is not None:
+        report["stages"] = instrumentation.events
+    return report
+
+
+def print_result(result):
+    if result["status"] == "ok":
+        print(f"✅ {result['file']}: {result['master_rows']} entradas en {result['seconds']:.1f}s")
+        validation = result.get("validation")
+        if validation:
+            print(
+                f"   Validación: {validation['unbalanced_asientos']} asientos descuadrados, "
+                f"{validation['cross_sheet_asientos']} en varias hojas, "
+                f"{validation['date_mismatch_rows']} filas con fecha fuera de su mes"
+            )
+            if validation["skipped_checks"]:
+                print(f"   Comprobaciones omitidas: {', '.join(validation['skipped_checks'])}")
+    else:
+        print(f"❌ {result['file']}: {result['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Consolida libros diarios en formato A3 sin interfaz web"
+    )
+    parser.add_argument("inputs", nargs="+", help="Carpetas, patrones glob o archivos Excel")
+    parser.add_argument(
+        "--output-dir", default=None,
+        help="Carpeta de salida (por defecto, la carpeta de cada archivo)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Número de archivos procesados en paralelo",
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="Usa el modo streaming (memoria acotada, solo .xlsx)",
+    )
+    parser.add_argument(
+        "--preserve-format", action="store_true",
+        help="Copia las hojas originales sin modificarlas y solo genera MASTER (solo .xlsx)",
+    )
+    parser.add_argument(
+        "--incremental-store", default=None,
+        help="Carpeta donde guardar los resultados por hoja; en ejecuciones posteriores "
+        "solo se procesan las hojas que han cambiado",
+    )
+    parser.add_argument(
+        "--merge", default=None, metavar="SALIDA",
+        help="Une las entradas de todos los archivos en una única hoja MASTER guardada en SALIDA "
+        "(.xlsx o .csv), con la columna File_Origin",
+    )
+    parser.add_argument(
+        "--database", default=None, metavar="RUTA",
+        help="Carga MASTER de cada archivo en la base de datos SQLite RUTA en lugar de generar "
+        "un Excel; las hojas ya cargadas del mismo archivo se reemplazan",
+    )
+    parser.add_argument(
+        "--stage-metrics", action="store_true",
+        help="Añade al informe el tiempo, las filas y la memoria de cada etapa por hoja",
+    )
+    parser.add_argument(
+        "--validate", action="store_true",
+        help="Comprueba el cuadre de cada asiento, los asientos repetidos en varias hojas y las "
+        "fechas fuera del mes de su hoja; añade la hoja VALIDATION y los recuentos al informe "
+        "(no disponible con --streaming; con --preserve-format solo se añaden los recuentos, "
+        "sin hoja VALIDATION)",
+    )
+    parser.add_argument(
+        "--profile", choices=PROFILE_CHOICES, default="auto",
+        help="Formato de las columnas: a3, sage (Sage / ContaPlus) o auto para detectarlo en "
+        "cada hoja (por defecto)",
+    )
+    parser.add_argument(
+        "--canonical-columns", action="store_true",
+        help="Renombra las columnas reconocidas a los nombres de A3 (Asto. a Asiento, Debe a "
+        "Importe debe...), para que un lote con varios formatos tenga las mismas columnas en MASTER",
+    )
+    parser.add_argument(
+        "--report", default=None,
+        help="Ruta del informe JSON (por defecto, consolidation_report.json en la carpeta de salida "
+        "o en la carpeta actual)",
+    )
+    args = parser.parse_args(argv)
+
+    files = find_input_files(args.inputs)
+    if not files:
+        print("No se encontraron archivos Excel")
+        return 1
+
+    if args.merge:
+        if Path(args.merge).suffix.lower() not in (".xlsx", ".csv"):
+            print("La salida de --merge debe ser un archivo .xlsx o .csv")
+            return 1
+        print(f"Uniendo {len(files)} archivos con {args.workers} procesos...")
+        report = merge_files(
+            files, args.merge, workers=args.workers, stage_metrics=args.stage_metrics, profile=args.profile,
+            canonical_columns=args.canonical_columns,
+        )
+        report_path = Path(args.report or Path(args.merge).with_name("consolidation_report.json"))
+        report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+        print(
+            f"{report['master_rows']} entradas de {len(report['rows_per_file'])} archivos, "
+            f"{len(report['errors'])} con errores. Informe: {report_path}"
+        )
+        return 1 if report["errors"] else 0
+
+    print(f"Consolidando {len(files)} archivos con {args.workers} procesos...")
+
+    start = time.perf_counter()
+    results = consolidate_files(
+        files, args.output_dir, workers=args.workers, streaming=args.streaming,
+        preserve_format=args.preserve_format, incremental_store=args.incremental_store,
+        progress_callback=print_result, stage_metrics=args.stage_metrics, validate=args.validate,
+        profile=args.profile, database=args.database, canonical_columns=args.canonical_columns,
+    )
+    failures = [r for r in results if r["status"] != "ok"]
+
+    report = {
+        "files": len(results),
+        "succeeded": len(results) - len(failures),
+        "failed": len(failures),
+        "seconds": round(time.perf_counter() - start, 3),
+        "results": results,
+    }
+    report_path = Path(args.report or Path(args.output_dir or ".") / "consolidation_report.json")
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print(
+        f"{report['succeeded']} correctos, {report['failed']} con errores "
+        f"en {report['seconds']:.1f}s. Informe: {report_path}"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,150 +1,1266 @@
+import numpy as np
 import pandas as pd
 import openpyxl
 from openpyxl.utils.dataframe import dataframe_to_rows
+from pandas.io.parsers import TextParser
+from pandas._libs.parsers import STR_NA_VALUES
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import copy
+import importlib.util
+import itertools
+from pathlib import Path
 import io
+import os
+import re
+import tempfile
 from typing import Optional, List
 
+from app.cache import content_hash
+from app.database import write_master_db
+from app.exporters import (
+    compact_master_dtypes,
+    memory_usage_bytes,
+    normalize_master_dtypes,
+    open_text_output,
+    write_csv_rows,
+    write_master,
+)
+from app.formats import MERGE_FORMATS
+from app.incremental import sheet_fingerprints
+from app.profiles import best_profile, get_profiles
+from app.validation import validate_master
+from app.xlsx_package import insert_master_sheet
+
+
+def _is_null_cell(value):
+    """Mirror pandas' default NA handling for a single cell read with openpyxl"""
+    return value is None or (isinstance(value, str) and value in STR_NA_VALUES)
+
+
+def _excel_value(value):
+    """Mirror pandas' cell conversion: integral floats are read as ints"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _master_rows(master_df, header=False):
+    """Rows of ``master_df`` ready for openpyxl, like ``dataframe_to_rows``.
+
+    Nullable integer columns hold pd.NA, which openpyxl rejects; it is written as the
+    NaN the column had before the dtype compaction.
+    """
+    nullable = [
+        idx for idx, dtype in enumerate(master_df.dtypes)
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.na_value is pd.NA
+    ]
+    for r in dataframe_to_rows(master_df, index=False, header=header):
+        for idx in nullable:
+            if r[idx] is pd.NA:
+                r[idx] = np.nan
+        yield r
+
+
+def _format_size(num_bytes):
+    if num_bytes < 1024 ** 2:
+        return f"{num_bytes / 1024:.1f} KB"
+    return f"{num_bytes / 1024 ** 2:.1f} MB"
+
+
+def _validation_message(validation):
+    summary = validation.summary()
+    if validation.ok:
+        return f"✅ Validación: los {summary['asientos']} asientos cuadran, sin duplicados entre hojas ni fechas fuera de su mes"
+    message = (
+        f"⚠️ Validación: {summary['unbalanced_asientos']} asientos descuadrados, "
+        f"{summary['cross_sheet_asientos']} asientos en varias hojas y "
+        f"{summary['date_mismatch_rows']} filas con fecha fuera del mes de su hoja"
+    )
+    if validation.skipped:
+        message += f". No se pudo comprobar: {'; '.join(validation.skipped_labels())}"
+    return message
+
+
+# Rows per worksheet allowed by Excel, header included
+EXCEL_MAX_ROWS = 1_048_576
+
+DEFAULT_TOTAL_KEYWORDS = ["total", "suma", "suman", "totales", "resumen"]
+
+# Rows matched first when the whole sheet is searched for the header
+HEADER_FIRST_WINDOW = 100
+
+# Data rows per window read by iter_sheet_chunks when chunk_rows is not set
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Input readers: "calamine" (Rust, much faster, reads .xlsx and .xls), "pandas" (the
+# pandas default: openpyxl for .xlsx, xlrd for .xls) and "auto" (calamine when available)
+READ_ENGINES = ("auto", "calamine", "pandas")
+
+
+def calamine_available():
+    """Whether pandas can read workbooks with python-calamine (pandas >= 2.2)"""
+    pandas_version = tuple(int(part) for part in re.findall(r"\d+", pd.__version__)[:2])
+    return pandas_version >= (2, 2) and importlib.util.find_spec("python_calamine") is not None
+
+
+# Returned by ExcelConsolidator._stage when instrumentation is disabled: entering it
+# does no timing or memory reads, and writes to the shared event dict are discarded
+_DISABLED_STAGE = nullcontext({})
+
 
 class ExcelConsolidator:
-    def __init__(self):
+    def __init__(
+        self,
+        header_search_rows=None,
+        workers=1,
+        total_keywords=None,
+        total_columns=None,
+        cache=None,
+        copy_original_sheets=True,
+        output_engine="openpyxl",
+        sheet_store=None,
+        instrumentation=None,
+        compact_dtypes=True,
+        read_engine="auto",
+        validate=False,
+        chunk_rows=None,
+        profile="auto",
+        canonical_columns=False,
+    ):
         self.input_file = None
         self.output_file = None
+        # Number of processes used to parse and filter sheets; 1 processes them serially
+        self.workers = workers
+        # Only the first rows of a sheet are searched for the header; None searches them all
+        # (the first HEADER_FIRST_WINDOW rows first, as headers are almost always there)
+        self.header_search_rows = header_search_rows
+        # Rows containing any of these words are total/summary rows and are dropped.
+        # The pattern is compiled once and reused for every sheet.
+        self.total_keywords = list(total_keywords or DEFAULT_TOTAL_KEYWORDS)
+        self.total_pattern = re.compile(
+            "|".join(re.escape(keyword) for keyword in self.total_keywords), re.IGNORECASE
+        )
+        # Columns checked for total keywords; None checks every text (object) column
+        self.total_columns = total_columns
+        # Total/summary rows dropped per sheet in the last processed file
+        self.total_rows_dropped = {}
+        # Optional app.cache.ResultCache used by consolidate()
+        self.cache = cache
+        # When False the output workbook only contains MASTER
+        self.copy_original_sheets = copy_original_sheets
+        # How consolidate() builds the .xlsx: "openpyxl" rewrites every sheet,
+        # "package" copies the original sheets at the zip level and only writes MASTER
+        if output_engine not in ("openpyxl", "package"):
+            raise ValueError(f"Motor de salida no soportado: {output_engine}")
+        self.output_engine = output_engine
+        # Optional app.incremental.SheetStore: unchanged sheets reuse their stored rows
+        self.sheet_store = sheet_store
+        # Optional app.instrumentation.Instrumentation receiving per-stage events
+        self.instrumentation = instrumentation
+        # Convert master_df to compact dtypes (categoricals, nullable ints) after the
+        # concat; the MASTER sheet written from it stays identical
+        self.compact_dtypes = compact_dtypes
+        # Deep memory of master_df before/after the dtype compaction for the last file
+        self.master_memory_bytes = {}
+        # Reader used to parse the input sheets (see READ_ENGINES); every engine yields
+        # the same raw frames, so it is not part of the cache key
+        if read_engine not in READ_ENGINES:
+            raise ValueError(f"Motor de lectura no soportado: {read_engine}")
+        if read_engine == "calamine" and not calamine_available():
+            raise ImportError(
+                "El motor de lectura calamine requiere python-calamine y pandas >= 2.2 "
+                "(pip install python-calamine)"
+            )
+        self.read_engine = read_engine
+        # Check the balance, cross-sheet duplicates and dates of every Asiento after the
+        # concat; the report is kept in self.validation and written as a VALIDATION sheet
+        self.validate = validate
+        self.validation = None
+        # Read .xlsx sheets in windows of this many data rows instead of parsing them
+        # whole (see iter_sheet_chunks). Only used where the raw sheets are not needed:
+        # extract_master_df/export_master/write_package, and process_excel_file when
+        # copy_original_sheets is False. .xls files, and consolidators with a sheet_store
+        # or workers > 1 (both work on whole sheets), read whole sheets as before.
+        # The result is the same, so not in the cache key
+        if chunk_rows is not None and chunk_rows < 1:
+            raise ValueError(f"chunk_rows debe ser un entero positivo: {chunk_rows}")
+        self.chunk_rows = chunk_rows
+        # Column-mapping profile (app.profiles): "auto" tries every known export format
+        # on each sheet and keeps the one that fits its header best, a name ("a3",
+        # "sage") or a ColumnProfile forces one
+        self.profile = profile
+        self.profiles = get_profiles(profile)
+        # Rename the resolved columns to the A3 names of app.profiles.CANONICAL_COLUMNS
+        # ("Asto." to "Asiento", "Debe" to "Importe debe"...), so a batch mixing export
+        # formats gets a single set of MASTER columns. Off by default: MASTER keeps the
+        # headers of the source sheets
+        self.canonical_columns = canonical_columns
+
+    def __getstate__(self):
+        # The cache holds locks and large buffers; worker processes never need it
+        state = self.__dict__.copy()
+        state["cache"] = None
+        return state
+
+    def _stage(self, stage, sheet=None, rows_in=None):
+        """Context manager timing one pipeline stage, a no-op without instrumentation"""
+        if self.instrumentation is None:
+            return _DISABLED_STAGE
+        return self.instrumentation.stage(stage, sheet, rows_in)
+
+    def extraction_settings(self):
+        """Settings that change which rows are extracted from a sheet"""
+        return {
+            "header_search_rows": self.header_search_rows,
+            "total_keywords": tuple(self.total_keywords),
+            "total_columns": None if self.total_columns is None else tuple(self.total_columns),
+            "profiles": tuple(profile.settings() for profile in self.profiles),
+            "canonical_columns": self.canonical_columns,
+        }
+
+    def cache_settings(self):
+        """Settings that change the consolidation result, used in the cache key"""
+        return dict(
+            self.extraction_settings(),
+            copy_original_sheets=self.copy_original_sheets,
+            output_engine=self.output_engine,
+            compact_dtypes=self.compact_dtypes,
+            validate=self.validate,
+        )
 
     def find_header_row(self, df_raw):
-        """Find the row that contains 'Fecha' and 'Asiento' headers"""
-        for idx, row in df_raw.iterrows():
-            row_str = [str(val).lower() if pd.notna(val) else "" for val in row]
-            has_fecha = any("fecha" in val for val in row_str)
-            has_asiento = any("asiento" in val for val in row_str)
-
-            if has_fecha and has_asiento:
-                return idx
-        return None
+        """Find the first row with a header cell for every required column of a profile.
+
+        For A3 that is a row containing 'Fecha' and 'Asiento'. The match is computed
+        column by column with vectorized string operations over the first
+        ``header_search_rows`` rows instead of iterating row by row. Without a limit
+        the first HEADER_FIRST_WINDOW rows are matched first and the rest of the
+        sheet only when they have no header, so the result is the same as a full scan.
+        """
+        if self.header_search_rows is not None:
+            return self._find_header_in(df_raw.head(self.header_search_rows))
+        header_row = self._find_header_in(df_raw.head(HEADER_FIRST_WINDOW))
+        if header_row is None and len(df_raw) > HEADER_FIRST_WINDOW:
+            header_row = self._find_header_in(df_raw.iloc[HEADER_FIRST_WINDOW:])
+        return header_row
+
+    def _find_header_in(self, window):
+        # The text of every column is built once and matched by each profile
+        texts = [window[col].where(window[col].notna(), "").astype(str) for col in window.columns]
+        is_header = np.zeros(len(window), dtype=bool)
+        found = {}
+        for profile in self.profiles:
+            is_header |= profile.header_mask(texts, found)
+
+        matches = np.flatnonzero(is_header)
+        if len(matches) == 0:
+            return None
+        return window.index[matches[0]]
+
+    def open_excel_file(self, input_file_bytes):
+        """Open the uploaded workbook with the configured read engine"""
+        use_calamine = self.read_engine == "calamine" or (
+            self.read_engine == "auto" and calamine_available()
+        )
+        return pd.ExcelFile(io.BytesIO(input_file_bytes), engine="calamine" if use_calamine else None)
+
+    def load_sheet(self, excel_file, sheet_name):
+        """Parse a sheet once, without headers, from an already open ExcelFile"""
+        return excel_file.parse(sheet_name=sheet_name, header=None)
+
+    def frame_from_raw(self, df_raw, header_row):
+        """Build the headered frame from the raw sheet without parsing the workbook again.
+
+        Uses the same TextParser that ``pd.read_excel`` runs internally, so column
+        names and inferred dtypes match ``pd.read_excel(..., header=header_row)``.
+        """
+        rows = df_raw.values.tolist()
+        # The Excel readers give empty cells as "", which TextParser names "Unnamed: n"
+        rows[header_row] = ["" if pd.isna(val) else val for val in rows[header_row]]
+        return TextParser(rows, header=header_row).read()
+
+    def process_sheet(self, df_raw, sheet_name):
+        """Extract the valid entries of one raw sheet.
+
+        Returns ``(valid_rows, message, total_rows_dropped)`` where ``valid_rows`` is None
+        when the sheet has no usable entries, ``message`` is the progress message for the
+        sheet and ``total_rows_dropped`` counts the total/summary rows filtered out.
+        """
+        # Find the header row (look for "Fecha" and "Asiento" or the profile's synonyms)
+        with self._stage("header", sheet_name, len(df_raw)):
+            header_row = self.find_header_row(df_raw)
+
+        if header_row is None:
+            return None, f"⚠️ Fila de encabezados no encontrada en {sheet_name}", 0
+
+        # Derive the headered frame from the raw sheet already in memory
+        with self._stage("frame", sheet_name, len(df_raw)) as event:
+            df = self.frame_from_raw(df_raw, header_row)
+            event["rows_out"] = len(df)
+
+        mapping = self.resolve_columns(df.columns)
+
+        if not mapping.complete:
+            return None, f"⚠️ Columnas requeridas no encontradas en {sheet_name}", 0
+
+        if self.canonical_columns:
+            # Same column names in MASTER whichever program exported the sheet
+            renames, mapping = mapping.canonical(df.columns)
+            if renames:
+                df.columns = [renames.get(col, col) for col in df.columns]
+
+        valid_rows, total_rows_dropped = self.filter_valid_rows(
+            df, mapping.fecha_col, mapping.asiento_col, sheet_name, mapping.total_columns
+        )
+
+        if valid_rows.empty:
+            return (
+                None,
+                f"⚠️ No se encontraron entradas válidas en {sheet_name}",
+                total_rows_dropped,
+            )
+
+        # Add sheet name as a column for identification
+        valid_rows = valid_rows.copy()
+        mapping.profile.convert_dtypes(valid_rows, mapping)
+        valid_rows["Sheet_Origin"] = sheet_name
+        return (
+            valid_rows,
+            f"✅ Se encontraron {len(valid_rows)} entradas válidas en {sheet_name}",
+            total_rows_dropped,
+        )
+
+    def resolve_columns(self, columns):
+        """Map the column roles of one sheet with the profile that fits its header best.
+
+        With a single profile, or when no profile finds every required column, the
+        returned mapping may be incomplete (see ``ColumnMapping.complete``).
+        """
+        profile = best_profile(self.profiles, columns) or self.profiles[0]
+        return profile.resolve(columns)
+
+    def find_required_columns(self, df):
+        """Return the ``(fecha_col, asiento_col)`` names of a headered frame (None if missing)"""
+        mapping = self.resolve_columns(df.columns)
+        return mapping.fecha_col, mapping.asiento_col
+
+    def filter_valid_rows(self, df, fecha_col, asiento_col, sheet_name=None, total_columns=None):
+        """Forward fill Fecha/Asiento and keep the rows that are real entries.
+
+        Returns ``(valid_rows, total_rows_dropped)``. ``df`` is modified in place by
+        the forward fill. ``sheet_name`` only labels the instrumentation events and
+        ``total_columns`` are the profile's columns checked for totals (see
+        filter_total_rows).
+        """
+        # Forward fill fecha and asiento for continuation rows
+        with self._stage("ffill", sheet_name, len(df)) as event:
+            df[fecha_col] = df[fecha_col].ffill()
+            df[asiento_col] = df[asiento_col].ffill()
+            event["rows_out"] = len(df)
+
+        with self._stage("filters", sheet_name, len(df)) as event:
+            valid_rows, total_rows_dropped = self._filter_entries(df, fecha_col, asiento_col, total_columns)
+            event["rows_out"] = len(valid_rows)
+        return valid_rows, total_rows_dropped
+
+    def _filter_entries(self, df, fecha_col, asiento_col, total_columns=None):
+        # Remove completely empty rows
+        valid_rows = df.dropna(how="all")
+
+        # Filter rows that have meaningful data beyond just fecha/asiento
+        # A valid entry should have at least one non-null value in other important columns
+        important_cols = [col for col in valid_rows.columns 
+                        if col not in [fecha_col, asiento_col] and 
+                        col not in ['Sheet_Origin']]
+        
+        # Keep rows that have at least one non-null value in important columns
+        meaningful_data_mask = valid_rows[important_cols].notna().any(axis=1)
+        valid_rows = valid_rows[meaningful_data_mask]
+
+        # Filter out total/summary rows (usually at the end)
+        return self.filter_total_rows(valid_rows, total_columns)
+
+    def _checked_total_columns(self, total_columns=None):
+        """Columns checked for totals: the configured ones, else the profile's (None: every text column)"""
+        return self.total_columns if self.total_columns is not None else total_columns
+
+    def filter_total_rows(self, df, total_columns=None):
+        """Drop rows whose text columns contain a total keyword.
+
+        The checked columns are the configured ``total_columns``, else the given
+        profile columns, else every text (object) column. They are joined into one
+        string per row and matched with the precompiled pattern in a single
+        vectorized pass. Returns ``(df, rows_dropped)``.
+        """
+        total_columns = self._checked_total_columns(total_columns)
+        if total_columns is None:
+            text_cols = [col for col in df.columns if df[col].dtype == "object"]
+        else:
+            text_cols = [col for col in total_columns if col in df.columns]
+
+        if not text_cols or df.empty:
+            return df, 0
+
+        # The unit separator never appears in the keywords, so matches cannot span columns
+        text = df[text_cols[0]].astype(str)
+        for col in text_cols[1:]:
+            text = text + "\x1f" + df[col].astype(str)
+
+        is_total = text.str.contains(self.total_pattern, na=False).to_numpy()
+        return df[~is_total], int(is_total.sum())
+
+    def _iter_processed_sheets(self, input_file_bytes, excel_file, progress_callback=None, need_raw=True):
+        """Yield ``(sheet_name, df_raw, valid_rows)`` in workbook order.
+
+        With ``workers > 1`` the sheets are parsed and filtered in a process pool; the
+        results and the progress messages are still delivered here, on the calling
+        thread, in the original sheet order.
+
+        With a ``sheet_store`` configured, sheets whose fingerprint is already stored
+        reuse their previous result. When ``need_raw`` is False those sheets are not
+        even parsed and ``df_raw`` is None for them.
+        """
+        sheet_names = excel_file.sheet_names
+
+        fingerprints = {}
+        stored = {}
+        if self.sheet_store is not None:
+            fingerprints = sheet_fingerprints(input_file_bytes, self.extraction_settings())
+            for sheet_name in sheet_names:
+                if fingerprints.get(sheet_name):
+                    stored[sheet_name] = self.sheet_store.get(fingerprints[sheet_name])
+        pending = [name for name in sheet_names if stored.get(name) is None]
+
+        def results_in_pool():
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(pending)),
+                initializer=_init_sheet_worker,
+                initargs=(input_file_bytes, self),
+            ) as executor:
+                futures = {
+                    name: executor.submit(_process_sheet_in_worker, name, need_raw) for name in pending
+                }
+                for sheet_name in sheet_names:
+                    if sheet_name in futures:
+                        # Pop the future so each raw sheet is released once it has been consumed
+                        *result, events = futures.pop(sheet_name).result()
+                        # Events recorded in the worker process are replayed here, in sheet order
+                        for event in events or ():
+                            self.instrumentation.record(event)
+                        yield sheet_name, tuple(result)
+                    else:
+                        yield sheet_name, None
+
+        def results_in_order():
+            for sheet_name in sheet_names:
+                if sheet_name not in pending:
+                    yield sheet_name, None
+                    continue
+                # Read the sheet without headers first to find the data structure
+                df_raw = self._load_sheet_timed(excel_file, sheet_name)
+                result = self.process_sheet(df_raw, sheet_name)
+                yield sheet_name, (df_raw if need_raw else None,) + result
+
+        if self.workers > 1 and len(pending) > 1:
+            results = results_in_pool()
+        else:
+            results = results_in_order()
+
+        for sheet_name, result in results:
+            if progress_callback:
+                progress_callback(f"Procesando hoja: **{sheet_name}**")
+
+            if result is None:
+                # Unchanged sheet: reuse the stored result
+                valid_rows, message, total_rows_dropped = stored[sheet_name]
+                message = f"{message} (sin cambios)"
+                df_raw = self._load_sheet_timed(excel_file, sheet_name) if need_raw else None
+            else:
+                df_raw, valid_rows, message, total_rows_dropped = result
+                if fingerprints.get(sheet_name):
+                    self.sheet_store.put(
+                        fingerprints[sheet_name], (valid_rows, message, total_rows_dropped)
+                    )
+
+            self.total_rows_dropped[sheet_name] = total_rows_dropped
+            if progress_callback:
+                progress_callback(message)
+            yield sheet_name, df_raw, valid_rows
+
+    def _iter_sheet_results(self, input_file_bytes, input_filename, progress_callback=None, need_raw=True):
+        """Yield ``(sheet_name, df_raw, valid_rows)``, in windows when ``chunk_rows`` is set.
+
+        Chunked reading is only used when the raw sheets are not needed; a sheet may
+        then be yielded once per window, always with ``df_raw`` None.
+        """
+        if self._reads_in_chunks(input_file_bytes, need_raw):
+            for sheet_name, valid_rows in self.iter_sheet_chunks(
+                input_file_bytes, input_filename, progress_callback
+            ):
+                yield sheet_name, None, valid_rows
+            return
+
+        excel_file = self.open_excel_file(input_file_bytes)
+        yield from self._iter_processed_sheets(input_file_bytes, excel_file, progress_callback, need_raw)
+
+    def _reads_in_chunks(self, input_file_bytes, need_raw):
+        """Whether chunk_rows applies: an .xlsx file, no raw sheets, no sheet store nor workers"""
+        return (
+            bool(self.chunk_rows)
+            and not need_raw
+            and self.sheet_store is None
+            and self.workers <= 1
+            and input_file_bytes[:4] == b"PK\x03\x04"
+        )
+
+    def _load_sheet_timed(self, excel_file, sheet_name):
+        with self._stage("parse", sheet_name) as event:
+            df_raw = self.load_sheet(excel_file, sheet_name)
+            event["rows_out"] = len(df_raw)
+        return df_raw
+
+    def copy_sheet(self, output_workbook, sheet_name, df_raw):
+        """Copy a raw sheet, cell by cell, into the output workbook"""
+        ws = output_workbook.create_sheet(title=sheet_name)
+        for r in dataframe_to_rows(df_raw, index=False, header=False):
+            ws.append(r)
+
+    def add_master_sheet(self, output_workbook, master_df):
+        """Write ``master_df`` as the first sheet, MASTER, of the output workbook"""
+        master_ws = output_workbook.create_sheet(title="MASTER")
+        for r in _master_rows(master_df, header=True):
+            master_ws.append(r)
+
+        # Move master sheet to the beginning
+        output_workbook.move_sheet(
+            "MASTER", offset=-len(output_workbook.sheetnames) + 1
+        )
+
+    def add_validation_sheet(self, output_workbook, validation):
+        """Write the validation summary and detail tables as a VALIDATION sheet after MASTER"""
+        validation_ws = output_workbook.create_sheet(title="VALIDATION", index=1)
+        validation_ws.append(["Comprobación", "Resultado"])
+        validation_ws.append(["Asientos", validation.asientos])
+        for title, details in validation.sections():
+            validation_ws.append([title, len(details)])
+        if validation.skipped:
+            validation_ws.append(["Comprobaciones omitidas", ", ".join(validation.skipped)])
+
+        for title, details in validation.sections():
+            if details.empty:
+                continue
+            validation_ws.append([])
+            validation_ws.append([title])
+            for r in dataframe_to_rows(details, index=False, header=True):
+                validation_ws.append(r)
 
     def process_excel_file(self, input_file_bytes, input_filename, progress_callback=None):
         """Process the uploaded Excel file and return the consolidated workbook"""
 
-        # Create Excel file from bytes
-        excel_file = pd.ExcelFile(io.BytesIO(input_file_bytes))
-
         # Create a new workbook for output
         output_workbook = openpyxl.Workbook()
         output_workbook.remove(output_workbook.active)  # Remove default sheet
 
         master_data = []
+        self.total_rows_dropped = {}
 
         # Process each sheet
-        for sheet_name in excel_file.sheet_names:
+        for sheet_name, df_raw, valid_rows in self._iter_sheet_results(
+            input_file_bytes, input_filename, progress_callback, need_raw=self.copy_original_sheets
+        ):
+            # Copy original sheet to output
+            if self.copy_original_sheets:
+                with self._stage("workbook", sheet_name, len(df_raw)):
+                    self.copy_sheet(output_workbook, sheet_name, df_raw)
+
+            if valid_rows is not None:
+                master_data.append(valid_rows)
+
+        # Create master sheet
+        if master_data:
             if progress_callback:
-                progress_callback(f"Procesando hoja: **{sheet_name}**")
+                progress_callback("Creando hoja maestra...")
+
+            master_df = self._build_master(master_data, progress_callback)
+            del master_data
 
-            # Read the sheet without headers first to find the data structure
-            df_raw = pd.read_excel(
-                io.BytesIO(input_file_bytes), sheet_name=sheet_name, header=None
+            # Create master sheet
+            with self._stage("workbook", "MASTER", len(master_df)):
+                self.add_master_sheet(output_workbook, master_df)
+            if self.validation is not None:
+                with self._stage("workbook", "VALIDATION"):
+                    self.add_validation_sheet(output_workbook, self.validation)
+
+            if progress_callback:
+                progress_callback(f"✅ Hoja maestra creada con {len(master_df)} entradas totales")
+
+            return output_workbook, master_df
+        else:
+            if progress_callback:
+                progress_callback("¡No se encontraron datos válidos en ninguna hoja!")
+            return None, None
+
+    def extract_master_df(self, input_file_bytes, input_filename, progress_callback=None):
+        """Return only the consolidated ``master_df`` (or None), without building a workbook"""
+        self.total_rows_dropped = {}
+
+        master_data = [
+            valid_rows
+            for _, _, valid_rows in self._iter_sheet_results(
+                input_file_bytes, input_filename, progress_callback, need_raw=False
             )
+            if valid_rows is not None
+        ]
+        if not master_data:
+            if progress_callback:
+                progress_callback("¡No se encontraron datos válidos en ninguna hoja!")
+            return None
 
-            # Copy original sheet to output
-            ws = output_workbook.create_sheet(title=sheet_name)
-            for r in dataframe_to_rows(df_raw, index=False, header=False):
-                ws.append(r)
+        master_df = self._build_master(master_data, progress_callback)
+        if progress_callback:
+            progress_callback(f"✅ Datos maestros extraídos con {len(master_df)} entradas totales")
+        return master_df
 
-            # Find the header row (look for "Fecha" and "Asiento")
-            header_row = self.find_header_row(df_raw)
+    def _build_master(self, master_data, progress_callback=None):
+        """Concatenate the valid rows of every sheet and compact the result's dtypes"""
+        with self._stage("concat", rows_in=sum(len(df) for df in master_data)) as event:
+            master_df = pd.concat(master_data, ignore_index=True)
+            event["rows_out"] = len(master_df)
 
-            if header_row is not None:
-                # Read the sheet again with the correct header row
-                df = pd.read_excel(
-                    io.BytesIO(input_file_bytes),
-                    sheet_name=sheet_name,
-                    header=header_row,
+        self.master_memory_bytes = {}
+        if self.compact_dtypes:
+            with self._stage("dtypes", rows_in=len(master_df)) as event:
+                before = memory_usage_bytes(master_df)
+                master_df = compact_master_dtypes(master_df)
+                after = memory_usage_bytes(master_df)
+                event["rows_out"] = len(master_df)
+            self.master_memory_bytes = {"before": before, "after": after}
+            if progress_callback:
+                progress_callback(
+                    f"Memoria de los datos maestros: {_format_size(before)} → "
+                    f"{_format_size(after)} con tipos compactos"
                 )
 
-                # Filter rows that have values in both Fecha and Asiento columns
-                fecha_col = None
-                asiento_col = None
-
-                for col in df.columns:
-                    if isinstance(col, str) and "fecha" in col.lower():
-                        fecha_col = col
-                    if isinstance(col, str) and "asiento" in col.lower():
-                        asiento_col = col
-
-                if fecha_col and asiento_col:
-                    # Forward fill fecha and asiento for continuation rows
-                    df[fecha_col] = df[fecha_col].ffill()
-                    df[asiento_col] = df[asiento_col].ffill()
-
-                    # Remove completely empty rows
-                    valid_rows = df.dropna(how="all")
-
-                    # Filter rows that have meaningful data beyond just fecha/asiento
-                    # A valid entry should have at least one non-null value in other important columns
-                    important_cols = [col for col in valid_rows.columns 
-                                    if col not in [fecha_col, asiento_col] and 
-                                    col not in ['Sheet_Origin']]
-                    
-                    # Keep rows that have at least one non-null value in important columns
-                    meaningful_data_mask = valid_rows[important_cols].notna().any(axis=1)
-                    valid_rows = valid_rows[meaningful_data_mask]
-
-                    # Filter out total/summary rows (usually at the end)
-                    # Check if any column contains words indicating it's a total row
-                    total_keywords = ["total", "suma", "suman", "totales", "resumen"]
-                    mask = True
-                    for col in valid_rows.columns:
-                        if valid_rows[col].dtype == "object":  # String columns
-                            col_mask = ~valid_rows[col].astype(
-                                str
-                            ).str.lower().str.contains(
-                                "|".join(total_keywords), na=False
-                            )
-                            mask = mask & col_mask
-
-                    valid_rows = valid_rows[mask]
-
-                    if not valid_rows.empty:
-                        # Add sheet name as a column for identification
-                        valid_rows = valid_rows.copy()
-                        valid_rows["Sheet_Origin"] = sheet_name
-                        master_data.append(valid_rows)
-                        if progress_callback:
-                            progress_callback(
-                                f"✅ Se encontraron {len(valid_rows)} entradas válidas en {sheet_name}"
-                            )
-                    else:
-                        if progress_callback:
-                            progress_callback(
-                                f"⚠️ No se encontraron entradas válidas en {sheet_name}"
-                            )
-                else:
+        self.validation = None
+        if self.validate:
+            with self._stage("validation", rows_in=len(master_df)):
+                self.validation = validate_master(master_df)
+            if progress_callback:
+                progress_callback(_validation_message(self.validation))
+        return master_df
+
+    def export_master(self, input_file_bytes, input_filename, output, fmt="parquet", progress_callback=None):
+        """Write the MASTER data as Parquet, Feather or CSV with normalized dtypes.
+
+        Skips the Excel workbook entirely. Returns ``master_df`` or None when the file
+        has no valid data (nothing is written in that case).
+        """
+        master_df = self.extract_master_df(input_file_bytes, input_filename, progress_callback)
+        if master_df is not None:
+            write_master(master_df, output, fmt)
+        return master_df
+
+    def export_to_database(
+        self, input_file_bytes, input_filename, db_path, progress_callback=None, file_origin=None
+    ):
+        """Upsert the MASTER data into the SQLite database at ``db_path``.
+
+        The rows of every sheet replace the ones loaded before with the same
+        ``file_origin`` and sheet (see :mod:`app.database`), so loading a file again
+        keeps one copy of it. ``file_origin`` identifies the file in the database and
+        defaults to ``input_filename`` as given; pass a full path when files in
+        different folders share a name. Returns ``master_df`` or None when the file
+        has no valid data.
+        """
+        master_df = self.extract_master_df(input_file_bytes, input_filename, progress_callback)
+        if master_df is None:
+            return None
+
+        if progress_callback:
+            progress_callback("Cargando MASTER en la base de datos...")
+        with self._stage("database", "MASTER", len(master_df)):
+            write_master_db(master_df, db_path, file_origin or str(input_filename or ""))
+        if progress_callback:
+            progress_callback(f"✅ {len(master_df)} entradas cargadas en {Path(db_path).name}")
+        return master_df
+
+    def write_package(self, input_file_bytes, input_filename, output, progress_callback=None):
+        """Write the original .xlsx package plus a first MASTER sheet to ``output``.
+
+        The original sheets are copied at the zip level, keeping their formatting, number
+        formats and column widths, so the output time depends on the size of MASTER only.
+        Returns ``master_df`` or None when the file has no valid data.
+        """
+        if input_filename and input_filename.lower().endswith(".xls"):
+            raise ValueError("El modo de copia del paquete solo admite archivos .xlsx")
+
+        master_df = self.extract_master_df(input_file_bytes, input_filename, progress_callback)
+        if master_df is None:
+            return None
+
+        if progress_callback:
+            progress_callback("Creando hoja maestra...")
+        with self._stage("workbook", "MASTER", len(master_df)):
+            insert_master_sheet(input_file_bytes, master_df, output)
+        if progress_callback:
+            progress_callback(f"✅ Hoja maestra creada con {len(master_df)} entradas totales")
+        return master_df
+
+    def consolidate(self, input_file_bytes, input_filename, progress_callback=None):
+        """Process the file and return ``(output_bytes, master_df)``, reusing cached results.
+
+        With a ``cache`` configured, a repeated upload of the same bytes with the same
+        settings is answered from the cache without processing the workbook again.
+        Returns ``(None, None)`` when no valid data is found.
+        """
+        key, cached = self._cached_result(input_file_bytes, progress_callback)
+        if cached is not None:
+            return cached
+
+        output_buffer = io.BytesIO()
+        master_df = self._write_output(input_file_bytes, input_filename, output_buffer, progress_callback)
+        if master_df is None:
+            return None, None
+        output_bytes = output_buffer.getvalue()
+        del output_buffer
+
+        if key is not None:
+            self.cache.put(key, output_bytes, master_df)
+        return output_bytes, master_df
+
+    def consolidate_to_file(self, input_file_bytes, input_filename, output_path, progress_callback=None):
+        """Like :meth:`consolidate`, but write the .xlsx straight to ``output_path``.
+
+        No in-memory copy of the output is made, so large results can be spilled to a
+        temporary file and served from disk. Returns ``master_df``, or None when no
+        valid data is found (``output_path`` is not created in that case). With a
+        ``cache`` configured the result is cached file to file (see
+        :meth:`ResultCache.put_file`): only results that fit its memory tier are read back.
+        """
+        key = self._cache_key(input_file_bytes)
+        if key is not None:
+            master_df = self.cache.get_file(key, output_path)
+            if master_df is not None:
+                self._use_cached_master(master_df, progress_callback)
+                return master_df
+
+        master_df = self._write_output(input_file_bytes, input_filename, output_path, progress_callback)
+        if master_df is not None and key is not None:
+            self.cache.put_file(key, output_path, master_df)
+        return master_df
+
+    def _cache_key(self, input_file_bytes):
+        """Cache key of the input and settings, or None without cache"""
+        if self.cache is None:
+            return None
+        return content_hash(input_file_bytes, self.cache_settings())
+
+    def _cached_result(self, input_file_bytes, progress_callback=None):
+        """Return ``(key, (output_bytes, master_df) or None)``; the key is None without cache"""
+        key = self._cache_key(input_file_bytes)
+        if key is None:
+            return None, None
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._use_cached_master(cached[1], progress_callback)
+        return key, cached
+
+    def _use_cached_master(self, master_df, progress_callback=None):
+        if progress_callback:
+            progress_callback(f"✅ Resultado recuperado de la caché: {len(master_df)} entradas totales")
+        if self.validate:
+            # The cache keeps the output and master_df only; the checks take seconds
+            self.validation = validate_master(master_df)
+
+    def _write_output(self, input_file_bytes, input_filename, output, progress_callback=None):
+        """Build the consolidated .xlsx into ``output`` with the configured engine.
+
+        Returns ``master_df`` or None when no valid data is found.
+        """
+        if self.output_engine == "package" and self.copy_original_sheets:
+            return self.write_package(input_file_bytes, input_filename, output, progress_callback)
+
+        # The raw sheets and the input ExcelFile are released when process_excel_file
+        # returns, so only the workbook and master_df are alive while saving
+        output_workbook, master_df = self.process_excel_file(
+            input_file_bytes, input_filename, progress_callback
+        )
+        if output_workbook is None:
+            return None
+        with self._stage("save", rows_in=len(master_df)):
+            output_workbook.save(output)
+        return master_df
+
+    def merge_files(self, inputs, output, fmt="xlsx", workers=None, progress_callback=None):
+        """Consolidate many workbooks into a single MASTER written to ``output``.
+
+        ``inputs`` are paths or ``(filename, file_bytes)`` pairs. The files are processed
+        in up to ``workers`` processes (``self.workers`` by default); each one spills
+        its valid rows to a temporary file, so only the file being written is held in
+        memory. MASTER gets the union of the columns of every file plus File_Origin and
+        Sheet_Origin, with the rows in input order. ``fmt`` is "xlsx" (MASTER only,
+        continued on "MASTER 2"... past Excel's row limit) or "csv".
+
+        A file that fails is reported and skipped. Returns a summary dict with
+        ``master_rows``, ``rows_per_file`` and ``errors`` (file name -> message).
+        """
+        if fmt not in MERGE_FORMATS:
+            raise ValueError(f"Formato de salida no soportado: {fmt}")
+        workers = self.workers if workers is None else workers
+        summary = {"master_rows": 0, "rows_per_file": {}, "errors": {}}
+
+        with tempfile.TemporaryDirectory(prefix="libro-diario-merge-") as spill_dir:
+            spills = []
+            columns = []
+            for file_name, spill_path, file_columns, rows, messages, error, events in \
+                    self._iter_spilled_files(inputs, spill_dir, workers):
+                for event in events or ():
+                    self.instrumentation.record(event)
+                if progress_callback:
+                    progress_callback(f"Procesando archivo: **{file_name}**")
+                    for message in messages:
+                        progress_callback(message)
+                if error is not None:
+                    summary["errors"][file_name] = error
                     if progress_callback:
-                        progress_callback(f"⚠️ Columnas requeridas no encontradas en {sheet_name}")
-            else:
+                        progress_callback(f"❌ Error en {file_name}: {error}")
+                    continue
+                summary["rows_per_file"][file_name] = rows
+                if spill_path is None:
+                    continue
+                spills.append(spill_path)
+                for col in file_columns:
+                    if col not in columns and col not in ("File_Origin", "Sheet_Origin"):
+                        columns.append(col)
+
+            if not spills:
                 if progress_callback:
-                    progress_callback(f"⚠️ Fila de encabezados no encontrada en {sheet_name}")
+                    progress_callback("¡No se encontraron datos válidos en ningún archivo!")
+                return summary
 
-        # Create master sheet
-        if master_data:
+            columns += ["File_Origin", "Sheet_Origin"]
             if progress_callback:
                 progress_callback("Creando hoja maestra...")
+            with self._stage("workbook", "MASTER") as event:
+                if fmt == "xlsx":
+                    summary["master_rows"] = _write_merged_xlsx(spills, columns, output)
+                else:
+                    summary["master_rows"] = _write_merged_csv(spills, columns, output)
+                event["rows_out"] = summary["master_rows"]
 
-            master_df = pd.concat(master_data, ignore_index=True)
+        if progress_callback:
+            progress_callback(
+                f"✅ Hoja maestra creada con {summary['master_rows']} entradas totales "
+                f"de {len(summary['rows_per_file'])} archivos"
+            )
+        return summary
 
-            # Create master sheet
-            master_ws = output_workbook.create_sheet(title="MASTER")
-            for r in dataframe_to_rows(master_df, index=False, header=True):
-                master_ws.append(r)
+    def _iter_spilled_files(self, inputs, spill_dir, workers):
+        """Yield the :func:`_extract_file_to_spill` result of every input, in input order"""
+        jobs = [
+            (item, os.path.join(spill_dir, f"{idx}.pkl")) for idx, item in enumerate(inputs)
+        ]
+        if workers <= 1 or len(jobs) <= 1:
+            for item, spill_path in jobs:
+                yield _extract_file_to_spill(self, item, spill_path)
+            return
 
-            # Move master sheet to the beginning
-            output_workbook.move_sheet(
-                "MASTER", offset=-len(output_workbook.sheetnames) + 1
-            )
+        # Files already run in parallel: sheets are processed serially inside each one
+        worker_consolidator = copy.copy(self)
+        worker_consolidator.workers = 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = [
+                executor.submit(_extract_file_to_spill, worker_consolidator, item, spill_path, True)
+                for item, spill_path in jobs
+            ]
+            for future in futures:
+                yield future.result()
 
-            if progress_callback:
-                progress_callback(f"✅ Hoja maestra creada con {len(master_df)} entradas totales")
+    def _scan_sheet_layout(self, worksheet):
+        """Read a read-only worksheet up to its header row and describe its columns.
 
-            return output_workbook, master_df
+        Returns ``(header_row, columns, fecha_idx, asiento_idx, mapping)`` or None when
+        the sheet has no header row. Column names are built like ``pd.read_excel`` does
+        (and renamed like process_sheet does with ``canonical_columns``).
+        """
+        rows = worksheet.iter_rows(values_only=True, max_row=self.header_search_rows)
+        for idx, values in enumerate(rows):
+            if not any(profile.is_header(values) for profile in self.profiles):
+                continue
+
+            values = list(values)
+            while values and values[-1] is None:
+                values.pop()
+            header = ["" if val is None else val for val in values]
+            columns = list(TextParser([header], header=0).read().columns)
+
+            mapping = self.resolve_columns(columns)
+            if self.canonical_columns and mapping.complete:
+                renames, mapping = mapping.canonical(columns)
+                columns = [renames.get(col, col) for col in columns]
+            fecha_idx = None if mapping.fecha_col is None else columns.index(mapping.fecha_col)
+            asiento_idx = None if mapping.asiento_col is None else columns.index(mapping.asiento_col)
+            return idx, columns, fecha_idx, asiento_idx, mapping
+        return None
+
+    def _stream_valid_rows(self, rows, layout, sheet_name):
+        """Yield the valid data rows of a sheet, with the same filters and dtypes as process_excel_file"""
+        header_row, columns, fecha_idx, asiento_idx, mapping = layout
+        width = len(columns)
+        total_columns = self._checked_total_columns(mapping.total_columns)
+        converters = mapping.profile.row_converters(columns, mapping)
+        if total_columns is None:
+            text_idx = range(width)
         else:
-            if progress_callback:
+            text_idx = [idx for idx, col in enumerate(columns) if col in total_columns]
+        self.total_rows_dropped[sheet_name] = 0
+        last_fecha = None
+        last_asiento = None
+
+        for values in rows:
+            row = [None if _is_null_cell(val) else val for val in values[:width]]
+            row.extend([None] * (width - len(row)))
+
+            # Forward fill fecha and asiento for continuation rows
+            if row[fecha_idx] is None:
+                row[fecha_idx] = last_fecha
+            else:
+                last_fecha = row[fecha_idx]
+            if row[asiento_idx] is None:
+                row[asiento_idx] = last_asiento
+            else:
+                last_asiento = row[asiento_idx]
+
+            # Keep rows that have at least one value beyond fecha/asiento
+            if not any(
+                val is not None
+                for col_idx, val in enumerate(row)
+                if col_idx not in (fecha_idx, asiento_idx)
+            ):
+                continue
+
+            # Filter out total/summary rows
+            if any(
+                isinstance(row[idx], str) and self.total_pattern.search(row[idx])
+                for idx in text_idx
+            ):
+                self.total_rows_dropped[sheet_name] += 1
+                continue
+
+            for idx, convert in converters:
+                row[idx] = convert(row[idx])
+            yield row
+
+    def _iter_sheet_windows(self, rows, layout, sheet_name):
+        """Yield the valid rows of a sheet's data ``rows``, one window of ``chunk_rows`` non-empty rows at a time.
+
+        Each window is parsed with TextParser and filtered with filter_valid_rows like a
+        whole sheet. Fecha/Asiento are carried across windows: the continuation rows
+        at the start of a window take the last values of the previous one.
+        """
+        header_row, columns, fecha_idx, asiento_idx, mapping = layout
+        fecha_col, asiento_col = columns[fecha_idx], columns[asiento_idx]
+        width = len(columns)
+        chunk_rows = self.chunk_rows or DEFAULT_CHUNK_ROWS
+        self.total_rows_dropped[sheet_name] = 0
+        last_fecha = None
+        last_asiento = None
+        # Empty rows are dropped anyway and add nothing to the forward fill; skipping
+        # them here also skips the padding up to a stale sheet dimension (A1:I1048576)
+        rows = (values[:width] for values in rows if any(val is not None for val in values[:width]))
+
+        while True:
+            window = [[_excel_value(val) for val in values] for values in itertools.islice(rows, chunk_rows)]
+            if not window:
+                return
+
+            # Only the leading continuation rows need the carried values; the
+            # forward fill of filter_valid_rows takes care of the rest
+            for row in window:
+                row.extend([None] * (width - len(row)))
+            for idx, last in ((fecha_idx, last_fecha), (asiento_idx, last_asiento)):
+                for row in window:
+                    if not _is_null_cell(row[idx]):
+                        break
+                    row[idx] = last
+
+            with self._stage("frame", sheet_name, len(window)) as event:
+                df = TextParser(window, names=columns, header=None).read()
+                event["rows_out"] = len(df)
+            del window
+
+            valid_rows, total_rows_dropped = self.filter_valid_rows(
+                df, fecha_col, asiento_col, sheet_name, mapping.total_columns
+            )
+            self.total_rows_dropped[sheet_name] += total_rows_dropped
+
+            # The forward fill left the last known values in the last row
+            if pd.notna(df[fecha_col].iat[-1]):
+                last_fecha = df[fecha_col].iat[-1]
+            if pd.notna(df[asiento_col].iat[-1]):
+                last_asiento = df[asiento_col].iat[-1]
+
+            if not valid_rows.empty:
+                valid_rows = valid_rows.copy()
+                mapping.profile.convert_dtypes(valid_rows, mapping)
+                valid_rows["Sheet_Origin"] = sheet_name
+                yield valid_rows
+
+    def iter_sheet_chunks(self, input_file_bytes, input_filename=None, progress_callback=None):
+        """Yield ``(sheet_name, valid_rows)`` for every window of data rows of an .xlsx file.
+
+        The workbook is read with a read-only openpyxl workbook and each sheet is parsed
+        in windows of ``chunk_rows`` rows after its header row (DEFAULT_CHUNK_ROWS when
+        not set), so memory depends on the window size instead of the sheet size. The
+        rows are the same process_sheet extracts; windows without valid rows are skipped.
+        """
+        if input_filename and input_filename.lower().endswith(".xls"):
+            raise ValueError("La lectura por bloques solo admite archivos .xlsx")
+
+        input_workbook = openpyxl.load_workbook(
+            io.BytesIO(input_file_bytes), read_only=True, data_only=True, keep_links=False
+        )
+        try:
+            for ws in input_workbook.worksheets:
+                sheet_name = ws.title
+                if progress_callback:
+                    progress_callback(f"Procesando hoja: **{sheet_name}**")
+
+                with self._stage("header", sheet_name):
+                    layout = self._scan_sheet_layout(ws)
+                if layout is None:
+                    self.total_rows_dropped[sheet_name] = 0
+                    if progress_callback:
+                        progress_callback(f"⚠️ Fila de encabezados no encontrada en {sheet_name}")
+                    continue
+                if layout[2] is None or layout[3] is None:
+                    self.total_rows_dropped[sheet_name] = 0
+                    if progress_callback:
+                        progress_callback(f"⚠️ Columnas requeridas no encontradas en {sheet_name}")
+                    continue
+
+                rows = ws.iter_rows(min_row=layout[0] + 2, values_only=True)
+                sheet_rows = 0
+                for valid_rows in self._iter_sheet_windows(rows, layout, sheet_name):
+                    sheet_rows += len(valid_rows)
+                    yield sheet_name, valid_rows
+
+                if progress_callback:
+                    if sheet_rows:
+                        progress_callback(
+                            f"✅ Se encontraron {sheet_rows} entradas válidas en {sheet_name}"
+                        )
+                    else:
+                        progress_callback(f"⚠️ No se encontraron entradas válidas en {sheet_name}")
+        finally:
+            input_workbook.close()
+
+    def stream_excel_file(self, input_file_bytes, input_filename, output, progress_callback=None):
+        """Consolidate an .xlsx file with bounded memory, writing straight to ``output``.
+
+        The input is iterated with a read-only workbook and the result is written with a
+        write-only workbook, so rows flow sheet by sheet into MASTER and no sheet is ever
+        held in memory as a whole. ``output`` is a path or a writable binary file object.
+        Returns the number of rows written to MASTER.
+        """
+        if input_filename and input_filename.lower().endswith(".xls"):
+            raise ValueError("El modo streaming solo admite archivos .xlsx")
+
+        input_workbook = openpyxl.load_workbook(
+            io.BytesIO(input_file_bytes), read_only=True, data_only=True, keep_links=False
+        )
+        try:
+            # First pass: read only up to each header row to build the MASTER columns
+            layouts = {}
+            master_columns = []
+            for ws in input_workbook.worksheets:
+                with self._stage("header", ws.title):
+                    layout = self._scan_sheet_layout(ws)
+                layouts[ws.title] = layout
+                if layout is None or layout[2] is None or layout[3] is None:
+                    continue
+                for col in layout[1] + ["Sheet_Origin"]:
+                    if col not in master_columns:
+                        master_columns.append(col)
+
+            output_workbook = openpyxl.Workbook(write_only=True)
+            master_ws = output_workbook.create_sheet(title="MASTER")
+            master_ws.append(master_columns)
+
+            master_rows = 0
+            self.total_rows_dropped = {}
+
+            # Second pass: copy every sheet and stream its valid rows into MASTER
+            for ws in input_workbook.worksheets:
+                sheet_name = ws.title
+                if progress_callback:
+                    progress_callback(f"Procesando hoja: **{sheet_name}**")
+
+                copy_ws = output_workbook.create_sheet(title=sheet_name)
+                layout = layouts[sheet_name]
+
+                def copied_rows(rows):
+                    for values in rows:
+                        copy_ws.append(values)
+                        yield values
+
+                rows = copied_rows(ws.iter_rows(values_only=True))
+
+                if layout is None:
+                    for _ in rows:
+                        pass
+                    if progress_callback:
+                        progress_callback(f"⚠️ Fila de encabezados no encontrada en {sheet_name}")
+                    continue
+
+                header_row, columns, fecha_idx, asiento_idx, mapping = layout
+                if fecha_idx is None or asiento_idx is None:
+                    for _ in rows:
+                        pass
+                    if progress_callback:
+                        progress_callback(f"⚠️ Columnas requeridas no encontradas en {sheet_name}")
+                    continue
+
+                for _ in range(header_row + 1):
+                    next(rows)
+
+                positions = [master_columns.index(col) for col in columns]
+                origin_position = master_columns.index("Sheet_Origin")
+                sheet_rows = 0
+                with self._stage("stream", sheet_name) as event:
+                    for row in self._stream_valid_rows(rows, layout, sheet_name):
+                        master_row = [None] * len(master_columns)
+                        for position, val in zip(positions, row):
+                            master_row[position] = val
+                        master_row[origin_position] = sheet_name
+                        master_ws.append(master_row)
+                        sheet_rows += 1
+                    event["rows_out"] = sheet_rows
+
+                master_rows += sheet_rows
+                if progress_callback:
+                    if sheet_rows:
+                        progress_callback(
+                            f"✅ Se encontraron {sheet_rows} entradas válidas en {sheet_name}"
+                        )
+                    else:
+                        progress_callback(f"⚠️ No se encontraron entradas válidas en {sheet_name}")
+        finally:
+            input_workbook.close()
+
+        with self._stage("save", rows_in=master_rows):
+            output_workbook.save(output)
+
+        if progress_callback:
+            if master_rows:
+                progress_callback(f"✅ Hoja maestra creada con {master_rows} entradas totales")
+            else:
                 progress_callback("¡No se encontraron datos válidos en ninguna hoja!")
-            return None, None
\ No newline at end of file
+
+        return master_rows
+
+
+def _extract_file_to_spill(consolidator, item, spill_path, in_worker=False):
+    """Extract the MASTER rows of one input of merge_files and pickle them to ``spill_path``.
+
+    Returns ``(file_name, spill_path, columns, rows, messages, error, events)``;
+    ``spill_path`` is None when the file has no valid rows. ``events`` are the
+    instrumentation events recorded ``in_worker`` process, to be replayed by the parent.
+    """
+    if isinstance(item, (str, os.PathLike)):
+        file_name = Path(item).name
+        file_bytes = None
+    else:
+        file_name, file_bytes = item
+
+    messages = []
+    try:
+        if file_bytes is None:
+            file_bytes = Path(item).read_bytes()
+        master_df = consolidator.extract_master_df(file_bytes, file_name, progress_callback=messages.append)
+    except Exception as e:
+        master_df = None
+        error = f"{type(e).__name__}: {e}"
+    else:
+        error = None
+
+    events = None
+    if in_worker and consolidator.instrumentation is not None:
+        events = consolidator.instrumentation.drain()
+    if master_df is None:
+        return file_name, None, [], 0, messages, error, events
+
+    master_df.insert(
+        master_df.columns.get_loc("Sheet_Origin"), "File_Origin",
+        pd.Categorical([file_name] * len(master_df)),
+    )
+    master_df.to_pickle(spill_path)
+    return file_name, spill_path, list(master_df.columns), len(master_df), messages, None, events
+
+
+def _read_spill(spill_path, columns):
+    """Load one spilled file with the merged columns (missing ones are left empty)"""
+    df = pd.read_pickle(spill_path)
+    os.remove(spill_path)
+    return df.reindex(columns=columns)
+
+
+def _write_merged_xlsx(spills, columns, output):
+    """Stream the spilled files into a write-only MASTER workbook, returning the row count"""
+    output_workbook = openpyxl.Workbook(write_only=True)
+    master_rows = 0
+    sheet_rows = EXCEL_MAX_ROWS
+    for spill_path in spills:
+        for r in _master_rows(_read_spill(spill_path, columns)):
+            if sheet_rows == EXCEL_MAX_ROWS:
+                sheet_number = len(output_workbook.worksheets) + 1
+                master_ws = output_workbook.create_sheet(
+                    title="MASTER" if sheet_number == 1 else f"MASTER {sheet_number}"
+                )
+                master_ws.append(columns)
+                sheet_rows = 1
+            master_ws.append(r)
+            sheet_rows += 1
+            master_rows += 1
+    output_workbook.save(output)
+    return master_rows
+
+
+def _write_merged_csv(spills, columns, output):
+    """Append the spilled files, with normalized dtypes, to one CSV, returning the row count"""
+    master_rows = 0
+    with open_text_output(output) as handle:
+        for idx, spill_path in enumerate(spills):
+            df = normalize_master_dtypes(_read_spill(spill_path, columns))
+            write_csv_rows(df, handle, header=idx == 0)
+            master_rows += len(df)
+    return master_rows
+
+
+# Per-process state of the sheet worker pool, set once by _init_sheet_worker
+_worker_excel_file = None
+_worker_consolidator = None
+
+
+def _init_sheet_worker(input_file_bytes, consolidator):
+    """Open the workbook once per worker process"""
+    global _worker_excel_file, _worker_consolidator
+    _worker_excel_file = consolidator.open_excel_file(input_file_bytes)
+    _worker_consolidator = consolidator
+
+
+def _process_sheet_in_worker(sheet_name, need_raw=True):
+    """Parse and filter one sheet inside a worker process.
+
+    The raw sheet is only sent back when ``need_raw`` (it is the largest result), and
+    the instrumentation events of the sheet, if enabled, are returned last.
+    """
+    df_raw = _worker_consolidator._load_sheet_timed(_worker_excel_file, sheet_name)
+    valid_rows, message, total_rows_dropped = _worker_consolidator.process_sheet(df_raw, sheet_name)
+    instrumentation = _worker_consolidator.instrumentation
+    events = instrumentation.drain() if instrumentation is not None else None
+    if not need_raw:
+        df_raw = None
+    return df_raw, valid_rows, message, total_rows_dropped, events
+
@@ -0,0 +1,142 @@
+"""Incremental SQLite store of consolidated MASTER data.
+
+Every consolidated file is loaded into one ``master`` table, so many years of
+diarios can be queried by account and date range with plain SQL instead of opening
+one workbook per year. Loads are upserts by file and sheet: the rows of each
+(File_Origin, Sheet_Origin) pair in ``master_df`` replace the ones loaded before,
+and the ``sheets`` table keeps the row count and load time of every pair. Sheets
+of the file missing from a new ``master_df`` are left as they were.
+
+Fecha is stored as ISO text ("2020-01-31"), so date ranges compare as strings and
+use the index. The table gains new columns when a file brings them (a Sage export
+after A3 ones, for example).
+"""
+import sqlite3
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from app.exporters import normalize_master_dtypes
+from app.profiles import master_roles
+
+MASTER_TABLE = "master"
+SHEETS_TABLE = "sheets"
+
+# Rows per executemany call; the whole load is still a single transaction
+INSERT_BATCH_ROWS = 10_000
+
+# An index is kept on the column resolved for each role (see master_roles)
+INDEXED_ROLES = ("fecha", "asiento", "cuenta")
+
+# Seconds a load waits for another process writing the same database
+BUSY_TIMEOUT = 60
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_type(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return "TEXT"
+    if pd.api.types.is_integer_dtype(values):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(values):
+        return "REAL"
+    return "TEXT"
+
+
+def _sql_values(values):
+    """Python values of a normalized column, with None for missing cells"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        dates = values.dropna()
+        iso_format = "%Y-%m-%d" if (dates == dates.dt.normalize()).all() else "%Y-%m-%d %H:%M:%S"
+        values = values.dt.strftime(iso_format)
+    values = values.astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+def _index_columns(columns):
+    roles = master_roles(columns)
+    return [roles[role] for role in INDEXED_ROLES if role in roles] + ["Sheet_Origin"]
+
+
+def connect(db_path):
+    """Open the database at ``db_path``, waiting for concurrent writers"""
+    return sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+
+
+def write_master_db(master_df, db_path, file_origin, batch_size=INSERT_BATCH_ROWS):
+    """Upsert the rows of ``master_df`` into the SQLite database at ``db_path``.
+
+    ``file_origin`` fills File_Origin when ``master_df`` has no such column (a single
+    consolidated file). Returns ``{(file, sheet): rows}`` for the loaded sheets.
+    """
+    df = normalize_master_dtypes(master_df)
+    if "File_Origin" not in df.columns:
+        df.insert(df.columns.get_loc("Sheet_Origin"), "File_Origin", file_origin)
+    df["File_Origin"] = df["File_Origin"].astype(str)
+    df["Sheet_Origin"] = df["Sheet_Origin"].astype(str)
+    loaded = {
+        (file_name, sheet): int(rows)
+        for (file_name, sheet), rows in df.groupby(["File_Origin", "Sheet_Origin"], sort=False).size().items()
+    }
+
+    connection = connect(db_path)
+    try:
+        with connection:
+            # Take the write lock before reading the schema, so concurrent loads
+            # (the CLI's worker processes) do not both create the table
+            connection.execute("BEGIN IMMEDIATE")
+            _ensure_tables(connection, df)
+            connection.executemany(
+                f"DELETE FROM {MASTER_TABLE} WHERE File_Origin = ? AND Sheet_Origin = ?", list(loaded)
+            )
+
+            insert = (
+                f"INSERT INTO {MASTER_TABLE} ({', '.join(_quote(col) for col in df.columns)}) "
+                f"VALUES ({', '.join('?' * len(df.columns))})"
+            )
+            for start in range(0, len(df), batch_size):
+                batch = df.iloc[start:start + batch_size]
+                connection.executemany(insert, zip(*(_sql_values(batch[col]) for col in batch.columns)))
+
+            # Created after the first bulk insert, which is faster than filling them row by row
+            for col in _index_columns(df.columns):
+                name = "master_" + "".join(c if c.isalnum() else "_" for c in col.lower()) + "_idx"
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {MASTER_TABLE} ({_quote(col)})"
+                )
+
+            loaded_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            connection.executemany(
+                f"INSERT INTO {SHEETS_TABLE} (File_Origin, Sheet_Origin, rows, loaded_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (File_Origin, Sheet_Origin) DO UPDATE SET rows = excluded.rows, "
+                "loaded_at = excluded.loaded_at",
+                [(file_name, sheet, rows, loaded_at) for (file_name, sheet), rows in loaded.items()],
+            )
+    finally:
+        connection.close()
+    return loaded
+
+
+def _ensure_tables(connection, df):
+    """Create the tables, or add the columns of ``df`` the master table lacks"""
+    existing = {row[1] for row in connection.execute(f"PRAGMA table_info({MASTER_TABLE})")}
+    if not existing:
+        columns = ", ".join(f"{_quote(col)} {_sql_type(df[col])}" for col in df.columns)
+        connection.execute(f"CREATE TABLE {MASTER_TABLE} ({columns})")
+        # Serves the upsert's delete by file and sheet
+        connection.execute(
+            f"CREATE INDEX master_file_sheet_idx ON {MASTER_TABLE} (File_Origin, Sheet_Origin)"
+        )
+    else:
+        for col in df.columns:
+            if col not in existing:
+                connection.execute(f"ALTER TABLE {MASTER_TABLE} ADD COLUMN {_quote(col)} {_sql_type(df[col])}")
+
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {SHEETS_TABLE} ("
+        "File_Origin TEXT NOT NULL, Sheet_Origin TEXT NOT NULL, rows INTEGER NOT NULL, "
+        "loaded_at TEXT NOT NULL, PRIMARY KEY (File_Origin, Sheet_Origin))"
+    )
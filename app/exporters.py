@@ -0,0 +1,177 @@
+import io
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from app.formats import COLUMNAR_FORMATS, available_formats
+from app.profiles import master_roles
+
+AMOUNT_KEYWORDS = ("debe", "haber", "importe", "saldo")
+
+# Text-like columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+# Smallest first: integral columns are downcast to the first type that fits
+NULLABLE_INT_TYPES = ("Int8", "Int16", "Int32", "Int64")
+
+
+# Kind of the MASTER columns resolved for these roles, whatever their names
+ROLE_KINDS = {"fecha": "fecha", "asiento": "asiento", "debe": "amount", "haber": "amount"}
+
+
+def _column_kinds(columns):
+    """``{column: "fecha" | "asiento" | "amount"}`` by keyword, or by role for other names ("Asto.")"""
+    kinds = {}
+    for col in columns:
+        name = col.lower() if isinstance(col, str) else ""
+        if "fecha" in name:
+            kinds[col] = "fecha"
+        elif "asiento" in name:
+            kinds[col] = "asiento"
+        elif any(keyword in name for keyword in AMOUNT_KEYWORDS):
+            kinds[col] = "amount"
+    for role, col in master_roles(columns).items():
+        if role in ROLE_KINDS:
+            kinds.setdefault(col, ROLE_KINDS[role])
+    return kinds
+
+
+def normalize_master_dtypes(master_df):
+    """Return a copy of ``master_df`` with analysis-friendly dtypes.
+
+    Fecha columns become datetime64, Asiento columns nullable integers (when every
+    value is integral), amount columns (Debe/Haber/Importe/Saldo) float64, and any
+    other object column that mixes text and numbers is turned into text so Arrow
+    based formats can store it. Values that cannot be converted become missing.
+    """
+    df = master_df.copy()
+    kinds = _column_kinds(df.columns)
+    for col in df.columns:
+        kind = kinds.get(col)
+        if kind == "fecha":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif kind == "asiento":
+            numbers = pd.to_numeric(df[col], errors="coerce")
+            if (numbers.dropna() % 1 == 0).all():
+                df[col] = numbers.astype("Int64")
+            else:
+                df[col] = numbers
+        elif kind == "amount":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        else:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # Categories may mix text and numbers, like the object columns they came from
+                df[col] = df[col].astype(object)
+            if df[col].dtype == "object":
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    # Arrow formats require string column names
+    df.columns = [str(col) for col in df.columns]
+    return df
+
+
+def compact_master_dtypes(master_df):
+    """Return a copy of ``master_df`` with compact dtypes and the same cell values.
+
+    Unlike :func:`normalize_master_dtypes` no value is converted or coerced, so the
+    MASTER sheet written from the result is identical: object Fecha columns holding
+    only datetimes become datetime64, object amount columns holding only numbers
+    become float64, Asiento and other integral columns (Apunte...) become the
+    smallest nullable integer type, whether they were parsed as float64 (with gaps)
+    or int64, and Sheet_Origin plus any other repetitive column
+    (Cuenta, Descripción de la cuenta, Concepto...) becomes a categorical.
+    """
+    df = master_df.copy()
+    kinds = _column_kinds(df.columns)
+    for col in df.columns:
+        values = df[col]
+        kind = kinds.get(col)
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+
+        if kind == "fecha":
+            if values.dtype == "object" and inferred in ("datetime", "datetime64"):
+                df[col] = pd.to_datetime(values)
+        elif kind == "amount":
+            if values.dtype == "object" and inferred in ("integer", "floating", "mixed-integer-float"):
+                df[col] = values.astype("float64")
+        elif kind == "asiento":
+            if values.dtype in ("float64", "int64"):
+                df[col] = _smallest_nullable_int(values)
+        elif col == "Sheet_Origin" or (
+            values.dtype in ("object", "float64")
+            and values.nunique() <= CATEGORY_MAX_RATIO * values.notna().sum()
+        ):
+            # Categories in order of appearance, so Sheet_Origin keeps the sheet order
+            df[col] = pd.Categorical(values, categories=pd.unique(values.dropna()))
+        elif values.dtype in ("float64", "int64"):
+            # Mostly distinct numbers (Apunte...): narrow them when they are integral
+            df[col] = _smallest_nullable_int(values)
+    return df
+
+
+def _smallest_nullable_int(values):
+    """Cast an integral float or int64 column to the smallest nullable int type; other columns are kept"""
+    numbers = values.dropna()
+    if numbers.empty or not (numbers % 1 == 0).all():
+        return values
+    for int_type in NULLABLE_INT_TYPES:
+        info = np.iinfo(int_type.lower())
+        if info.min <= numbers.min() and numbers.max() <= info.max:
+            return values.astype(int_type)
+    return values
+
+
+def memory_usage_bytes(df):
+    """Total memory of ``df``, including the Python objects of object columns"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def write_master(master_df, output, fmt, chunk_size=100_000):
+    """Write ``master_df`` with normalized dtypes as Parquet, Feather or chunked CSV.
+
+    ``output`` is a path or a writable binary file object.
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Formato de salida no soportado: {fmt}")
+    if fmt not in available_formats():
+        raise ImportError(f"El formato {COLUMNAR_FORMATS[fmt]['label']} requiere pyarrow (pip install pyarrow)")
+
+    df = normalize_master_dtypes(master_df)
+
+    if fmt == "parquet":
+        df.to_parquet(output, index=False)
+    elif fmt == "feather":
+        df.to_feather(output)
+    else:
+        _write_csv_chunks(df, output, chunk_size)
+
+
+@contextmanager
+def open_text_output(output):
+    """UTF-8 text handle for ``output``, a path or a writable binary file object.
+
+    A binary file object is left open when the block exits.
+    """
+    if isinstance(output, (str, bytes)) or hasattr(output, "__fspath__"):
+        with open(output, "w", encoding="utf-8", newline="") as handle:
+            yield handle
+        return
+
+    handle = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    try:
+        yield handle
+        handle.flush()
+    finally:
+        # Leave the caller's binary buffer open
+        handle.detach()
+
+
+def _write_csv_chunks(df, output, chunk_size):
+    with open_text_output(output) as handle:
+        write_csv_rows(df, handle, chunk_size)
+
+
+def write_csv_rows(df, handle, chunk_size=100_000, header=True):
+    """Append ``df`` to an open text handle in chunks, with the header row if ``header``"""
+    for start in range(0, max(len(df), 1), chunk_size):
+        df.iloc[start:start + chunk_size].to_csv(handle, index=False, header=header and start == 0)
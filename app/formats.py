@@ -0,0 +1,23 @@
+"""Output formats offered by the app, kept free of heavy imports.
+
+The Streamlit page needs these to render its options before any file is uploaded,
+so this module must not import pandas, numpy or openpyxl.
+"""
+import importlib.util
+
+# Output formats for the MASTER data besides the Excel workbook.
+# Parquet and Feather need the optional pyarrow dependency.
+COLUMNAR_FORMATS = {
+    "parquet": {"label": "Parquet", "extension": ".parquet", "mime": "application/vnd.apache.parquet"},
+    "feather": {"label": "Feather (Arrow IPC)", "extension": ".feather", "mime": "application/vnd.apache.arrow.file"},
+    "csv": {"label": "CSV", "extension": ".csv", "mime": "text/csv"},
+}
+
+# Output formats of ExcelConsolidator.merge_files, which are written incrementally
+MERGE_FORMATS = ("xlsx", "csv")
+
+
+def available_formats():
+    """Columnar formats that can be written with the installed libraries"""
+    has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+    return [fmt for fmt in COLUMNAR_FORMATS if fmt == "csv" or has_pyarrow]
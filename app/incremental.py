@@ -0,0 +1,106 @@
+"""Per-sheet fingerprints and result store for incremental re-consolidation.
+
+A weekly re-export of the same annual workbook usually only changes the current
+month. Each sheet is fingerprinted straight from the .xlsx package, without parsing
+it, and the extracted rows of every fingerprint are kept in a :class:`SheetStore`,
+so only the sheets that changed are processed again.
+"""
+import hashlib
+import io
+import os
+import pickle
+import re
+import threading
+import zipfile
+from pathlib import Path
+
+from app.cache import PICKLE_PROTOCOL
+from app.xlsx_package import (
+    SHARED_STRINGS_REL_TYPE,
+    STYLES_REL_TYPE,
+    sheet_parts,
+    workbook_part_of_type,
+)
+
+_SHARED_STRING_CELL = re.compile(rb'<(?:\w+:)?c\b[^>]*\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)</(?:\w+:)?v>')
+_SHARED_STRING_ITEM = re.compile(rb"<(?:\w+:)?si\b[^>]*/>|<(?:\w+:)?si\b.*?</(?:\w+:)?si>", re.S)
+
+
+def sheet_fingerprints(input_file_bytes, settings):
+    """Return ``{sheet_name: fingerprint}`` for an .xlsx file, or {} for other formats.
+
+    A fingerprint covers the sheet XML, the shared strings that sheet references,
+    the styles part (it decides which numbers are dates), the sheet name and the
+    extraction ``settings``. Strings added to the shared table for other sheets do
+    not change it.
+    """
+    try:
+        zin = zipfile.ZipFile(io.BytesIO(input_file_bytes))
+    except zipfile.BadZipFile:
+        return {}
+
+    with zin:
+        try:
+            parts = sheet_parts(zin)
+        except KeyError:
+            return {}
+        names = set(zin.namelist())
+
+        shared_strings = []
+        strings_part = workbook_part_of_type(zin, SHARED_STRINGS_REL_TYPE)
+        if strings_part in names:
+            shared_strings = _SHARED_STRING_ITEM.findall(zin.read(strings_part))
+
+        common = hashlib.sha256(repr(sorted(settings.items())).encode("utf-8"))
+        styles_part = workbook_part_of_type(zin, STYLES_REL_TYPE)
+        if styles_part in names:
+            common.update(zin.read(styles_part))
+
+        fingerprints = {}
+        for sheet_name, part in parts.items():
+            if part not in names:
+                continue
+            sheet_xml = zin.read(part)
+            digest = common.copy()
+            digest.update(sheet_name.encode("utf-8"))
+            digest.update(sheet_xml)
+            for index in sorted({int(i) for i in _SHARED_STRING_CELL.findall(sheet_xml)}):
+                digest.update(b"%d\x00" % index)
+                if index < len(shared_strings):
+                    digest.update(shared_strings[index])
+            fingerprints[sheet_name] = digest.hexdigest()
+        return fingerprints
+
+
+class SheetStore:
+    """Folder of previously extracted sheet results, one pickle per fingerprint.
+
+    Entries are ``(valid_rows, message, total_rows_dropped)`` tuples as returned by
+    ``ExcelConsolidator.process_sheet``, pickled like the result cache's entries
+    (see app.cache.PICKLE_PROTOCOL), so only point ``store_dir`` at a folder written
+    by this application.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, fingerprint):
+        return self.store_dir / f"{fingerprint}.pkl"
+
+    def get(self, fingerprint):
+        try:
+            with open(self._path(fingerprint), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def put(self, fingerprint, entry):
+        path = self._path(fingerprint)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=PICKLE_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def __contains__(self, fingerprint):
+        return self._path(fingerprint).exists()
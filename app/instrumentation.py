@@ -0,0 +1,110 @@
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:  # optional: only used to read the RSS where /proc is not available
+    psutil = None
+
+# Columns of every stage event, in export order
+EVENT_FIELDS = ["stage", "sheet", "rows_in", "rows_out", "elapsed_ms", "rss_delta_mb"]
+
+# Stages emitted by ExcelConsolidator, in pipeline order
+# ("stream" replaces parse to filters in ExcelConsolidator.stream_excel_file)
+STAGES = ["parse", "header", "frame", "ffill", "filters", "stream", "concat", "dtypes", "validation", "workbook", "save", "database"]
+
+
+def current_rss_bytes():
+    """Resident set size of this process in bytes, or None when it cannot be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Instrumentation:
+    """Collects structured per-stage events emitted by ExcelConsolidator.
+
+    Every event is a dict with the fields of EVENT_FIELDS: the stage name, the
+    sheet it applies to (None for whole-file stages), rows in/out, elapsed
+    milliseconds and the change of resident memory in MB (None when the RSS
+    cannot be read). ``callback``, when given, is called with each event as it
+    is recorded.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.events = []
+
+    def __getstate__(self):
+        # Sent to worker processes: they start with no events and cannot call back
+        return {"callback": None, "events": []}
+
+    @contextmanager
+    def stage(self, stage, sheet=None, rows_in=None):
+        """Time the enclosed block; the yielded event's ``rows_out`` can be set inside it"""
+        event = {"stage": stage, "sheet": sheet, "rows_in": rows_in, "rows_out": None}
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield event
+        finally:
+            event["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            rss_after = current_rss_bytes()
+            if rss_before is None or rss_after is None:
+                event["rss_delta_mb"] = None
+            else:
+                event["rss_delta_mb"] = round((rss_after - rss_before) / (1024 * 1024), 3)
+            self.record(event)
+
+    def record(self, event):
+        self.events.append(event)
+        if self.callback:
+            self.callback(event)
+
+    def drain(self):
+        """Return the recorded events and start a new, empty list"""
+        events, self.events = self.events, []
+        return events
+
+    def to_frame(self):
+        return pd.DataFrame(self.events, columns=EVENT_FIELDS)
+
+    def to_json(self):
+        return json.dumps(self.events, ensure_ascii=False, indent=2)
+
+    def to_csv(self):
+        buffer = io.StringIO()
+        self.to_frame().to_csv(buffer, index=False)
+        return buffer.getvalue()
+
+    def write(self, path):
+        """Write the events to ``path`` as JSON or CSV depending on its extension"""
+        text = self.to_csv() if str(path).lower().endswith(".csv") else self.to_json()
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            handle.write(text)
+
+    def sheet_breakdown(self):
+        """Milliseconds per sheet (rows) and stage (columns), plus a total column.
+
+        Whole-file stages such as concat or save are grouped under the "(libro)" row.
+        """
+        df = self.to_frame()
+        if df.empty:
+            return pd.DataFrame()
+        df["sheet"] = df["sheet"].fillna("(libro)")
+        breakdown = df.pivot_table(
+            index="sheet", columns="stage", values="elapsed_ms", aggfunc="sum", sort=False
+        )
+        breakdown = breakdown[[stage for stage in STAGES if stage in breakdown.columns]
+                              + [stage for stage in breakdown.columns if stage not in STAGES]]
+        breakdown["total"] = breakdown.sum(axis=1)
+        return breakdown
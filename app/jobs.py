@@ -0,0 +1,145 @@
+"""Background consolidation jobs shared by every session of the Streamlit app.
+
+A job runs in a thread pool so the script run that submitted it returns at once.
+The job keeps the uploaded bytes until it starts, the progress messages and the
+final result, so a page refresh (or another browser tab) can pick it up again by
+its ID. IDs are random, so users only see the jobs whose IDs they hold.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+FINISHED_STATES = (DONE, FAILED)
+
+
+class Job:
+    """State of one background job; read it through :meth:`snapshot`"""
+
+    def __init__(self, name, input_bytes):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.input_bytes = input_bytes
+        self.status = QUEUED
+        self.messages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def report(self, message):
+        """Progress callback handed to the task"""
+        with self._lock:
+            self.messages.append(message)
+
+    def snapshot(self):
+        """Consistent copy of the job state for the UI"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "name": self.name,
+                "status": self.status,
+                "messages": list(self.messages),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobQueue:
+    """Runs ``task(input_bytes, *args, progress_callback=..., **kwargs)`` jobs in background threads.
+
+    At most ``max_workers`` jobs run at the same time; the rest wait in the queue.
+    Finished jobs are kept for ``ttl_seconds`` so their result can still be
+    downloaded, and only the newest ``max_finished`` of them are kept in memory.
+    ``cleanup``, when given, is called with the result of every successful job
+    that is discarded or dropped (e.g. to delete its output file).
+    """
+
+    def __init__(self, max_workers=2, max_finished=20, ttl_seconds=3600, cleanup=None):
+        self.max_finished = max_finished
+        self.ttl_seconds = ttl_seconds
+        self.cleanup = cleanup
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="consolidation-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, input_bytes, task, *args, **kwargs):
+        """Queue a job and return its ID"""
+        job = Job(name, input_bytes)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, task, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        """Snapshot of the job, or None for an unknown or expired ID"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def discard(self, job_id):
+        """Forget a finished job and its result"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished_at is None:
+                return
+            del self._jobs[job_id]
+        self._cleanup(job)
+
+    def shutdown(self, wait=True):
+        """Stop the workers and clean up the results of every finished job"""
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.finished_at is not None]
+            self._jobs.clear()
+        for job in jobs:
+            self._cleanup(job)
+
+    def _cleanup(self, job):
+        if self.cleanup is not None and job.status == DONE:
+            self.cleanup(job.result)
+
+    def _run(self, job, task, args, kwargs):
+        with job._lock:
+            job.status = RUNNING
+            # From now on only the task holds the upload
+            input_bytes = job.input_bytes
+            job.input_bytes = None
+        result = None
+        error = None
+        try:
+            result = task(input_bytes, *args, progress_callback=job.report, **kwargs)
+        except Exception as e:
+            error = str(e)
+
+        with job._lock:
+            job.status = FAILED if error is not None else DONE
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+
+    def _prune(self):
+        """Drop expired finished jobs and the oldest ones beyond ``max_finished``.
+
+        Called with the lock held.
+        """
+        now = time.time()
+        # finished_at is set last, once the rest of the final state is in place
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at,
+        )
+        expired = [job for job in finished if now - job.finished_at > self.ttl_seconds]
+        excess = finished[: max(len(finished) - self.max_finished, 0)]
+        for job in expired + excess:
+            if self._jobs.pop(job.id, None) is not None:
+                self._cleanup(job)
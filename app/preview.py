@@ -0,0 +1,155 @@
+"""Indexed, paginated access to master_df for the preview of the Streamlit app.
+
+The indexes are built once per result (in the background job) so every filter
+change only runs binary searches: Fecha and Asiento are kept as sorted arrays plus
+the row positions that sort them, and Cuenta and Sheet_Origin as the row positions
+grouped by value. A filter returns the matching row positions and only the
+requested page of rows is materialized and sent to the browser.
+"""
+import numpy as np
+import pandas as pd
+
+from app.profiles import master_roles
+
+
+class _RangeIndex:
+    """Sorted numeric values of a column and the row positions that sort them"""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype="float64")
+        positions = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[positions], kind="stable")
+        self.positions = positions[order]
+        self.sorted_values = values[self.positions]
+
+    def between(self, low=None, high=None, high_inclusive=True):
+        """Row positions (unsorted) whose value is in ``[low, high]``; None is unbounded"""
+        start = 0 if low is None else np.searchsorted(self.sorted_values, low, side="left")
+        if high is None:
+            stop = len(self.sorted_values)
+        else:
+            stop = np.searchsorted(self.sorted_values, high, side="right" if high_inclusive else "left")
+        return self.positions[start:stop]
+
+    @property
+    def bounds(self):
+        if not len(self.sorted_values):
+            return None, None
+        return self.sorted_values[0], self.sorted_values[-1]
+
+
+class _ValueIndex:
+    """Row positions grouped by the distinct values of a column"""
+
+    def __init__(self, values):
+        codes, self.uniques = pd.factorize(values, sort=False)
+        self.order = np.argsort(codes, kind="stable")
+        self.sorted_codes = codes[self.order]
+
+    def positions(self, codes):
+        """Row positions (unsorted) holding any of the given value codes"""
+        slices = [
+            self.order[
+                np.searchsorted(self.sorted_codes, code, side="left"):
+                np.searchsorted(self.sorted_codes, code, side="right")
+            ]
+            for code in codes
+        ]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.intp)
+
+
+def _account_label(value):
+    """Account codes as text, without the ".0" left by float columns"""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class MasterIndex:
+    """Precomputed indexes over ``master_df`` for filtered, paginated previews.
+
+    The Fecha, Asiento and Cuenta (account code) columns are found with
+    :func:`app.profiles.master_roles`, so Sage names ("Asto.", "Subcuenta") work
+    too, plus Sheet_Origin. Missing columns simply cannot be filtered on.
+    """
+
+    def __init__(self, master_df):
+        self.master_df = master_df
+        columns = master_df.columns
+        roles = master_roles(columns)
+        self.fecha_col = roles.get("fecha")
+        self.asiento_col = roles.get("asiento")
+        self.account_col = roles.get("cuenta")
+        self.sheet_col = "Sheet_Origin" if "Sheet_Origin" in columns else None
+
+        self._fecha = None
+        if self.fecha_col is not None:
+            fechas = pd.to_datetime(master_df[self.fecha_col], errors="coerce")
+            # Nanoseconds as float, with NaT as NaN so it is left out of the index
+            self._fecha = _RangeIndex(fechas.astype("int64").where(fechas.notna()))
+        self._asiento = None
+        if self.asiento_col is not None:
+            self._asiento = _RangeIndex(pd.to_numeric(master_df[self.asiento_col], errors="coerce"))
+
+        self._accounts = None
+        if self.account_col is not None:
+            self._accounts = _ValueIndex(master_df[self.account_col])
+            labels = np.array([_account_label(value) for value in self._accounts.uniques], dtype=object)
+            # Account labels sorted as text, so a code prefix is one contiguous range
+            self._account_label_order = np.argsort(labels, kind="stable")
+            self._sorted_account_labels = labels[self._account_label_order]
+        self._sheets = _ValueIndex(master_df[self.sheet_col]) if self.sheet_col is not None else None
+
+    def __len__(self):
+        return len(self.master_df)
+
+    @property
+    def sheets(self):
+        """Distinct Sheet_Origin values in order of appearance"""
+        return [] if self._sheets is None else list(self._sheets.uniques)
+
+    @property
+    def fecha_bounds(self):
+        """Earliest and latest Fecha as Timestamps, or (None, None)"""
+        if self._fecha is None:
+            return None, None
+        low, high = self._fecha.bounds
+        if low is None:
+            return None, None
+        return pd.Timestamp(int(low)), pd.Timestamp(int(high))
+
+    def filter(self, fecha_from=None, fecha_to=None, asiento_from=None, asiento_to=None, account=None, sheets=None):
+        """Sorted row positions of master_df matching every given filter.
+
+        ``fecha_from``/``fecha_to`` are dates and include the whole last day,
+        ``asiento_from``/``asiento_to`` are inclusive numbers, ``account`` is a code
+        prefix ("572" matches 57200001...) and ``sheets`` a list of Sheet_Origin
+        values. None (or an empty list/text) leaves a filter out.
+        """
+        matches = []
+        if (fecha_from is not None or fecha_to is not None) and self._fecha is not None:
+            low = None if fecha_from is None else pd.Timestamp(fecha_from).normalize().value
+            high = None if fecha_to is None else (pd.Timestamp(fecha_to).normalize() + pd.Timedelta(days=1)).value
+            matches.append(self._fecha.between(low, high, high_inclusive=False))
+        if (asiento_from is not None or asiento_to is not None) and self._asiento is not None:
+            matches.append(self._asiento.between(asiento_from, asiento_to))
+        if account and self._accounts is not None:
+            prefix = str(account).strip()
+            start = np.searchsorted(self._sorted_account_labels, prefix, side="left")
+            stop = np.searchsorted(self._sorted_account_labels, prefix + "\U0010ffff", side="left")
+            matches.append(self._accounts.positions(self._account_label_order[start:stop]))
+        if sheets and self._sheets is not None:
+            codes = [code for code, sheet in enumerate(self._sheets.uniques) if sheet in set(sheets)]
+            matches.append(self._sheets.positions(codes))
+
+        if not matches:
+            return np.arange(len(self.master_df))
+        positions = np.sort(matches[0])
+        for other in matches[1:]:
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def page(self, positions, page, page_size):
+        """Rows of the 0-based ``page`` of ``positions``, keeping their master_df index"""
+        start = page * page_size
+        return self.master_df.iloc[positions[start:start + page_size]]
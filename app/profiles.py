@@ -0,0 +1,362 @@
+"""Column-mapping profiles for the libro diario exports of different accounting programs.
+
+A profile describes one export format by column role ("fecha", "asiento", "debe"...):
+
+* ``synonyms``: a regular expression per role matched against the header cells,
+  compiled once when the profile is created
+* ``required``: the roles a sheet must have to be consolidated; "fecha" and
+  "asiento" always are, since continuation rows are filled from them
+* ``total_roles``: the roles whose columns are checked for total/summary rows
+  (None checks every text column)
+* ``dtypes``: the kind each role is converted to ("date", "int" or "amount"); empty
+  keeps the values exactly as they were read, and a value that does not convert is
+  kept as read too
+* ``markers``: a regular expression for headers only this format uses; the "auto"
+  detection only picks a profile with markers when a header cell matches them
+
+``profile.resolve(columns)`` maps the roles to the columns of one sheet. It runs once
+per sheet. MASTER keeps the source headers unless the consolidator is created with
+``canonical_columns=True``, which renames the resolved columns to the A3 names in
+CANONICAL_COLUMNS ("Asto." becomes "Asiento", "Debe" becomes "Importe debe"...). Either
+way the modules working on MASTER (validation, preview, database) find the columns
+with :func:`master_roles`.
+"""
+import datetime
+import re
+
+import numpy as np
+import pandas as pd
+
+REQUIRED_ROLES = ("fecha", "asiento")
+
+DTYPE_KINDS = ("date", "int", "amount")
+
+# Column of every role in MASTER with canonical_columns: the A3 header names
+CANONICAL_COLUMNS = {
+    "fecha": "Fecha",
+    "asiento": "Asiento",
+    "apunte": "Apunte",
+    "concepto": "Concepto",
+    "documento": "Documento",
+    "descripcion": "Descripción de la cuenta",
+    "cuenta": "Cuenta",
+    "contrapartida": "Contrapartida",
+    "debe": "Importe debe",
+    "haber": "Importe haber",
+}
+
+# Amounts written as text with a decimal comma ("1.234,56", "-12,5")
+_DECIMAL_COMMA = re.compile(r"^-?[\d.\s]*,\d*$")
+
+
+class ColumnMapping:
+    """Columns of one sheet by role, as resolved by :meth:`ColumnProfile.resolve`"""
+
+    def __init__(self, profile, columns_by_role):
+        self.profile = profile
+        self.columns_by_role = columns_by_role
+
+    def get(self, role):
+        return self.columns_by_role.get(role)
+
+    @property
+    def fecha_col(self):
+        return self.get("fecha")
+
+    @property
+    def asiento_col(self):
+        return self.get("asiento")
+
+    @property
+    def complete(self):
+        """Whether every required role of the profile has a column"""
+        return all(self.get(role) is not None for role in self.profile.required)
+
+    @property
+    def total_columns(self):
+        """Columns checked for total rows, or None to check every text column"""
+        if self.profile.total_roles is None:
+            return None
+        return [self.get(role) for role in self.profile.total_roles if self.get(role) is not None]
+
+    def __len__(self):
+        return len(self.columns_by_role)
+
+    def canonical(self, columns):
+        """Return ``(renames, mapping)`` to rename the resolved columns to CANONICAL_COLUMNS.
+
+        A column keeps its name when its canonical name is already taken by another
+        column of the sheet. ``mapping`` maps the roles to the renamed columns.
+        """
+        taken = set(columns)
+        renames = {}
+        for role, col in self.columns_by_role.items():
+            name = CANONICAL_COLUMNS.get(role, col)
+            if name != col and name not in taken:
+                renames[col] = name
+                taken.add(name)
+        columns_by_role = {role: renames.get(col, col) for role, col in self.columns_by_role.items()}
+        return renames, ColumnMapping(self.profile, columns_by_role)
+
+
+class ColumnProfile:
+    """Header synonyms, required columns, total columns and dtypes of one export format"""
+
+    def __init__(
+        self, name, label, synonyms, required=REQUIRED_ROLES, total_roles=None, dtypes=None, markers=None
+    ):
+        required = tuple(dict.fromkeys(REQUIRED_ROLES + tuple(required)))
+        missing = [role for role in required if role not in synonyms]
+        if missing:
+            raise ValueError(f"El perfil {name} no define las columnas requeridas: {missing}")
+        unknown = sorted(set((dtypes or {}).values()) - set(DTYPE_KINDS))
+        if unknown:
+            raise ValueError(f"Tipos no soportados en el perfil {name}: {unknown}")
+
+        self.name = name
+        self.label = label
+        self.synonyms = dict(synonyms)
+        self.required = required
+        self.total_roles = None if total_roles is None else tuple(total_roles)
+        self.dtypes = dict(dtypes or {})
+        self.patterns = {role: re.compile(pattern, re.IGNORECASE) for role, pattern in self.synonyms.items()}
+        self.markers = None if markers is None else re.compile(markers, re.IGNORECASE)
+
+    def __repr__(self):
+        return f"ColumnProfile({self.name!r})"
+
+    def settings(self):
+        """Everything that changes the extracted rows, for cache keys and fingerprints"""
+        return (
+            self.name,
+            tuple(self.synonyms.items()),
+            self.required,
+            self.total_roles,
+            tuple(self.dtypes.items()),
+            None if self.markers is None else self.markers.pattern,
+        )
+
+    def header_mask(self, texts, found=None):
+        """Boolean array of the rows having a cell for every required role.
+
+        ``texts`` holds one string Series per column of the searched window, with
+        empty cells as "". ``found`` caches the rows matched by each synonym
+        pattern, so profiles sharing one ("fecha") scan the columns only once.
+        """
+        found = {} if found is None else found
+        mask = np.ones(len(texts[0]) if texts else 0, dtype=bool)
+        for role in self.required:
+            pattern = self.patterns[role]
+            if pattern.pattern not in found:
+                rows = np.zeros(len(mask), dtype=bool)
+                for text in texts:
+                    rows |= text.str.contains(pattern).to_numpy()
+                found[pattern.pattern] = rows
+            mask &= found[pattern.pattern]
+        return mask
+
+    def is_header(self, values):
+        """Whether a row of cell values has a cell for every required role"""
+        cells = [str(val) for val in values if val is not None and not pd.isna(val)]
+        return all(
+            any(self.patterns[role].search(cell) for cell in cells) for role in self.required
+        )
+
+    def has_markers(self, columns):
+        """Whether a header cell matches ``markers`` (always True without markers)"""
+        if self.markers is None:
+            return True
+        return any(isinstance(col, str) and self.markers.search(col) for col in columns)
+
+    def resolve(self, columns):
+        """Map every role to the first column matching its synonyms.
+
+        Roles are resolved in the order they are defined and a column takes a
+        single role, so "Descripción de la cuenta" is not also taken as "cuenta"
+        when the profile lists "descripcion" first.
+        """
+        columns_by_role = {}
+        taken = set()
+        for role, pattern in self.patterns.items():
+            for position, col in enumerate(columns):
+                if position not in taken and isinstance(col, str) and pattern.search(col):
+                    columns_by_role[role] = col
+                    taken.add(position)
+                    break
+        return ColumnMapping(self, columns_by_role)
+
+    def row_converters(self, columns, mapping):
+        """``(position, converter)`` pairs to apply ``dtypes`` to rows with ``columns``, value by value"""
+        converters = []
+        for role, kind in self.dtypes.items():
+            col = mapping.get(role)
+            if col is not None and col in columns:
+                converters.append((list(columns).index(col), _SCALAR_CONVERTERS[kind]))
+        return converters
+
+    def convert_dtypes(self, df, mapping):
+        """Convert the resolved columns of ``df`` to the kinds in ``dtypes`` (in place).
+
+        Values that do not convert ("A-001" in an int column) are kept as read
+        instead of becoming missing.
+        """
+        for role, kind in self.dtypes.items():
+            col = mapping.get(role)
+            if col is None or col not in df.columns:
+                continue
+            values = df[col]
+            if kind == "date":
+                if pd.api.types.is_datetime64_any_dtype(values):
+                    continue
+                converted = pd.to_datetime(values, dayfirst=True, errors="coerce")
+            elif kind == "int":
+                converted = pd.to_numeric(values, errors="coerce")
+            else:
+                converted = parse_amounts(values)
+            kept = converted.isna() & values.notna()
+            if kept.any():
+                converted = converted.astype(object).where(~kept, values)
+            df[col] = converted
+        return df
+
+
+def parse_date(value):
+    """One cell of a "date" column, like convert_dtypes: text is read day first, and kept when it is no date"""
+    if value is None or isinstance(value, (datetime.date, datetime.datetime)):
+        return value
+    parsed = pd.to_datetime(value, dayfirst=True, errors="coerce")
+    return value if pd.isna(parsed) else parsed.to_pydatetime()
+
+
+def parse_int(value):
+    """One cell of an "int" column: a number, or the value as read when it is not numeric"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    number = pd.to_numeric(value, errors="coerce")
+    return value if pd.isna(number) else number.item()
+
+
+def parse_amount(value):
+    """One cell of an "amount" column, reading text like "1.234,56" with a decimal comma"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    if _DECIMAL_COMMA.match(text):
+        text = re.sub(r"[.\s]", "", text).replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return value
+
+
+_SCALAR_CONVERTERS = {"date": parse_date, "int": parse_int, "amount": parse_amount}
+
+
+def parse_amounts(values):
+    """Numbers of an amount column, reading text like "1.234,56" with a decimal comma"""
+    if values.dtype != "object":
+        return pd.to_numeric(values, errors="coerce")
+    is_text = values.map(lambda val: isinstance(val, str)).to_numpy(dtype=bool)
+    if is_text.any():
+        text = values[is_text].str.strip()
+        comma = text.str.match(_DECIMAL_COMMA)
+        text = text.where(
+            ~comma, text.str.replace(r"[.\s]", "", regex=True).str.replace(",", ".", regex=False)
+        )
+        values = values.copy()
+        values[is_text] = text
+    return pd.to_numeric(values, errors="coerce")
+
+
+# A3 (Wolters Kluwer): native Excel dates and numbers, "Importe debe/haber" columns.
+# No dtype conversion, so its MASTER keeps every value exactly as read.
+A3_PROFILE = ColumnProfile(
+    "a3",
+    "A3",
+    {
+        "fecha": r"fecha",
+        "asiento": r"asiento",
+        "apunte": r"apunte",
+        "concepto": r"concepto",
+        "documento": r"documento",
+        "descripcion": r"descripci[oó]n",
+        "cuenta": r"^\s*cuenta",
+        "debe": r"importe debe",
+        "haber": r"importe haber",
+    },
+)
+
+# Sage 50 / ContaPlus: "Asiento" or "Asto.", "Subcuenta", plain "Debe"/"Haber". Their
+# listings are often exported with dates and amounts as text ("31/01/2020", "1.234,56").
+# Plain "Debe"/"Haber" also appear in other layouts, so "auto" only picks Sage for a
+# header with one of its own columns and keeps every other sheet on A3.
+SAGE_PROFILE = ColumnProfile(
+    "sage",
+    "Sage / ContaPlus",
+    {
+        "fecha": r"fecha",
+        "asiento": r"asiento|\basto\b",
+        "concepto": r"concepto",
+        "documento": r"documento|factura",
+        "descripcion": r"descripci[oó]n|t[ií]tulo",
+        "cuenta": r"subcuenta|^\s*cuenta",
+        "contrapartida": r"contrapartida",
+        "debe": r"^\s*debe",
+        "haber": r"^\s*haber",
+    },
+    total_roles=("concepto", "descripcion", "cuenta"),
+    dtypes={"fecha": "date", "asiento": "int", "debe": "amount", "haber": "amount"},
+    markers=r"\basto\b|subcuenta|t[ií]tulo|contrapartida",
+)
+
+# Tried in this order by the "auto" profile; on a tie the first one wins
+PROFILES = {profile.name: profile for profile in (A3_PROFILE, SAGE_PROFILE)}
+
+PROFILE_CHOICES = ("auto",) + tuple(PROFILES)
+
+
+def get_profiles(profile):
+    """Profiles tried on each sheet for a ``profile`` setting: "auto", a name or a ColumnProfile"""
+    if isinstance(profile, ColumnProfile):
+        return [profile]
+    if profile == "auto":
+        return list(PROFILES.values())
+    if profile not in PROFILES:
+        raise ValueError(f"Perfil de columnas no soportado: {profile}")
+    return [PROFILES[profile]]
+
+
+def best_profile(profiles, header_values):
+    """The profile resolving the most columns of a header row, the first one on a tie.
+
+    With several profiles, one with ``markers`` is only a candidate when the header
+    has a marker column.
+    """
+    best = None
+    best_score = -1
+    for profile in profiles:
+        if len(profiles) > 1 and not profile.has_markers(header_values):
+            continue
+        mapping = profile.resolve(header_values)
+        if mapping.complete and len(mapping) > best_score:
+            best, best_score = profile, len(mapping)
+    return best
+
+
+def master_roles(columns, profiles=None):
+    """Map the roles to the columns of a MASTER frame.
+
+    The canonical names of CANONICAL_COLUMNS come first; roles without one are
+    resolved with the synonyms of ``profiles`` (every known profile by default), so
+    frames built elsewhere ("Asto.", "Debe"...) work too. Non-string column names
+    are ignored.
+    """
+    columns = [col for col in columns if isinstance(col, str)]
+    roles = {role: name for role, name in CANONICAL_COLUMNS.items() if name in columns}
+    taken = set(roles.values())
+    for profile in profiles or PROFILES.values():
+        for role, col in profile.resolve(columns).columns_by_role.items():
+            if role not in roles and col not in taken:
+                roles[role] = col
+                taken.add(col)
+    return roles
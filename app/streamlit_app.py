@@ -1,9 +1,27 @@
 import streamlit as st
+from functools import partial
 from pathlib import Path
-import io
+import atexit
 import os
+import shutil
 import sys
-from app.consolidator import ExcelConsolidator
+import tempfile
+import threading
+# Only light modules are imported here so the first page renders quickly; the
+# processing modules (pandas, numpy, openpyxl) are imported on the first upload
+from app.formats import COLUMNAR_FORMATS, MERGE_FORMATS, available_formats
+from app.jobs import FAILED, FINISHED_STATES, QUEUED, JobQueue
+from app.tasks import consolidate_upload, merge_uploads
+
+PREVIEW_PAGE_SIZES = [25, 50, 100, 500]
+
+# Labels of the column-mapping profiles in app.profiles (imported with pandas, so
+# not at page load)
+PROFILE_LABELS = {
+    "auto": "Detectar automáticamente",
+    "a3": "A3",
+    "sage": "Sage / ContaPlus",
+}
 
 
 def resource_path(relative_path):
@@ -15,6 +33,289 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def _import_processing_modules():
+    import app.consolidator  # noqa: F401
+    import app.preview  # noqa: F401
+
+
+@st.cache_resource
+def preload_processing_modules():
+    """Import the processing modules in a background thread, once per server.
+
+    Called as soon as a file is uploaded, so the imports overlap with choosing the
+    options instead of delaying the first page or the processing.
+    """
+    threading.Thread(target=_import_processing_modules, name="preload-imports", daemon=True).start()
+
+
+@st.cache_resource
+def get_output_dir():
+    """Temporary folder for the consolidated files, removed when the app exits"""
+    output_dir = tempfile.mkdtemp(prefix="libro-diario-")
+    atexit.register(shutil.rmtree, output_dir, ignore_errors=True)
+    return output_dir
+
+
+@st.cache_resource
+def get_job_queue():
+    """Background job queue shared by every session of the app.
+
+    LIBRO_DIARIO_JOB_WORKERS sets how many files are consolidated at the same time.
+    """
+    return JobQueue(
+        max_workers=int(os.environ.get("LIBRO_DIARIO_JOB_WORKERS", "2")),
+        cleanup=remove_output_file,
+    )
+
+
+def remove_output_file(result):
+    """Delete the temporary output file of a finished job"""
+    if result["output_path"]:
+        try:
+            os.remove(result["output_path"])
+        except FileNotFoundError:
+            pass
+
+
+@st.cache_resource
+def get_worker_pool():
+    """Warm worker processes shared by every session of the app.
+
+    The consolidation runs in these processes instead of the server's threads, so
+    parsing a big file does not stall the other sessions. They are started on the
+    first upload, import the processing modules once and keep their result cache
+    between jobs. LIBRO_DIARIO_JOB_WORKERS sets how many there are.
+    """
+    from app.tasks import warm_up_worker
+    from app.worker_pool import WorkerPool
+
+    pool = WorkerPool(
+        max_workers=int(os.environ.get("LIBRO_DIARIO_JOB_WORKERS", "2")),
+        initializer=warm_up_worker,
+    )
+    atexit.register(pool.shutdown, wait=False)
+    return pool
+
+
+def run_in_worker(input_data, task, *args, progress_callback=None, **kwargs):
+    """Run a job of app.tasks in the worker pool, writing its output to get_output_dir()"""
+    result = get_worker_pool().run(
+        task, input_data, get_output_dir(), *args, progress_callback=progress_callback, **kwargs
+    )
+    events = result.pop("stage_events")
+    instrumentation = None
+    if events is not None:
+        from app.instrumentation import Instrumentation
+
+        instrumentation = Instrumentation()
+        for event in events:
+            instrumentation.record(event)
+    result["instrumentation"] = instrumentation
+    return result
+
+
+def submit_job(name, input_data, task, *args, **kwargs):
+    """Queue a job of app.tasks for this page, replacing its previous result"""
+    previous_job_id = st.query_params.get("job")
+    if previous_job_id:
+        get_job_queue().discard(previous_job_id)
+    job_id = get_job_queue().submit(name, input_data, run_in_worker, task, *args, **kwargs)
+    # The job ID in the URL lets a refreshed page find the job again
+    st.query_params["job"] = job_id
+
+
+@st.fragment(run_every=1)
+def show_job_progress(job_queue, job_id):
+    """Poll a queued or running job; once it finishes the whole page is rerun to show it"""
+    job = job_queue.get(job_id)
+    if job is None or job["status"] in FINISHED_STATES:
+        st.rerun()
+
+    if job["status"] == QUEUED:
+        st.info(f"⏳ **{job['name']}** está en cola, esperando a que terminen otros archivos...")
+    else:
+        st.info(f"⚙️ Procesando **{job['name']}**...")
+    for message in job["messages"]:
+        st.write(message)
+
+
+def show_job(job_queue, job_id):
+    """Progress, result preview and download of a background job"""
+    st.markdown("---")
+    job = job_queue.get(job_id)
+    if job is None:
+        st.warning("El procesamiento ya no está disponible; vuelve a procesar el archivo")
+        del st.query_params["job"]
+        return
+
+    if job["status"] not in FINISHED_STATES:
+        show_job_progress(job_queue, job_id)
+        return
+
+    for message in job["messages"]:
+        st.write(message)
+
+    if job["status"] == FAILED:
+        st.error(f"❌ Ha ocurrido un error: {job['error']}")
+    else:
+        result = job["result"]
+        if result["output_path"]:
+            # Show preview of master data
+            if result["master_index"] is not None:
+                show_master_preview(result["master_index"], job_id)
+            if result.get("merge_summary"):
+                st.subheader("Entradas por archivo")
+                rows_per_file = result["merge_summary"]["rows_per_file"]
+                st.dataframe(
+                    {"Archivo": list(rows_per_file), "Entradas": list(rows_per_file.values())},
+                    hide_index=True,
+                )
+
+            st.success("✅ ¡Procesamiento completado exitosamente!")
+
+            # Download button
+            st.download_button(
+                label="💾 Descargar Archivo Consolidado",
+                # Read from disk only when the button is clicked
+                data=partial(Path(result["output_path"]).read_bytes),
+                file_name=result["output_filename"],
+                mime=result["output_mime"],
+            )
+
+        if result.get("validation") is not None:
+            show_validation(result["validation"])
+
+        errors = result.get("merge_summary", {}).get("errors", {})
+        if errors:
+            st.warning(f"⚠️ {len(errors)} archivos no se pudieron procesar y se han omitido")
+
+        if result["instrumentation"] is not None:
+            show_instrumentation(result["instrumentation"], Path(job["name"]).stem)
+
+    if st.button("🗑️ Descartar resultado"):
+        job_queue.discard(job_id)
+        del st.query_params["job"]
+        st.rerun()
+
+
+def show_master_preview(master_index, job_id):
+    """Filtered, paginated view of MASTER; only the current page is sent to the browser"""
+    st.subheader("Vista Previa de Datos Maestros")
+    # Widget keys include the job ID so a new result starts with clean filters
+    key = f"preview_{job_id}"
+
+    col1, col2, col3 = st.columns(3)
+    fecha_from = fecha_to = None
+    fecha_min, fecha_max = master_index.fecha_bounds
+    with col1:
+        if fecha_min is not None:
+            fechas = st.date_input(
+                "Fecha",
+                value=(fecha_min.date(), fecha_max.date()),
+                min_value=fecha_min.date(),
+                max_value=fecha_max.date(),
+                format="DD/MM/YYYY",
+                key=f"{key}_fecha",
+            )
+            # While the range is being picked only the start date is set
+            if len(fechas) == 2 and fechas != (fecha_min.date(), fecha_max.date()):
+                fecha_from, fecha_to = fechas
+    with col2:
+        asiento_from = st.number_input("Asiento desde", value=None, step=1, key=f"{key}_asiento_from")
+        asiento_to = st.number_input("Asiento hasta", value=None, step=1, key=f"{key}_asiento_to")
+    with col3:
+        account = st.text_input(
+            "Cuenta", key=f"{key}_cuenta", help="Código de cuenta o su inicio (por ejemplo, 572)"
+        )
+        sheets = st.multiselect("Hoja", options=master_index.sheets, key=f"{key}_hoja")
+
+    positions = master_index.filter(
+        fecha_from=fecha_from,
+        fecha_to=fecha_to,
+        asiento_from=asiento_from,
+        asiento_to=asiento_to,
+        account=account,
+        sheets=sheets,
+    )
+    if not len(positions):
+        st.info("Ninguna entrada coincide con los filtros")
+        return
+
+    col1, col2 = st.columns(2)
+    with col2:
+        page_size = st.selectbox("Filas por página", PREVIEW_PAGE_SIZES, key=f"{key}_page_size")
+    pages = (len(positions) - 1) // page_size + 1
+    with col1:
+        # The page count is part of the key: a new filter goes back to the first page
+        page = st.number_input("Página", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page_{pages}")
+
+    from app.exporters import normalize_master_dtypes
+
+    # Arrow (used by st.dataframe) rejects columns mixing text and numbers
+    st.dataframe(normalize_master_dtypes(master_index.page(positions, page - 1, page_size)))
+    first = (page - 1) * page_size + 1
+    st.caption(
+        f"Filas {first}–{min(first + page_size - 1, len(positions))} de {len(positions)} "
+        f"que coinciden ({len(master_index)} en total), página {page} de {pages}"
+    )
+
+
+def select_profile():
+    """Selector of the column-mapping profile of the uploaded files"""
+    return st.selectbox(
+        "Formato del libro diario",
+        options=list(PROFILE_LABELS),
+        format_func=PROFILE_LABELS.get,
+        help="Programa contable que generó el archivo. Con la detección automática se elige "
+        "en cada hoja el formato que mejor encaja con sus encabezados",
+    )
+
+
+def show_validation(validation):
+    """Summary of the asiento checks, with the detail tables of the failed ones"""
+    summary = validation.summary()
+    with st.expander("🔎 Validación de asientos", expanded=not validation.ok):
+        if validation.ok:
+            st.success(f"Los {summary['asientos']} asientos cuadran, sin duplicados entre hojas ni fechas fuera de su mes")
+        for label in validation.skipped_labels():
+            st.warning(f"No se pudo comprobar: {label}")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Asientos descuadrados", summary["unbalanced_asientos"])
+        col2.metric("Asientos en varias hojas", summary["cross_sheet_asientos"])
+        col3.metric("Filas con fecha fuera de su mes", summary["date_mismatch_rows"])
+        for title, details in validation.sections():
+            if not details.empty:
+                st.markdown(f"**{title}**")
+                st.dataframe(details, hide_index=True)
+
+
+def show_instrumentation(instrumentation, input_stem):
+    """Per-sheet breakdown of the processing time, with JSON/CSV downloads of the events"""
+    with st.expander("⏱️ Métricas de rendimiento", expanded=True):
+        if not instrumentation.events:
+            st.info("No hay métricas: el resultado se recuperó de la caché")
+            return
+        st.markdown("Milisegundos por hoja y etapa")
+        st.dataframe(instrumentation.sheet_breakdown().round(1))
+        st.markdown("Eventos (filas de entrada/salida, tiempo y variación de memoria RSS)")
+        st.dataframe(instrumentation.to_frame())
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                label="Descargar métricas (JSON)",
+                data=instrumentation.to_json(),
+                file_name=f"{input_stem}_metricas.json",
+                mime="application/json",
+            )
+        with col2:
+            st.download_button(
+                label="Descargar métricas (CSV)",
+                data=instrumentation.to_csv(),
+                file_name=f"{input_stem}_metricas.csv",
+                mime="text/csv",
+            )
+
+
 def main():
     # Handle favicon with fallback
     favicon_path = resource_path("assets/blat_favicon.png")
@@ -49,8 +350,6 @@ def main():
     
     st.markdown("---")
 
-    consolidator = ExcelConsolidator()
-
     # Instructions section (collapsible)
     with st.expander("📋 Instrucciones", expanded=False):
         st.markdown("""
@@ -65,63 +364,140 @@ def main():
         4. **Descarga** el archivo procesado con los datos consolidados
         
         **Nota**: Las hojas originales se conservan, y se añade una nueva hoja 'MASTER' al principio.
+
+        **Varios archivos**: si subes varios archivos (por ejemplo, las empresas de un grupo), sus entradas
+        se unen en una única hoja 'MASTER' con la columna 'File_Origin' indicando el archivo de cada fila.
         """)
 
     # File upload section
     st.subheader("📁 Selección de Archivo")
 
-    uploaded_file = st.file_uploader(
-        "Selecciona un archivo Excel (formato A3)",
+    uploaded_files = st.file_uploader(
+        "Selecciona uno o varios archivos Excel (formato A3)",
         type=["xlsx", "xls"],
-        help="Selecciona el archivo Excel con formato A3 que contiene el libro diario con cuentas contables separadas por mes",
+        accept_multiple_files=True,
+        help="Selecciona el archivo Excel con formato A3 que contiene el libro diario con cuentas contables separadas por mes. "
+        "Con varios archivos (por ejemplo, las empresas de un grupo) se genera una única hoja MASTER",
     )
 
-    if uploaded_file is not None:
+    if uploaded_files:
+        preload_processing_modules()
+        # Start the worker processes while the options are chosen
+        get_worker_pool()
+
+    if len(uploaded_files) > 1:
+        st.success(f"**{len(uploaded_files)}** archivos subidos")
+
+        merge_labels = {"xlsx": "Excel (.xlsx), solo la hoja MASTER", "csv": COLUMNAR_FORMATS["csv"]["label"]}
+        output_format = st.selectbox(
+            "Formato de salida",
+            options=list(MERGE_FORMATS),
+            format_func=merge_labels.get,
+            help="Las filas de todos los archivos se unen en MASTER con las columnas File_Origin y Sheet_Origin",
+        )
+        profile = select_profile()
+        show_metrics = st.checkbox(
+            "Mostrar métricas de rendimiento",
+            value=False,
+            help="Tiempo, filas y memoria de cada etapa del procesamiento, por hoja",
+        )
+
+        if output_format == "xlsx":
+            output_filename = "consolidado_grupo.xlsx"
+            output_mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        else:
+            output_filename = "consolidado_grupo.csv"
+            output_mime = COLUMNAR_FORMATS["csv"]["mime"]
+
+        st.info(f"El archivo de salida será: **{output_filename}**")
+
+        if st.button("🚀 Procesar Archivos", type="primary"):
+            submit_job(
+                f"{len(uploaded_files)} archivos",
+                [(uploaded.name, uploaded.getvalue()) for uploaded in uploaded_files],
+                merge_uploads,
+                output_format=output_format,
+                output_filename=output_filename,
+                output_mime=output_mime,
+                show_metrics=show_metrics,
+                profile=profile,
+            )
+    elif uploaded_files:
+        uploaded_file = uploaded_files[0]
         st.success(f"Archivo subido: **{uploaded_file.name}**")
 
+        # Output options
+        format_labels = {"xlsx": "Excel (.xlsx)"}
+        format_labels.update({fmt: COLUMNAR_FORMATS[fmt]["label"] for fmt in available_formats()})
+        output_format = st.selectbox(
+            "Formato de salida",
+            options=list(format_labels),
+            format_func=format_labels.get,
+            help="Parquet, Feather y CSV contienen solo los datos de MASTER, con tipos normalizados",
+        )
+        profile = select_profile()
+        include_original_sheets = True
+        preserve_format = False
+        if output_format == "xlsx":
+            include_original_sheets = st.checkbox(
+                "Incluir las hojas originales",
+                value=True,
+                help="Desmárcalo si solo necesitas la hoja MASTER (más rápido)",
+            )
+            if include_original_sheets and uploaded_file.name.lower().endswith(".xlsx"):
+                preserve_format = st.checkbox(
+                    "Conservar el formato de las hojas originales",
+                    value=False,
+                    help="Copia las hojas originales sin modificarlas (formatos, anchos de columna) y solo genera la hoja MASTER",
+                )
+
+        validate = st.checkbox(
+            "Validar asientos",
+            value=False,
+            help="Comprueba que cada asiento cuadre (Debe = Haber), que no aparezca en varias hojas "
+            "y que su fecha corresponda al mes de la hoja; en Excel se añade la hoja VALIDATION "
+            "(con \"Conservar el formato\" solo se muestra el informe, sin hoja VALIDATION)",
+        )
+        show_metrics = st.checkbox(
+            "Mostrar métricas de rendimiento",
+            value=False,
+            help="Tiempo, filas y memoria de cada etapa del procesamiento, por hoja",
+        )
+
         # Generate output filename
         input_path = Path(uploaded_file.name)
-        output_filename = f"{input_path.stem}_consolidated{input_path.suffix}"
+        if output_format == "xlsx":
+            output_filename = f"{input_path.stem}_consolidated.xlsx"
+            output_mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        else:
+            output_filename = f"{input_path.stem}_consolidated{COLUMNAR_FORMATS[output_format]['extension']}"
+            output_mime = COLUMNAR_FORMATS[output_format]["mime"]
 
         st.info(f"El archivo de salida será: **{output_filename}**")
 
-        # Process button
+        # Process button: the file is consolidated in the background job queue
         if st.button("🚀 Procesar Archivo", type="primary"):
-            with st.spinner("Procesando archivo Excel..."):
-                try:
-                    # Read file bytes
-                    file_bytes = uploaded_file.read()
-
-                    # Process the file
-                    output_workbook, master_df = consolidator.process_excel_file(
-                        file_bytes, uploaded_file.name, progress_callback=st.write
-                    )
-
-                    if output_workbook:
-                        # Show preview of master data
-                        if master_df is not None:
-                            st.subheader("Vista Previa de Datos Maestros")
-                            st.dataframe(master_df.head(10))
-                        # Save to bytes for download
-                        output_buffer = io.BytesIO()
-                        output_workbook.save(output_buffer)
-                        output_buffer.seek(0)
-
-                        st.success("✅ ¡Procesamiento completado exitosamente!")
-
-                        # Download button
-                        st.download_button(
-                            label="💾 Descargar Archivo Consolidado",
-                            data=output_buffer.getvalue(),
-                            file_name=output_filename,
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        )
-
-                except Exception as e:
-                    st.error(f"❌ Ha ocurrido un error: {str(e)}")
+            submit_job(
+                uploaded_file.name,
+                uploaded_file.getvalue(),
+                consolidate_upload,
+                uploaded_file.name,
+                output_format=output_format,
+                output_filename=output_filename,
+                output_mime=output_mime,
+                include_original_sheets=include_original_sheets,
+                preserve_format=preserve_format,
+                show_metrics=show_metrics,
+                validate=validate,
+                profile=profile,
+            )
     else:
         st.info("👆 Por favor sube un archivo Excel para comenzar")
 
+    job_id = st.query_params.get("job")
+    if job_id:
+        show_job(get_job_queue(), job_id)
+
     # Add footer section with close button
     st.markdown("---")
     
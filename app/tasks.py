@@ -0,0 +1,162 @@
+"""Consolidation jobs of the Streamlit app, run in the warm worker processes.
+
+Every worker imports the processing modules once (:func:`warm_up_worker`) and keeps
+its own result cache, so a repeated upload served by the same worker is answered
+from memory; set LIBRO_DIARIO_CACHE_DIR to share results between workers (and
+restarts) on disk. Tasks write their output to a file in ``output_dir`` and return
+a picklable dict for the job: the output path, the preview index of master_df,
+the validation report and the instrumentation events.
+
+This module is imported by the page script, so pandas & co. are only imported
+inside the functions.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+# Per-process ResultCache, created on first use by result_cache()
+_result_cache = None
+
+
+def result_cache():
+    """Result cache of this process, configured by the LIBRO_DIARIO_CACHE_* variables"""
+    global _result_cache
+    if _result_cache is None:
+        from app.cache import ResultCache
+
+        _result_cache = ResultCache(
+            max_entries=int(os.environ.get("LIBRO_DIARIO_CACHE_ENTRIES", "8")),
+            cache_dir=os.environ.get("LIBRO_DIARIO_CACHE_DIR"),
+            max_disk_bytes=int(os.environ.get("LIBRO_DIARIO_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+            max_memory_bytes=int(os.environ.get("LIBRO_DIARIO_CACHE_MEMORY_MB", "256")) * 1024 * 1024,
+        )
+    return _result_cache
+
+
+def warm_up_worker():
+    """Initializer of the worker processes: import the processing modules and create the cache"""
+    import app.consolidator
+    import app.preview  # noqa: F401
+
+    # Importing the read engine is deferred by pandas until the first workbook
+    if app.consolidator.calamine_available():
+        import python_calamine  # noqa: F401
+    result_cache()
+
+
+def _new_output_path(output_dir, output_filename):
+    handle, output_path = tempfile.mkstemp(suffix=Path(output_filename).suffix, dir=output_dir)
+    os.close(handle)
+    return output_path
+
+
+def consolidate_upload(
+    file_bytes,
+    output_dir,
+    filename,
+    output_format,
+    output_filename,
+    output_mime,
+    include_original_sheets=True,
+    preserve_format=False,
+    show_metrics=False,
+    validate=False,
+    profile="auto",
+    progress_callback=None,
+):
+    """Consolidate one uploaded file into a temporary file in ``output_dir``.
+
+    The output is written straight to disk instead of a BytesIO, so no full-size
+    copy of it is kept in memory; the download button reads it only when clicked.
+    The preview indexes of master_df are built here too, off the server process.
+    """
+    from app.consolidator import ExcelConsolidator
+    from app.instrumentation import Instrumentation
+    from app.preview import MasterIndex
+
+    instrumentation = Instrumentation() if show_metrics else None
+    consolidator = ExcelConsolidator(
+        cache=result_cache(),
+        copy_original_sheets=include_original_sheets,
+        output_engine="package" if preserve_format else "openpyxl",
+        instrumentation=instrumentation,
+        validate=validate,
+        profile=profile,
+    )
+
+    output_path = _new_output_path(output_dir, output_filename)
+    try:
+        if output_format == "xlsx":
+            # Process the file (repeated uploads are served from the cache)
+            master_df = consolidator.consolidate_to_file(
+                file_bytes, filename, output_path, progress_callback=progress_callback
+            )
+        else:
+            # Only the MASTER data is needed: no workbook is built
+            master_df = consolidator.export_master(
+                file_bytes, filename, output_path,
+                fmt=output_format, progress_callback=progress_callback,
+            )
+    except Exception:
+        os.remove(output_path)
+        raise
+    if master_df is None:
+        os.remove(output_path)
+        output_path = None
+
+    return {
+        "output_path": output_path,
+        "master_index": MasterIndex(master_df) if master_df is not None else None,
+        "validation": consolidator.validation,
+        "output_filename": output_filename,
+        "output_mime": output_mime,
+        # Instrumentation objects drop their events when pickled; the events travel as is
+        "stage_events": instrumentation.events if instrumentation is not None else None,
+    }
+
+
+def merge_uploads(
+    files,
+    output_dir,
+    output_format,
+    output_filename,
+    output_mime,
+    show_metrics=False,
+    profile="auto",
+    progress_callback=None,
+):
+    """Merge several uploaded files into one MASTER in a temporary file in ``output_dir``.
+
+    ``files`` is a list of ``(filename, file_bytes)``. LIBRO_DIARIO_MERGE_WORKERS sets
+    how many files are processed in parallel (by default, one per CPU).
+    """
+    from app.consolidator import ExcelConsolidator
+    from app.instrumentation import Instrumentation
+
+    instrumentation = Instrumentation() if show_metrics else None
+    consolidator = ExcelConsolidator(
+        workers=int(os.environ.get("LIBRO_DIARIO_MERGE_WORKERS", os.cpu_count() or 1)),
+        instrumentation=instrumentation,
+        profile=profile,
+    )
+
+    output_path = _new_output_path(output_dir, output_filename)
+    try:
+        summary = consolidator.merge_files(
+            files, output_path, fmt=output_format, progress_callback=progress_callback
+        )
+    except Exception:
+        os.remove(output_path)
+        raise
+    if not summary["master_rows"]:
+        os.remove(output_path)
+        output_path = None
+
+    return {
+        "output_path": output_path,
+        "master_index": None,
+        "merge_summary": summary,
+        "output_filename": output_filename,
+        "output_mime": output_mime,
+        "stage_events": instrumentation.events if instrumentation is not None else None,
+    }
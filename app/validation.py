@@ -0,0 +1,183 @@
+"""Accounting checks on the consolidated MASTER data.
+
+Three checks run with vectorized groupbys on ``master_df`` right after it is built,
+so the result does not have to be read again:
+
+* balance: every Asiento's Debe total must equal its Haber total
+* cross-sheet duplicates: an Asiento must appear in a single monthly sheet
+* date/sheet mismatches: a row's Fecha must fall in the month its sheet is named after
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from app.profiles import master_roles
+
+# Differences below half a cent are rounding noise of the source amounts
+BALANCE_TOLERANCE = 0.005
+
+# Spanish month abbreviations ("sept" and "set", from setiembre, are common too)
+MONTH_ABBREVIATIONS = {
+    "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
+    "jul": 7, "ago": 8, "sep": 9, "sept": 9, "set": 9, "oct": 10, "nov": 11, "dic": 12,
+}
+
+# Descriptions of the checks listed in ValidationReport.skipped
+CHECK_LABELS = {
+    "balance": "cuadre de asientos (sin columnas Debe/Haber o Asiento)",
+    "cross_sheet": "asientos en varias hojas (sin columna Asiento u hoja de origen)",
+    "dates": "fechas fuera del mes (sin columna Fecha, Asiento u hoja de origen)",
+}
+
+MONTH_NAMES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+]
+
+# Whole month names and abbreviations only, so "Mayor" or "Juntas" name no month
+_MONTH_WORDS = dict(
+    MONTH_ABBREVIATIONS, setiembre=9, **{name: month for month, name in enumerate(MONTH_NAMES, start=1)}
+)
+_MONTH_PATTERN = re.compile(
+    r"(?<![a-záéíóúñ])(" + "|".join(sorted(_MONTH_WORDS, key=len, reverse=True)) + r")(?![a-záéíóúñ])"
+)
+
+
+def sheet_month(sheet_name):
+    """Month number a sheet is named after ("Enero", "02-FEB"...), or None"""
+    match = _MONTH_PATTERN.search(str(sheet_name).lower())
+    return _MONTH_WORDS[match.group(1)] if match else None
+
+
+class ValidationReport:
+    """Result of :func:`validate_master`.
+
+    ``unbalanced`` has one row per Asiento whose Debe and Haber totals differ,
+    ``cross_sheet`` one row per Asiento found in more than one sheet and
+    ``date_mismatches`` one row per MASTER row dated outside its sheet's month.
+    A check that cannot run (e.g. no Debe/Haber columns) is listed in ``skipped``,
+    and the report is then not ``ok``: nothing was proven about those checks.
+    """
+
+    def __init__(self, asientos, unbalanced, cross_sheet, date_mismatches, skipped):
+        self.asientos = asientos
+        self.unbalanced = unbalanced
+        self.cross_sheet = cross_sheet
+        self.date_mismatches = date_mismatches
+        self.skipped = skipped
+
+    @property
+    def ok(self):
+        return (
+            not self.skipped
+            and self.unbalanced.empty and self.cross_sheet.empty and self.date_mismatches.empty
+        )
+
+    def skipped_labels(self):
+        """Descriptions of the checks that could not run"""
+        return [CHECK_LABELS.get(check, check) for check in self.skipped]
+
+    def summary(self):
+        """Counts of every check, ready for a JSON report"""
+        return {
+            "asientos": self.asientos,
+            "unbalanced_asientos": len(self.unbalanced),
+            "cross_sheet_asientos": len(self.cross_sheet),
+            "date_mismatch_rows": len(self.date_mismatches),
+            "skipped_checks": list(self.skipped),
+        }
+
+    def sections(self):
+        """``(title, DataFrame)`` pairs of the detail tables, in report order"""
+        return [
+            ("Asientos descuadrados", self.unbalanced),
+            ("Asientos en varias hojas", self.cross_sheet),
+            ("Fechas fuera del mes de la hoja", self.date_mismatches),
+        ]
+
+
+def validate_master(master_df, tolerance=BALANCE_TOLERANCE):
+    """Run the balance, duplicate and date checks on ``master_df``; returns a ValidationReport.
+
+    Columns are found with :func:`app.profiles.master_roles`, so the canonical names
+    and the synonyms of every profile ("Asto.", "Debe"...) are recognized. Rows
+    without an Asiento are ignored.
+    """
+    roles = master_roles(master_df.columns)
+    asiento_col = roles.get("asiento")
+    fecha_col = roles.get("fecha")
+    debe_col = roles.get("debe")
+    haber_col = roles.get("haber")
+    has_sheets = "Sheet_Origin" in master_df.columns
+    skipped = []
+
+    if asiento_col is None:
+        empty = pd.DataFrame()
+        return ValidationReport(0, empty, empty, empty, ["balance", "cross_sheet", "dates"])
+
+    asientos = master_df[asiento_col]
+    keyed = master_df[asientos.notna()]
+    asientos = keyed[asiento_col]
+
+    # Sheets of every Asiento, from the distinct (Asiento, sheet) pairs only
+    if has_sheets:
+        pairs = pd.DataFrame({
+            "Asiento": asientos.to_numpy(),
+            "Hojas": keyed["Sheet_Origin"].astype(str).to_numpy(),
+        }).drop_duplicates()
+        sheet_counts = pairs.groupby("Asiento", sort=True)["Hojas"].size()
+
+    if debe_col is not None and haber_col is not None:
+        amounts = pd.DataFrame({
+            "Asiento": asientos.to_numpy(),
+            "Debe": pd.to_numeric(keyed[debe_col], errors="coerce").fillna(0).to_numpy(dtype="float64"),
+            "Haber": pd.to_numeric(keyed[haber_col], errors="coerce").fillna(0).to_numpy(dtype="float64"),
+        })
+        totals = amounts.groupby("Asiento", sort=True)[["Debe", "Haber"]].sum()
+        totals["Diferencia"] = (totals["Debe"] - totals["Haber"]).round(2)
+        unbalanced = totals[totals["Diferencia"].abs() > tolerance].round(2)
+        n_asientos = len(totals)
+    else:
+        skipped.append("balance")
+        unbalanced = pd.DataFrame(columns=["Debe", "Haber", "Diferencia"])
+        n_asientos = asientos.nunique()
+
+    if has_sheets:
+        duplicated = sheet_counts.index[sheet_counts.to_numpy() > 1]
+        listed = pairs[pairs["Asiento"].isin(duplicated.union(unbalanced.index))]
+        sheets_by_asiento = listed.groupby("Asiento", sort=True)["Hojas"].agg(", ".join)
+        cross_sheet = pd.DataFrame({
+            "Hojas": sheets_by_asiento.reindex(duplicated),
+            "Filas": asientos[asientos.isin(duplicated)].value_counts().reindex(duplicated),
+        })
+        unbalanced["Hojas"] = sheets_by_asiento.reindex(unbalanced.index)
+    else:
+        skipped.append("cross_sheet")
+        cross_sheet = pd.DataFrame(columns=["Hojas", "Filas"])
+    unbalanced = unbalanced.rename_axis("Asiento").reset_index()
+    cross_sheet = cross_sheet.rename_axis("Asiento").reset_index()
+
+    date_mismatches = pd.DataFrame(columns=["Fila", "Hoja", "Fecha", "Asiento", "Mes de la hoja"])
+    if has_sheets and fecha_col is not None:
+        sheets = keyed["Sheet_Origin"]
+        codes, names = pd.factorize(sheets)
+        expected_by_code = np.array([sheet_month(name) or 0 for name in names] + [0])
+        # Code -1 (no sheet) picks the trailing 0: no expected month
+        expected = expected_by_code[codes]
+        fechas = pd.to_datetime(keyed[fecha_col], errors="coerce")
+        months = fechas.dt.month.fillna(0).to_numpy(dtype="int64")
+        mismatch = (expected > 0) & (months > 0) & (months != expected)
+        if mismatch.any():
+            date_mismatches = pd.DataFrame({
+                # 1-based data row of MASTER (row 1 is the header)
+                "Fila": keyed.index[mismatch] + 2,
+                "Hoja": sheets.to_numpy()[mismatch],
+                "Fecha": fechas.to_numpy()[mismatch],
+                "Asiento": asientos.to_numpy()[mismatch],
+                "Mes de la hoja": [MONTH_NAMES[month - 1] for month in expected[mismatch]],
+            })
+    else:
+        skipped.append("dates")
+
+    return ValidationReport(n_asientos, unbalanced, cross_sheet, date_mismatches, skipped)
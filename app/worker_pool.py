@@ -0,0 +1,134 @@
+"""Long-lived pool of warm worker processes for the Streamlit app.
+
+Jobs used to run in threads of the Streamlit server process, where the CPU-heavy
+parsing held the GIL and stalled the reruns of every other session. The pool keeps
+``max_workers`` processes alive for the whole server: they are started before the
+first job arrives, run ``initializer`` once (the pandas/openpyxl imports and the
+per-process caches) and then serve every job. The job threads only wait for them.
+
+Progress messages of the workers come back through a single queue and are handed
+to the callback of the job that sent them, in order, before its result is returned.
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Longest wait for the last progress messages of a finished task
+PROGRESS_FLUSH_TIMEOUT = 5
+
+# Set in each worker process by _init_worker
+_progress_queue = None
+
+
+def _init_worker(progress_queue, initializer):
+    global _progress_queue
+    _progress_queue = progress_queue
+    if initializer is not None:
+        initializer()
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def _run_task(task_id, task, args, kwargs):
+    def report(message):
+        _progress_queue.put((task_id, message))
+
+    try:
+        return task(*args, progress_callback=report, **kwargs)
+    finally:
+        # None marks the end of the task's messages
+        _progress_queue.put((task_id, None))
+
+
+class WorkerPool:
+    """Runs ``task(*args, progress_callback=..., **kwargs)`` calls in warm worker processes.
+
+    ``initializer`` runs once in every worker when it starts. Tasks, their arguments
+    and results must be picklable, and tasks must be module-level functions. A
+    worker that dies (e.g. killed for using too much memory) fails its job and the
+    pool is replaced by a fresh one for the next jobs.
+    """
+
+    def __init__(self, max_workers=2, initializer=None, start_method="spawn"):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        # Workers are spawned rather than forked: the server process runs threads
+        self._context = multiprocessing.get_context(start_method)
+        self._progress_queue = self._context.Queue()
+        self._callbacks = {}
+        self._finished = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._executor = self._start_executor()
+        self._listener = threading.Thread(target=self._relay_progress, name="worker-progress", daemon=True)
+        self._listener.start()
+
+    def _start_executor(self):
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._progress_queue, self.initializer),
+        )
+        # Start every worker now, so no job waits for the imports of its worker
+        for _ in range(self.max_workers):
+            executor.submit(_worker_pid)
+        return executor
+
+    def run(self, task, *args, progress_callback=None, **kwargs):
+        """Run ``task`` in a worker and return its result; blocks only the calling thread"""
+        task_id = next(self._task_ids)
+        finished = threading.Event()
+        self._finished[task_id] = finished
+        if progress_callback is not None:
+            self._callbacks[task_id] = progress_callback
+
+        with self._lock:
+            executor = self._executor
+        try:
+            try:
+                result = executor.submit(_run_task, task_id, task, args, kwargs).result()
+            except BrokenProcessPool:
+                self._replace_broken(executor)
+                raise
+            except Exception:
+                # The task failed: still deliver the messages it sent before
+                finished.wait(PROGRESS_FLUSH_TIMEOUT)
+                raise
+            finished.wait(PROGRESS_FLUSH_TIMEOUT)
+            return result
+        finally:
+            self._callbacks.pop(task_id, None)
+            self._finished.pop(task_id, None)
+
+    def shutdown(self, wait=True):
+        """Stop the workers and the progress relay"""
+        with self._lock:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._progress_queue.put(None)
+
+    def _replace_broken(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._start_executor()
+
+    def _relay_progress(self):
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                return
+            task_id, message = item
+            if message is None:
+                finished = self._finished.get(task_id)
+                if finished is not None:
+                    finished.set()
+                continue
+            callback = self._callbacks.get(task_id)
+            if callback is not None:
+                callback(message)
@@ -0,0 +1,323 @@
+"""Add the MASTER sheet to an .xlsx package without re-serializing the original sheets.
+
+The original parts (sheets, shared strings, images...) are copied as they are
+compressed in the input, without inflating them; only the MASTER worksheet part is
+generated and the workbook, relationships, content types and styles parts are
+patched to reference it. The output time therefore depends on the size of MASTER.
+"""
+import copy
+import datetime
+import io
+import posixpath
+import re
+import struct
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, to_excel
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+WORKSHEET_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+OFFICE_DOCUMENT_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+STYLES_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+SHARED_STRINGS_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+# Same number format openpyxl uses for datetimes
+DATETIME_FORMAT = "yyyy-mm-dd h:mm:ss"
+
+# Local file header flag: sizes and CRC follow the data instead of the header
+_DATA_DESCRIPTOR_FLAG = 0x08
+
+# Local file header of the zip format (APPNOTE 4.3.7): signature, versions, flags,
+# method, time, date, CRC, sizes, then the file name and extra field lengths
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+# Private ZipFile attributes the raw copy writes to; without any of them (a future
+# Python release) every part goes through the public API
+_ZIPFILE_WRITE_STATE = ("_seekable", "start_dir", "_didModify", "filelist", "NameToInfo")
+
+# Characters that are not allowed in XML 1.0 documents
+_ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _rels_path(part_name):
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _resolve_target(source_part, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def _find_workbook_part(zin):
+    root = etree.fromstring(zin.read("_rels/.rels"))
+    for rel in root.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        if rel.get("Type") == OFFICE_DOCUMENT_REL_TYPE:
+            return _resolve_target("", rel.get("Target"))
+    raise ValueError("El archivo no contiene un libro de Excel válido")
+
+
+def sheet_parts(zin):
+    """Map each sheet name of an open .xlsx zip to its worksheet part name"""
+    workbook_part = _find_workbook_part(zin)
+    workbook = etree.fromstring(zin.read(workbook_part))
+    rels = etree.fromstring(zin.read(_rels_path(workbook_part)))
+    targets = {
+        rel.get("Id"): _resolve_target(workbook_part, rel.get("Target"))
+        for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship")
+    }
+    return {
+        sheet.get("name"): targets.get(sheet.get(f"{{{REL_NS}}}id"))
+        for sheet in workbook.iterfind(f"{{{MAIN_NS}}}sheets/{{{MAIN_NS}}}sheet")
+    }
+
+
+def workbook_part_of_type(zin, rel_type):
+    """Name of the workbook-level part with relationship ``rel_type`` (e.g. styles), or None"""
+    workbook_part = _find_workbook_part(zin)
+    rels = etree.fromstring(zin.read(_rels_path(workbook_part)))
+    for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        if rel.get("Type") == rel_type:
+            return _resolve_target(workbook_part, rel.get("Target"))
+    return None
+
+
+def workbook_epoch(workbook):
+    """Date epoch of a parsed workbook part: MAC_EPOCH when it uses the 1904 date system"""
+    properties = workbook.find(f"{{{MAIN_NS}}}workbookPr")
+    if properties is not None and properties.get("date1904") in ("1", "true"):
+        return MAC_EPOCH
+    return WINDOWS_EPOCH
+
+
+def unique_sheet_name(name, existing):
+    """``name``, or ``name`` with the next free number ("MASTER1"...) like openpyxl does.
+
+    Excel compares sheet names without case.
+    """
+    taken = {sheet.lower() for sheet in existing}
+    if name.lower() not in taken:
+        return name
+    pattern = re.compile(rf"^{re.escape(name.lower())}(\d*)$")
+    numbers = [int(match.group(1) or 0) for match in map(pattern.match, taken) if match]
+    return f"{name}{max(numbers) + 1}"
+
+
+def _raw_member(zin, info):
+    """Compressed bytes of a zip member, read without inflating them"""
+    zin.fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(zin.fp.read(_LOCAL_HEADER.size))
+    if header[0] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Cabecera local incorrecta en {info.filename}")
+    zin.fp.seek(header[-2] + header[-1], 1)
+    return zin.fp.read(info.compress_size)
+
+
+def raw_copy_supported(zout):
+    """Whether ``zout`` has the zipfile internals :func:`_copy_raw_member` relies on"""
+    return all(hasattr(zout, attr) for attr in _ZIPFILE_WRITE_STATE) and hasattr(zipfile.ZipInfo, "FileHeader")
+
+
+def _can_copy_raw(info, zout):
+    # Members needing ZIP64 headers, and non-seekable outputs, go through zipfile
+    return (
+        zout._seekable
+        and max(info.file_size, info.compress_size, info.header_offset) < zipfile.ZIP64_LIMIT
+    )
+
+
+def _copy_raw_member(zin, zout, info):
+    """Copy a member's compressed bytes to ``zout`` as they are, keeping its CRC and sizes.
+
+    zipfile has no public API for this, so the local header is written the same way
+    ZipFile._open_to_write does and the entry registered like _ZipWriteFile.close.
+    """
+    data = _raw_member(zin, info)
+    zinfo = copy.copy(info)
+    # The sizes are known, so they go in the header and no data descriptor is copied
+    zinfo.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    zout.fp.seek(zout.start_dir)
+    zinfo.header_offset = zout.fp.tell()
+    zout.fp.write(zinfo.FileHeader(False))
+    zout.fp.write(data)
+    zout.start_dir = zout.fp.tell()
+    zout._didModify = True
+    zout.filelist.append(zinfo)
+    zout.NameToInfo[zinfo.filename] = zinfo
+
+
+def _add_datetime_style(styles_xml):
+    """Append a datetime cell format to the styles part, returning ``(xml, style_index)``"""
+    root = etree.fromstring(styles_xml)
+    ns = {"m": MAIN_NS}
+
+    num_fmts = root.find("m:numFmts", ns)
+    if num_fmts is None:
+        num_fmts = etree.Element(f"{{{MAIN_NS}}}numFmts")
+        root.insert(0, num_fmts)
+    used_ids = [int(fmt.get("numFmtId")) for fmt in num_fmts.findall("m:numFmt", ns)]
+    num_fmt_id = max(used_ids + [163]) + 1
+    etree.SubElement(
+        num_fmts, f"{{{MAIN_NS}}}numFmt", numFmtId=str(num_fmt_id), formatCode=DATETIME_FORMAT
+    )
+    num_fmts.set("count", str(len(num_fmts)))
+
+    cell_xfs = root.find("m:cellXfs", ns)
+    etree.SubElement(
+        cell_xfs, f"{{{MAIN_NS}}}xf",
+        numFmtId=str(num_fmt_id), fontId="0", fillId="0", borderId="0", xfId="0",
+        applyNumberFormat="1",
+    )
+    cell_xfs.set("count", str(len(cell_xfs)))
+
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True), len(cell_xfs) - 1
+
+
+def _cell_xml(ref, value, datetime_style, epoch=WINDOWS_EPOCH):
+    """Serialize one MASTER cell, or return '' for an empty cell; dates are serials from ``epoch``"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, np.integer)):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    if isinstance(value, (float, np.floating)):
+        if np.isinf(value):
+            return ""
+        return f'<c r="{ref}"><v>{repr(float(value))}</v></c>'
+    if isinstance(value, (datetime.datetime, datetime.date, np.datetime64)):
+        if isinstance(value, np.datetime64):
+            value = pd.Timestamp(value)
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        return f'<c r="{ref}" s="{datetime_style}"><v>{to_excel(value, epoch)}</v></c>'
+    text = _ILLEGAL_XML_CHARS.sub("", str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def _write_master_sheet(handle, master_df, datetime_style, epoch=WINDOWS_EPOCH):
+    """Stream the MASTER worksheet XML (header + rows) with inline strings"""
+    letters = [get_column_letter(idx + 1) for idx in range(len(master_df.columns))]
+    handle.write(
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheetData>'.encode("utf-8")
+    )
+
+    header = "".join(
+        _cell_xml(f"{letter}1", col, datetime_style, epoch) for letter, col in zip(letters, master_df.columns)
+    )
+    handle.write(f'<row r="1">{header}</row>'.encode("utf-8"))
+
+    for row_idx, values in enumerate(master_df.itertuples(index=False, name=None), start=2):
+        cells = "".join(
+            _cell_xml(f"{letter}{row_idx}", value, datetime_style, epoch)
+            for letter, value in zip(letters, values)
+        )
+        handle.write(f'<row r="{row_idx}">{cells}</row>'.encode("utf-8"))
+
+    handle.write(b"</sheetData></worksheet>")
+
+
+def insert_master_sheet(input_file_bytes, master_df, output, sheet_name="MASTER", raw_copy=True):
+    """Write ``input_file_bytes`` plus a first ``sheet_name`` sheet with ``master_df`` to ``output``.
+
+    ``output`` is a path or a writable binary file object. Only .xlsx/.xlsm packages
+    are supported. If the workbook already has a ``sheet_name`` sheet, the new one
+    gets the next free name ("MASTER1"...). Returns the name used.
+
+    With ``raw_copy`` the original parts are copied compressed when this Python's
+    zipfile allows it (see raw_copy_supported); otherwise, or with False, they are
+    inflated and deflated again with the public ZipFile API. The content is the same.
+    """
+    with zipfile.ZipFile(io.BytesIO(input_file_bytes)) as zin:
+        names = zin.namelist()
+        workbook_part = _find_workbook_part(zin)
+        workbook_rels_part = _rels_path(workbook_part)
+
+        workbook = etree.fromstring(zin.read(workbook_part))
+        # MASTER dates must use the date system of the workbook they are added to
+        epoch = workbook_epoch(workbook)
+        rels = etree.fromstring(zin.read(workbook_rels_part))
+        content_types = etree.fromstring(zin.read("[Content_Types].xml"))
+
+        styles_part = workbook_part_of_type(zin, STYLES_REL_TYPE)
+        if styles_part is None or styles_part not in names:
+            raise ValueError("El archivo no contiene una hoja de estilos; use el modo openpyxl")
+        styles_xml, datetime_style = _add_datetime_style(zin.read(styles_part))
+
+        # New worksheet part and relationship with names not used by the package
+        sheet_number = 1
+        while f"xl/worksheets/sheet{sheet_number}.xml" in names:
+            sheet_number += 1
+        master_part = f"xl/worksheets/sheet{sheet_number}.xml"
+
+        rel_ids = {rel.get("Id") for rel in rels}
+        rel_number = 1
+        while f"rId{rel_number}" in rel_ids:
+            rel_number += 1
+        rel_id = f"rId{rel_number}"
+        etree.SubElement(
+            rels, f"{{{PKG_REL_NS}}}Relationship",
+            Id=rel_id, Type=WORKSHEET_REL_TYPE,
+            Target=posixpath.relpath(master_part, posixpath.dirname(workbook_part)),
+        )
+
+        etree.SubElement(
+            content_types, f"{{{CT_NS}}}Override",
+            PartName=f"/{master_part}", ContentType=WORKSHEET_CONTENT_TYPE,
+        )
+
+        # MASTER goes first: shift sheet-index based references by one
+        ns = {"m": MAIN_NS}
+        sheets = workbook.find("m:sheets", ns)
+        sheet_ids = [int(sheet.get("sheetId")) for sheet in sheets]
+        sheet_name = unique_sheet_name(sheet_name, [sheet.get("name") for sheet in sheets])
+        master_sheet = etree.Element(f"{{{MAIN_NS}}}sheet", name=sheet_name, sheetId=str(max(sheet_ids + [0]) + 1))
+        master_sheet.set(f"{{{REL_NS}}}id", rel_id)
+        sheets.insert(0, master_sheet)
+        for defined_name in workbook.iterfind("m:definedNames/m:definedName", ns):
+            if defined_name.get("localSheetId") is not None:
+                defined_name.set("localSheetId", str(int(defined_name.get("localSheetId")) + 1))
+        for view in workbook.iterfind("m:bookViews/m:workbookView", ns):
+            view.set("activeTab", str(int(view.get("activeTab", "0")) + 1))
+            if view.get("firstSheet") is not None:
+                view.set("firstSheet", str(int(view.get("firstSheet")) + 1))
+
+        patched = {
+            workbook_part: etree.tostring(workbook, xml_declaration=True, encoding="UTF-8", standalone=True),
+            workbook_rels_part: etree.tostring(rels, xml_declaration=True, encoding="UTF-8", standalone=True),
+            "[Content_Types].xml": etree.tostring(content_types, xml_declaration=True, encoding="UTF-8", standalone=True),
+            styles_part: styles_xml,
+        }
+
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zout:
+            raw_copy = raw_copy and raw_copy_supported(zout)
+            # [Content_Types].xml is conventionally the first entry of the package
+            zout.writestr("[Content_Types].xml", patched["[Content_Types].xml"])
+            for info in zin.infolist():
+                if info.filename == "[Content_Types].xml":
+                    continue
+                data = patched.get(info.filename)
+                if data is not None:
+                    zout.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+                elif raw_copy and _can_copy_raw(info, zout):
+                    _copy_raw_member(zin, zout, info)
+                else:
+                    zout.writestr(info, zin.read(info.filename), compress_type=info.compress_type)
+
+            with zout.open(master_part, "w") as handle:
+                _write_master_sheet(handle, master_df, datetime_style, epoch)
+    return sheet_name
+
@@ -0,0 +1,58 @@
+"""Time and memory of ExcelConsolidator.merge_files on many synthetic company files.
+
+The parent's peak RSS stays close to one file's MASTER rows however many files are
+merged, because each file is spilled to disk and written one at a time.
+
+Usage:
+    python benchmarks/bench_merge.py [--files 30] [--sheets 24] [--rows-per-sheet 200] [--workers 4] [--format xlsx]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.consolidator import ExcelConsolidator
+from benchmarks.synthetic import generate_a3_workbook
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--sheets", type=int, default=24)
+    parser.add_argument("--rows-per-sheet", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", default="xlsx", choices=["xlsx", "csv"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Every company file is generated once and copied under a different name
+        template = Path(tmp) / "empresa.xlsx"
+        generate_a3_workbook(template, sheets=args.sheets, rows_per_sheet=args.rows_per_sheet)
+        inputs = []
+        for idx in range(args.files):
+            path = Path(tmp) / f"EMPRESA_{idx + 1}.xlsx"
+            path.write_bytes(template.read_bytes())
+            inputs.append(path)
+        print(
+            f"{args.files} archivos x {args.sheets} hojas x {args.rows_per_sheet} filas "
+            f"({args.files * args.sheets} hojas), {args.workers} procesos"
+        )
+
+        start = time.perf_counter()
+        summary = ExcelConsolidator().merge_files(
+            inputs, Path(tmp) / f"grupo.{args.format}", fmt=args.format, workers=args.workers
+        )
+        elapsed = time.perf_counter() - start
+
+    print(f"master_rows={summary['master_rows']} errors={len(summary['errors'])}")
+    print(f"seconds={elapsed:.2f}")
+    print(f"memory_peak_mb={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Scaling of process_excel_file with the number of sheet workers.
+
+Usage:
+    python benchmarks/bench_parallel.py [--sheets 12] [--rows-per-sheet 5000] [--workers 1,2,4,8]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.consolidator import ExcelConsolidator
+from benchmarks.synthetic import generate_a3_workbook
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=12)
+    parser.add_argument("--rows-per-sheet", type=int, default=5000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    buffer = io.BytesIO()
+    generate_a3_workbook(buffer, sheets=args.sheets, rows_per_sheet=args.rows_per_sheet)
+    file_bytes = buffer.getvalue()
+    print(f"{args.sheets} hojas x {args.rows_per_sheet} filas, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        consolidator = ExcelConsolidator(workers=workers)
+        start = time.perf_counter()
+        consolidator.process_excel_file(file_bytes, "sintetico.xlsx")
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"workers={workers:<3} {elapsed:8.2f}s  speedup {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
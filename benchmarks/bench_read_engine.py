@@ -0,0 +1,88 @@
+"""Compare the calamine and pandas (openpyxl) read engines on the fixture and synthetic files.
+
+For every file the workbook is read with each engine (open + parse every sheet) and
+fully consolidated with ``ExcelConsolidator.extract_master_df``; the best time of
+``--repeat`` runs is reported, and the raw sheets and MASTER rows of both engines
+are checked to be identical.
+
+Usage:
+    python benchmarks/bench_read_engine.py [--sheets 12] [--rows-per-sheet 5000] [--repeat 3]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.consolidator import ExcelConsolidator, calamine_available
+from benchmarks.synthetic import generate_a3_workbook
+
+FIXTURE = Path(__file__).parent.parent / "tests" / "data" / "EMPRESA_1-A3_TODO_EJERCICIO_2020.xlsx"
+
+ENGINES = ("pandas", "calamine")
+
+
+def read_sheets(consolidator, file_bytes):
+    excel_file = consolidator.open_excel_file(file_bytes)
+    return {name: consolidator.load_sheet(excel_file, name) for name in excel_file.sheet_names}
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def compare(label, file_bytes, repeat):
+    print(f"\n{label} ({len(file_bytes) / 1024:.0f} KB)")
+    print(f"  {'motor':<10}{'lectura s':>11}{'total s':>10}")
+    results = {}
+    for engine in ENGINES:
+        consolidator = ExcelConsolidator(read_engine=engine)
+        read_seconds, sheets = best_time(lambda: read_sheets(consolidator, file_bytes), repeat)
+        total_seconds, master_df = best_time(
+            lambda: consolidator.extract_master_df(file_bytes, label), repeat
+        )
+        results[engine] = (read_seconds, total_seconds, sheets, master_df)
+        print(f"  {engine:<10}{read_seconds:>11.3f}{total_seconds:>10.3f}")
+
+    pandas_read, pandas_total, pandas_sheets, pandas_master = results["pandas"]
+    calamine_read, calamine_total, calamine_sheets, calamine_master = results["calamine"]
+    for name, df_raw in pandas_sheets.items():
+        pd.testing.assert_frame_equal(df_raw, calamine_sheets[name])
+    pd.testing.assert_frame_equal(pandas_master, calamine_master)
+    print(
+        f"  speedup: lectura {pandas_read / calamine_read:.1f}x, total {pandas_total / calamine_total:.1f}x "
+        f"(resultados idénticos, {len(calamine_master)} filas en MASTER)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=12)
+    parser.add_argument("--rows-per-sheet", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not calamine_available():
+        print("python-calamine no está instalado (pip install python-calamine)")
+        return 1
+
+    compare(FIXTURE.name, FIXTURE.read_bytes(), args.repeat)
+
+    buffer = io.BytesIO()
+    generate_a3_workbook(buffer, sheets=args.sheets, rows_per_sheet=args.rows_per_sheet)
+    compare(f"sintético {args.sheets}x{args.rows_per_sheet}", buffer.getvalue(), args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
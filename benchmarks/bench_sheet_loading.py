@@ -0,0 +1,104 @@
+"""Compare the legacy three-parse sheet loading with the single-parse path.
+
+Counts how many times the workbook is decompressed and parsed
+(``openpyxl.load_workbook`` calls) and the wall time for each approach.
+
+Usage:
+    python benchmarks/bench_sheet_loading.py [ruta/al/archivo.xlsx] [--repeat 5]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.consolidator import ExcelConsolidator
+
+DEFAULT_FILE = Path(__file__).parent.parent / "tests" / "data" / "EMPRESA_1-A3_TODO_EJERCICIO_2020.xlsx"
+
+
+class ParseCounter:
+    """Count calls to openpyxl.load_workbook while active"""
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def __enter__(self):
+        self._original = openpyxl.load_workbook
+
+        def counting_load_workbook(*args, **kwargs):
+            self.count += 1
+            return self._original(*args, **kwargs)
+
+        openpyxl.load_workbook = counting_load_workbook
+        return self
+
+    def __exit__(self, *exc):
+        openpyxl.load_workbook = self._original
+
+
+def load_legacy(consolidator, file_bytes):
+    """Loading as done before: ExcelFile + two read_excel calls per sheet"""
+    excel_file = pd.ExcelFile(io.BytesIO(file_bytes))
+    frames = {}
+    for sheet_name in excel_file.sheet_names:
+        df_raw = pd.read_excel(io.BytesIO(file_bytes), sheet_name=sheet_name, header=None)
+        header_row = consolidator.find_header_row(df_raw)
+        if header_row is not None:
+            frames[sheet_name] = pd.read_excel(
+                io.BytesIO(file_bytes), sheet_name=sheet_name, header=header_row
+            )
+    return frames
+
+
+def load_single_parse(consolidator, file_bytes):
+    """Loading with one parse of the workbook reused for every sheet"""
+    excel_file = pd.ExcelFile(io.BytesIO(file_bytes))
+    frames = {}
+    for sheet_name in excel_file.sheet_names:
+        df_raw = consolidator.load_sheet(excel_file, sheet_name)
+        header_row = consolidator.find_header_row(df_raw)
+        if header_row is not None:
+            frames[sheet_name] = consolidator.frame_from_raw(df_raw, header_row)
+    return frames
+
+
+def run(loader, consolidator, file_bytes, repeat):
+    timings = []
+    with ParseCounter() as counter:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            loader(consolidator, file_bytes)
+            timings.append(time.perf_counter() - start)
+    return counter.count // repeat, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", nargs="?", type=Path, default=DEFAULT_FILE)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path, repeat = args.file, args.repeat
+    file_bytes = path.read_bytes()
+    consolidator = ExcelConsolidator()
+
+    print(f"Archivo: {path.name} ({len(file_bytes) / 1024:.0f} KB), {repeat} repeticiones")
+    print(f"{'modo':<14}{'parses':>8}{'mejor (s)':>12}")
+    results = {}
+    for name, loader in (("legacy", load_legacy), ("single-parse", load_single_parse)):
+        parses, best = run(loader, consolidator, file_bytes, repeat)
+        results[name] = best
+        print(f"{name:<14}{parses:>8}{best:>12.3f}")
+    print(f"speedup: {results['legacy'] / results['single-parse']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
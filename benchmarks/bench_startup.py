@@ -0,0 +1,111 @@
+"""Cold start of the app: import time, first page render and server readiness.
+
+Every measurement runs in a fresh Python process, like a double-click on the
+executable:
+
+    import        ``import app.streamlit_app`` and which heavy modules it loads
+    processing    ``import app.consolidator``, deferred until the first upload
+    first render  first run of the page script with streamlit's AppTest
+    server ready  ``streamlit run`` until the health endpoint answers, polled with
+                  the launcher's readiness probe (the launcher used to wait a fixed 2 s)
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 3]
+"""
+import argparse
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from launcher import wait_for_server
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow")
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+RENDER_SCRIPT = """
+import time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file("app/streamlit_app.py").run(timeout=60)
+assert not app.exception, app.exception
+print(time.perf_counter() - start)
+"""
+
+
+def run_python(script):
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return output.strip().splitlines()
+
+
+def measure_import(module, repeat):
+    timings = []
+    for _ in range(repeat):
+        # The second line is empty (and stripped) when no heavy module was loaded
+        seconds, *loaded = run_python(IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES))
+        timings.append(float(seconds))
+    return min(timings), loaded[0] if loaded else "-"
+
+
+def measure_render(repeat):
+    return min(float(run_python(RENDER_SCRIPT)[-1]) for _ in range(repeat))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def measure_server_ready(repeat):
+    timings = []
+    for _ in range(repeat):
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", "app/streamlit_app.py",
+                "--server.headless=true", f"--server.port={port}", "--server.address=localhost",
+                "--global.developmentMode=false", "--browser.gatherUsageStats=false",
+            ],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not wait_for_server("localhost", port, timeout=60):
+                raise RuntimeError("El servidor no respondió en 60 s")
+            timings.append(time.perf_counter() - start)
+        finally:
+            server.terminate()
+            server.wait()
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Mejor de {args.repeat} procesos nuevos")
+    print(f"  {'medida':<14}{'s':>8}  módulos pesados cargados")
+    for label, module in (("import", "app.streamlit_app"), ("processing", "app.consolidator")):
+        seconds, loaded = measure_import(module, args.repeat)
+        print(f"  {label:<14}{seconds:>8.3f}  {loaded}")
+    print(f"  {'first render':<14}{measure_render(args.repeat):>8.3f}")
+    print(f"  {'server ready':<14}{measure_server_ready(args.repeat):>8.3f}  (antes: espera fija de 2 s)")
+
+
+if __name__ == "__main__":
+    main()
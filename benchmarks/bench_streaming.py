@@ -0,0 +1,101 @@
+"""Peak memory and time of the in-memory vs streaming consolidation.
+
+Each mode runs in its own subprocess so ``memory_peak_mb`` (ru_maxrss) is not
+shared between them. Linux/macOS only.
+
+    memory     process_excel_file, every sheet parsed whole
+    streaming  stream_excel_file, row by row
+    package    write_package (original sheets copied at the zip level), sheets parsed whole
+    chunked    write_package with ExcelConsolidator(chunk_rows=...), sheets read in windows
+
+Usage:
+    python benchmarks/bench_streaming.py [--rows 1000000] [--sheets 12] [--modes streaming,memory]
+    python benchmarks/bench_streaming.py --sheets 1 --modes package,chunked --chunk-rows 50000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.synthetic import generate_a3_workbook
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode, input_path, chunk_rows):
+    """Run one consolidation mode in this process and print its metrics as JSON"""
+    from app.consolidator import ExcelConsolidator
+
+    with open(input_path, "rb") as f:
+        file_bytes = f.read()
+    consolidator = ExcelConsolidator(chunk_rows=chunk_rows if mode == "chunked" else None)
+    baseline_mb = peak_rss_mb()
+
+    start = time.perf_counter()
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as output:
+        if mode == "streaming":
+            master_rows = consolidator.stream_excel_file(file_bytes, input_path, output.name)
+        elif mode in ("package", "chunked"):
+            master_rows = len(consolidator.write_package(file_bytes, input_path, output.name))
+        else:
+            output_workbook, master_df = consolidator.process_excel_file(file_bytes, input_path)
+            output_workbook.save(output.name)
+            master_rows = len(master_df)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "mode": mode,
+        "master_rows": master_rows,
+        "seconds": round(elapsed, 2),
+        "memory_baseline_mb": round(baseline_mb, 1),
+        "memory_peak_mb": round(peak_rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Total data rows")
+    parser.add_argument("--sheets", type=int, default=12)
+    parser.add_argument("--modes", default="streaming,memory")
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="Window size of the chunked mode")
+    parser.add_argument("--run-mode", help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.input, args.chunk_rows)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "sintetico.xlsx")
+        start = time.perf_counter()
+        generate_a3_workbook(input_path, sheets=args.sheets, rows_per_sheet=args.rows // args.sheets)
+        print(f"Generado {input_path} ({os.path.getsize(input_path) / 1e6:.1f} MB, "
+              f"{args.rows} filas) en {time.perf_counter() - start:.1f}s")
+
+        for mode in args.modes.split(","):
+            result = subprocess.run(
+                [
+                    sys.executable, __file__, "--run-mode", mode, "--input", input_path,
+                    "--chunk-rows", str(args.chunk_rows),
+                ],
+                capture_output=True, text=True,
+            )
+            if result.returncode != 0:
+                print(f"{mode}: error\n{result.stderr}")
+                continue
+            print(result.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Stage-by-stage benchmark suite on synthetic A3 libros diarios.
+
+For every scenario a synthetic workbook is generated and the pipeline of
+``ExcelConsolidator.process_excel_file`` is run stage by stage:
+
+    load      open the workbook (calamine when installed) + parse every sheet
+    header    find_header_row
+    filter    frame_from_raw + required columns + ffill/meaningful/total filters
+    concat    pd.concat of the valid rows
+    dtypes    compact dtypes of master_df (categoricals, nullable ints)
+    workbook  copy the original sheets and write MASTER into an openpyxl workbook
+    save      serialize the workbook
+
+Each stage is timed (best of ``--repeat`` runs) and, in a separate pass, its peak
+traced memory is measured with tracemalloc. Results are compared with
+``benchmarks/baseline.json``; any stage slower or heavier than the baseline beyond
+the tolerance, or a wrong MASTER row count, is reported as a regression and the
+script exits with status 1.
+
+Usage:
+    python benchmarks/bench_suite.py                    # compare with the baseline
+    python benchmarks/bench_suite.py --update-baseline  # record a new baseline
+    python benchmarks/bench_suite.py --scenarios small,subtotals --scale 4
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.consolidator import ExcelConsolidator
+from app.exporters import compact_master_dtypes
+from benchmarks.synthetic import generate_a3_workbook
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+STAGES = ["load", "header", "filter", "concat", "dtypes", "workbook", "save"]
+
+# rows_per_sheet is multiplied by --scale
+SCENARIOS = {
+    "small": dict(sheets=12, rows_per_sheet=500),
+    "few_large_sheets": dict(sheets=2, rows_per_sheet=3000),
+    "many_sheets": dict(sheets=24, rows_per_sheet=200),
+    "long_preamble": dict(sheets=12, rows_per_sheet=500, preamble_rows=60),
+    "no_continuation": dict(sheets=12, rows_per_sheet=500, continuation_ratio=0.0),
+    "heavy_continuation": dict(sheets=12, rows_per_sheet=500, continuation_ratio=0.9),
+    "subtotals": dict(sheets=12, rows_per_sheet=500, total_placement="both", subtotal_every=10),
+    "no_totals": dict(sheets=12, rows_per_sheet=500, total_placement="none"),
+}
+
+
+def run_pipeline(consolidator, file_bytes, clock):
+    """Run the consolidation stage by stage, calling ``clock(stage)`` around each one.
+
+    ``clock(stage)`` is a context manager factory. Returns the MASTER row count.
+    """
+    with clock("load"):
+        excel_file = consolidator.open_excel_file(file_bytes)
+        raw_sheets = {name: consolidator.load_sheet(excel_file, name) for name in excel_file.sheet_names}
+
+    with clock("header"):
+        header_rows = {name: consolidator.find_header_row(df_raw) for name, df_raw in raw_sheets.items()}
+
+    with clock("filter"):
+        master_data = []
+        for name, df_raw in raw_sheets.items():
+            if header_rows[name] is None:
+                continue
+            df = consolidator.frame_from_raw(df_raw, header_rows[name])
+            fecha_col, asiento_col = consolidator.find_required_columns(df)
+            if not (fecha_col and asiento_col):
+                continue
+            valid_rows, _ = consolidator.filter_valid_rows(df, fecha_col, asiento_col)
+            if not valid_rows.empty:
+                valid_rows = valid_rows.copy()
+                valid_rows["Sheet_Origin"] = name
+                master_data.append(valid_rows)
+
+    with clock("concat"):
+        master_df = pd.concat(master_data, ignore_index=True)
+
+    with clock("dtypes"):
+        master_df = compact_master_dtypes(master_df)
+
+    with clock("workbook"):
+        output_workbook = openpyxl.Workbook()
+        output_workbook.remove(output_workbook.active)
+        for name, df_raw in raw_sheets.items():
+            consolidator.copy_sheet(output_workbook, name, df_raw)
+        consolidator.add_master_sheet(output_workbook, master_df)
+
+    with clock("save"):
+        output_workbook.save(io.BytesIO())
+
+    return len(master_df)
+
+
+class _Timer:
+    def __init__(self):
+        self.seconds = {}
+
+    def __call__(self, stage):
+        timer = self
+
+        class _Stage:
+            def __enter__(self):
+                self.start = time.perf_counter()
+
+            def __exit__(self, *exc):
+                timer.seconds[stage] = time.perf_counter() - self.start
+
+        return _Stage()
+
+
+class _MemoryTracer:
+    def __init__(self):
+        self.peak_mb = {}
+
+    def __call__(self, stage):
+        tracer = self
+
+        class _Stage:
+            def __enter__(self):
+                tracemalloc.reset_peak()
+                self.start, _ = tracemalloc.get_traced_memory()
+
+            def __exit__(self, *exc):
+                _, peak = tracemalloc.get_traced_memory()
+                tracer.peak_mb[stage] = (peak - self.start) / (1024 * 1024)
+
+        return _Stage()
+
+
+def expected_master_rows(params):
+    # Every generated data row is a valid entry; total rows must all be dropped
+    return params["sheets"] * params["rows_per_sheet"]
+
+
+def run_scenario(params, repeat, read_engine="auto"):
+    buffer = io.BytesIO()
+    generate_a3_workbook(buffer, **params)
+    file_bytes = buffer.getvalue()
+    consolidator = ExcelConsolidator(read_engine=read_engine)
+
+    best = {}
+    for _ in range(repeat):
+        timer = _Timer()
+        master_rows = run_pipeline(consolidator, file_bytes, timer)
+        for stage, seconds in timer.seconds.items():
+            best[stage] = min(seconds, best.get(stage, seconds))
+
+    tracer = _MemoryTracer()
+    tracemalloc.start()
+    try:
+        run_pipeline(consolidator, file_bytes, tracer)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "master_rows": master_rows,
+        "expected_master_rows": expected_master_rows(params),
+        "stages": {
+            stage: {"seconds": round(best[stage], 4), "peak_mb": round(tracer.peak_mb[stage], 2)}
+            for stage in STAGES
+        },
+    }
+
+
+def find_regressions(results, baseline, time_tolerance, memory_tolerance, min_seconds, min_mb):
+    """Compare ``results`` with ``baseline`` and return a list of regression messages"""
+    regressions = []
+    for name, result in results.items():
+        if result["master_rows"] != result["expected_master_rows"]:
+            regressions.append(
+                f"{name}: MASTER tiene {result['master_rows']} filas, "
+                f"se esperaban {result['expected_master_rows']}"
+            )
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for stage, metrics in result["stages"].items():
+            base_metrics = base["stages"].get(stage)
+            if base_metrics is None:
+                continue
+            seconds, base_seconds = metrics["seconds"], base_metrics["seconds"]
+            if seconds > base_seconds * (1 + time_tolerance) and seconds - base_seconds > min_seconds:
+                regressions.append(
+                    f"{name}/{stage}: {seconds:.3f}s frente a {base_seconds:.3f}s de referencia"
+                )
+            peak, base_peak = metrics["peak_mb"], base_metrics["peak_mb"]
+            if peak > base_peak * (1 + memory_tolerance) and peak - base_peak > min_mb:
+                regressions.append(
+                    f"{name}/{stage}: {peak:.1f} MB frente a {base_peak:.1f} MB de referencia"
+                )
+    return regressions
+
+
+def print_results(name, result, baseline):
+    print(f"\n{name} ({result['master_rows']} filas en MASTER)")
+    print(f"  {'etapa':<10}{'s':>9}{'ref s':>9}{'MB':>9}{'ref MB':>9}")
+    base_stages = baseline.get(name, {}).get("stages", {})
+    for stage, metrics in result["stages"].items():
+        base = base_stages.get(stage, {})
+        print(
+            f"  {stage:<10}{metrics['seconds']:>9.3f}{base.get('seconds', float('nan')):>9.3f}"
+            f"{metrics['peak_mb']:>9.1f}{base.get('peak_mb', float('nan')):>9.1f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Escenarios separados por comas")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplica las filas por hoja")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones de la medida de tiempo")
+    parser.add_argument("--read-engine", default="auto", help="Motor de lectura: auto, calamine o pandas")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true", help="Guarda los resultados como referencia")
+    parser.add_argument("--time-tolerance", type=float, default=0.5, help="Margen relativo de tiempo (0.5 = +50%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Margen relativo de memoria")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Diferencias de tiempo menores se ignoran")
+    parser.add_argument("--min-mb", type=float, default=2.0, help="Diferencias de memoria menores se ignoran")
+    parser.add_argument("--output", help="Guarda los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    if args.scale != 1.0 and not args.update_baseline:
+        # The stored baseline is only meaningful at the scale it was recorded with
+        baseline = {}
+
+    results = {}
+    for name in args.scenarios.split(","):
+        params = dict(SCENARIOS[name])
+        params["rows_per_sheet"] = int(params["rows_per_sheet"] * args.scale)
+        results[name] = run_scenario(params, args.repeat, args.read_engine)
+        print_results(name, results[name], baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nReferencia guardada en {baseline_path}")
+        return 0
+
+    regressions = find_regressions(
+        results, baseline, args.time_tolerance, args.memory_tolerance, args.min_seconds, args.min_mb
+    )
+    if regressions:
+        print("\n❌ REGRESIONES DE RENDIMIENTO:")
+        for message in regressions:
+            print(f"  - {message}")
+        return 1
+    print("\n✅ Sin regresiones respecto a la referencia")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
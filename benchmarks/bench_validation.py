@@ -0,0 +1,73 @@
+"""Time of validate_master on a large synthetic MASTER.
+
+Builds a compact-dtype MASTER like ExcelConsolidator does (Int32 Asiento, categorical
+Sheet_Origin) with balanced asientos of four rows, then breaks a few of them on
+purpose (unbalanced, repeated in another sheet, dated outside their month) and
+checks that every one is found.
+
+Usage:
+    python benchmarks/bench_validation.py [--rows 3000000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.validation import MONTH_NAMES, validate_master
+
+
+def build_master(rows, broken=10):
+    row = np.arange(rows)
+    asiento = row // 4 + 1
+    fecha = pd.Timestamp("2020-01-01") + pd.to_timedelta(asiento * 365 // (asiento.max() + 1), unit="D")
+    master_df = pd.DataFrame({
+        "Fecha": fecha,
+        "Asiento": pd.array(asiento, dtype="Int32"),
+        "Cuenta": pd.Categorical(np.where(row % 2 == 0, 57200001, 40000006)),
+        "Importe debe": np.where(row % 2 == 0, 100.0, 0.0),
+        "Importe haber": np.where(row % 2 == 1, 100.0, 0.0),
+    })
+    sheets = [name.capitalize() for name in MONTH_NAMES]
+    master_df["Sheet_Origin"] = pd.Categorical(
+        np.array(sheets)[master_df["Fecha"].dt.month - 1], categories=sheets
+    )
+
+    step = rows // (3 * broken)
+    targets = np.arange(broken) * 3 * step
+    master_df.loc[targets, "Importe debe"] += 1.0
+    master_df.loc[targets + step, "Sheet_Origin"] = [
+        sheets[(sheets.index(s) + 1) % 12] for s in master_df.loc[targets + step, "Sheet_Origin"]
+    ]
+    master_df.loc[targets + 2 * step, "Fecha"] += pd.Timedelta(days=45)
+    return master_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    master_df = build_master(args.rows)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        report = validate_master(master_df)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{args.rows} filas, {report.asientos} asientos")
+    print(f"seconds={min(timings):.3f}")
+    print(report.summary())
+    # The moved rows also put their asiento in a second sheet and outside its month
+    assert report.summary()["unbalanced_asientos"] == 10
+    assert report.summary()["cross_sheet_asientos"] >= 10
+    assert report.summary()["date_mismatch_rows"] >= 10
+
+
+if __name__ == "__main__":
+    main()
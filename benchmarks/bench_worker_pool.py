@@ -0,0 +1,124 @@
+"""Server responsiveness and first-job latency of the app's warm worker pool.
+
+A ticker thread stands in for the Streamlit server: it wakes up every 10 ms like the
+event loop serving the other sessions, and records how late each wake-up is while
+one synthetic libro diario is consolidated:
+
+    thread   consolidate_upload in a thread of this process, as jobs used to run
+    pool     the same job sent to a warm WorkerPool, as the app runs it now
+
+The first job is also timed from the moment the pool is created (cold: spawn and
+imports included) against a pool warmed while the options are chosen.
+
+Usage:
+    python benchmarks/bench_worker_pool.py [--sheets 12] [--rows-per-sheet 5000] [--repeat 3]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Every run must process the file, not hit the result cache
+os.environ["LIBRO_DIARIO_CACHE_ENTRIES"] = "0"
+
+from app.tasks import consolidate_upload, warm_up_worker
+from app.worker_pool import WorkerPool
+from benchmarks.synthetic import generate_a3_workbook
+
+TICK = 0.01
+
+
+class Ticker(threading.Thread):
+    """Wakes up every TICK seconds and records how late each wake-up was"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.lags = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            start = time.perf_counter()
+            time.sleep(TICK)
+            self.lags.append(time.perf_counter() - start - TICK)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(runner, file_bytes, output_dir):
+    args = (consolidate_upload, file_bytes, output_dir, "diario.xlsx", "xlsx", "salida.xlsx", "")
+    ticker = Ticker()
+    ticker.start()
+    start = time.perf_counter()
+    result = runner(*args)
+    seconds = time.perf_counter() - start
+    ticker.stop()
+    os.remove(result["output_path"])
+    return seconds, max(ticker.lags), statistics.quantiles(ticker.lags, n=100)[98]
+
+
+def run_in_thread(task, *args):
+    results = []
+    worker = threading.Thread(target=lambda: results.append(task(*args, progress_callback=lambda _: None)))
+    worker.start()
+    worker.join()
+    return results[0]
+
+
+def ready(progress_callback=None):
+    return True
+
+
+def first_job_seconds(file_bytes, output_dir, warm):
+    pool = WorkerPool(max_workers=1, initializer=warm_up_worker)
+    try:
+        if warm:
+            # The app starts the pool on upload, while the options are chosen
+            pool.run(ready)
+        start = time.perf_counter()
+        result = pool.run(consolidate_upload, file_bytes, output_dir, "diario.xlsx", "xlsx", "salida.xlsx", "")
+        os.remove(result["output_path"])
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=12)
+    parser.add_argument("--rows-per-sheet", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    buffer = io.BytesIO()
+    generate_a3_workbook(buffer, sheets=args.sheets, rows_per_sheet=args.rows_per_sheet)
+    file_bytes = buffer.getvalue()
+    output_dir = tempfile.mkdtemp(prefix="bench-pool-")
+    warm_up_worker()
+
+    pool = WorkerPool(max_workers=1, initializer=warm_up_worker)
+    try:
+        print(f"{args.sheets} hojas x {args.rows_per_sheet} filas, mejor de {args.repeat}")
+        print(f"  {'modo':<8}{'job s':>8}{'lag máx ms':>12}{'lag p99 ms':>12}")
+        for label, runner in (("thread", run_in_thread), ("pool", pool.run)):
+            runs = [run_job(runner, file_bytes, output_dir) for _ in range(args.repeat)]
+            seconds, max_lag, p99_lag = min(runs)
+            print(f"  {label:<8}{seconds:>8.2f}{max_lag * 1000:>12.1f}{p99_lag * 1000:>12.1f}")
+    finally:
+        pool.shutdown()
+
+    for label, warm in (("cold", False), ("warm", True)):
+        seconds = min(first_job_seconds(file_bytes, output_dir, warm) for _ in range(args.repeat))
+        print(f"  primer job {label}: {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Synthetic A3-format libro diario generator for benchmarks."""
+import datetime
+
+import openpyxl
+
+MONTHS = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+]
+
+HEADER = [
+    "Fecha", "Asiento", "Apunte", "Concepto", "Documento", "Cuenta",
+    "Descripción de la cuenta", "Importe debe", "Importe haber",
+]
+
+PREAMBLE = [
+    ["Diario."],
+    [],
+    ["Empresa: SINTETICA, S.L."],
+    ["Período: de 01/01/2020 a 31/12/2020"],
+    ["Fecha: 21/12/2024"],
+    [],
+]
+
+# Where total/summary rows go: only after the data, every ``subtotal_every`` asientos
+# ("Suma y sigue" lines, as in paginated exports), both, or nowhere.
+TOTAL_PLACEMENTS = ("end", "subtotals", "both", "none")
+
+
+def sheet_title(sheet_idx):
+    """Month name for the first 12 sheets, then 'Enero 2', 'Febrero 2'..."""
+    title = MONTHS[sheet_idx % 12]
+    return title if sheet_idx < 12 else f"{title} {sheet_idx // 12 + 1}"
+
+
+def generate_a3_workbook(
+    output,
+    sheets=12,
+    rows_per_sheet=1000,
+    preamble_rows=6,
+    continuation_ratio=0.5,
+    total_placement="end",
+    subtotal_every=50,
+):
+    """Write a write-only A3-like workbook to ``output`` (path or binary file).
+
+    Every sheet has ``preamble_rows`` rows of company/period information, the header
+    row and ``rows_per_sheet`` data rows. A share ``continuation_ratio`` of the data
+    rows are continuation lines without Fecha/Asiento, which the consolidator must
+    forward fill. Total rows, which the consolidator must discard, are placed
+    according to ``total_placement`` (see TOTAL_PLACEMENTS).
+    """
+    if total_placement not in TOTAL_PLACEMENTS:
+        raise ValueError(f"total_placement must be one of {TOTAL_PLACEMENTS}")
+
+    workbook = openpyxl.Workbook(write_only=True)
+    asiento = 0
+    apunte = 0
+    for sheet_idx in range(sheets):
+        ws = workbook.create_sheet(title=sheet_title(sheet_idx))
+        for row_idx in range(preamble_rows):
+            ws.append(PREAMBLE[row_idx] if row_idx < len(PREAMBLE) else [f"Nota {row_idx}"])
+        ws.append(HEADER)
+
+        fecha = datetime.datetime(2020, sheet_idx % 12 + 1, 1)
+        total = 0.0
+        asientos_in_sheet = 0
+        continuation_budget = 0.0
+        for row_idx in range(rows_per_sheet):
+            apunte += 1
+            importe = round(10 + (row_idx * 7.31) % 990, 2)
+            continuation_budget += continuation_ratio
+            if row_idx > 0 and continuation_budget >= 1:
+                continuation_budget -= 1
+                ws.append([None, None, apunte, f"Pago {asiento}", asiento,
+                           57200001, "BANCO SABADELL S.A.", 0, importe])
+                continue
+
+            asiento += 1
+            asientos_in_sheet += 1
+            ws.append([fecha, asiento, apunte, f"Factura {asiento}", asiento,
+                       40000000 + asiento % 500, f"PROVEEDOR {asiento % 500}", importe, 0])
+            total += importe
+            if total_placement in ("subtotals", "both") and asientos_in_sheet % subtotal_every == 0:
+                ws.append([None, None, None, "Suma y sigue", None, None, None, round(total, 2), round(total, 2)])
+
+        if total_placement in ("end", "both"):
+            ws.append([])
+            ws.append([None, None, None, "Total", None, None, None, round(total, 2), round(total, 2)])
+
+    workbook.save(output)
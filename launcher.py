@@ -3,8 +3,14 @@ import sys
 import webbrowser
 import threading
 import time
+import urllib.request
 from pathlib import Path
 
+SERVER_HOST = 'localhost'
+SERVER_PORT = 8501
+# Longest wait for the server before giving up on opening the browser
+SERVER_START_TIMEOUT = 120
+
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller bundle."""
     try:
@@ -13,10 +19,29 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-def open_browser():
-    """Open browser after a short delay to ensure server is running."""
-    time.sleep(2)
-    webbrowser.open('http://localhost:8501')
+def wait_for_server(host, port, timeout=SERVER_START_TIMEOUT, interval=0.05):
+    """Poll Streamlit's health endpoint until the server answers; return whether it did."""
+    health_url = f'http://{host}:{port}/_stcore/health'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(health_url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(interval)
+    return False
+
+def open_browser(host=SERVER_HOST, port=SERVER_PORT):
+    """Open the browser as soon as the server is ready to serve the app."""
+    import logging
+    start = time.perf_counter()
+    if wait_for_server(host, port):
+        logging.info(f"Server ready after {time.perf_counter() - start:.2f}s, opening browser")
+        webbrowser.open(f'http://{host}:{port}')
+    else:
+        logging.error(f"Server not ready after {SERVER_START_TIMEOUT}s, browser not opened")
 
 def main():
     """Launch Streamlit app with proper configuration for Windows executable."""
@@ -35,8 +60,8 @@ def main():
         # Set environment variables for Streamlit
         os.environ['STREAMLIT_BROWSER_GATHER_USAGE_STATS'] = 'false'
         os.environ['STREAMLIT_SERVER_HEADLESS'] = 'true'
-        os.environ['STREAMLIT_SERVER_ADDRESS'] = 'localhost'
-        os.environ['STREAMLIT_SERVER_PORT'] = '8501'
+        os.environ['STREAMLIT_SERVER_ADDRESS'] = SERVER_HOST
+        os.environ['STREAMLIT_SERVER_PORT'] = str(SERVER_PORT)
         logging.info("Set Streamlit environment variables")
         
         # Import Streamlit components
@@ -51,7 +76,7 @@ def main():
         os.environ['STREAMLIT_CONFIG_DIR'] = config_path
         logging.info(f"Using config path: {config_path}")
         
-        # Start browser in a separate thread
+        # Start browser in a separate thread, once the server answers
         browser_thread = threading.Thread(target=open_browser)
         browser_thread.daemon = True
         browser_thread.start()
@@ -75,4 +100,7 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Required for process pools (ExcelConsolidator workers) in the frozen executable
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -21,29 +21,24 @@ a = Analysis(
     binaries=[],
     datas=datas + [('app', 'app'), ('app/.streamlit', '.streamlit'), ('assets', 'assets')],
     hiddenimports=[
-        'streamlit',
-        'streamlit.web.cli',
-        'streamlit.web.server',
-        'streamlit.web.bootstrap',
-        'streamlit.runtime',
-        'streamlit.runtime.scriptrunner',
+        # Imported dynamically by the Streamlit runtime
         'streamlit.runtime.scriptrunner.magic_funcs',
-        'streamlit.runtime.caching',
-        'streamlit.runtime.state',
-        'streamlit.runtime.legacy_caching',
-        'streamlit.web.server.server',
-        'streamlit.web.server.server_util',
         'streamlit.components.v1',
-        'pandas',
-        'openpyxl',
+        # app/ is bundled as data and imported by streamlit_app.py at run time, so the
+        # analysis only sees its third-party dependencies through these
         'app.consolidator',
-        'webbrowser',
-        'threading',
+        'app.preview',
+        'app.tasks',
+        'app.worker_pool',
+        # Loaded by pandas through importlib for the calamine read engine
+        'python_calamine',
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Optional dependencies of pandas/streamlit the app never uses; leaving them out
+    # makes the one-file executable smaller and faster to unpack on every start
+    excludes=['tkinter', 'matplotlib', 'IPython', 'scipy', 'pytest'],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -0,0 +1,136 @@
+import pytest
+import pandas as pd
+import json
+import shutil
+from pathlib import Path
+import os
+import sys
+import sqlite3
+import tempfile
+
+# Add parent directory to path to import the cli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app import cli
+
+
+class TestCli:
+    def setup_method(self):
+        self.test_file_path = Path(__file__).parent.parent / "data" / "EMPRESA_1-A3_TODO_EJERCICIO_2020.xlsx"
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_batch_consolidation_writes_outputs_and_report(self):
+        """Test consolidating a folder with a broken file writes outputs and a report"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        input_dir = self.temp_dir / "entrada"
+        output_dir = self.temp_dir / "salida"
+        input_dir.mkdir()
+        shutil.copy(self.test_file_path, input_dir / "EMPRESA_1.xlsx")
+        shutil.copy(self.test_file_path, input_dir / "EMPRESA_2.xlsx")
+        (input_dir / "ROTO.xlsx").write_bytes(b"not an excel file")
+
+        exit_code = cli.main([str(input_dir), "--output-dir", str(output_dir), "--workers", "2"])
+
+        assert exit_code == 1, "A failed file should make the run exit with an error"
+        assert (output_dir / "EMPRESA_1_consolidated.xlsx").exists()
+        assert (output_dir / "EMPRESA_2_consolidated.xlsx").exists()
+
+        report = json.loads((output_dir / "consolidation_report.json").read_text(encoding="utf-8"))
+        assert report["files"] == 3
+        assert report["failed"] == 1
+        results = {Path(r["file"]).name: r for r in report["results"]}
+        assert results["ROTO.xlsx"]["status"] == "error"
+        assert results["EMPRESA_1.xlsx"]["rows_per_sheet"] == {"Enero": 6, "Febrero": 6}
+        assert results["EMPRESA_1.xlsx"]["seconds"] > 0
+
+    def test_find_input_files_skips_previous_outputs(self):
+        """Test that glob expansion ignores lock files and earlier consolidated outputs"""
+        for name in ("A.xlsx", "A_consolidated.xlsx", "~$A.xlsx", "notas.txt"):
+            (self.temp_dir / name).write_bytes(b"")
+
+        files = cli.find_input_files([str(self.temp_dir / "*")])
+        assert [f.name for f in files] == ["A.xlsx"]
+
+    def test_merge_writes_a_single_master(self):
+        """Test --merge joins every file into one output with File_Origin"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        shutil.copy(self.test_file_path, self.temp_dir / "EMPRESA_1.xlsx")
+        shutil.copy(self.test_file_path, self.temp_dir / "EMPRESA_2.xlsx")
+        output_path = self.temp_dir / "salida" / "grupo.csv"
+        output_path.parent.mkdir()
+
+        exit_code = cli.main([str(self.temp_dir), "--merge", str(output_path), "--workers", "2"])
+
+        assert exit_code == 0
+        merged = pd.read_csv(output_path)
+        assert merged["File_Origin"].value_counts().to_dict() == {"EMPRESA_1.xlsx": 12, "EMPRESA_2.xlsx": 12}
+        report = json.loads((output_path.parent / "consolidation_report.json").read_text(encoding="utf-8"))
+        assert report["master_rows"] == 24
+        assert report["errors"] == {}
+
+    def test_database_loads_are_upserted_by_file_and_sheet(self):
+        """Test --database keeps one copy of each file however many times it is loaded"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        input_dir = self.temp_dir / "entrada"
+        input_dir.mkdir()
+        shutil.copy(self.test_file_path, input_dir / "EMPRESA_1.xlsx")
+        shutil.copy(self.test_file_path, input_dir / "EMPRESA_2.xlsx")
+        database = self.temp_dir / "diarios.db"
+
+        for _ in range(2):
+            exit_code = cli.main([
+                str(input_dir), "--database", str(database), "--workers", "2",
+                "--report", str(self.temp_dir / "informe.json"),
+            ])
+            assert exit_code == 0
+
+        assert not list(input_dir.glob("*_consolidated.xlsx"))
+        with sqlite3.connect(database) as connection:
+            counts = connection.execute(
+                "SELECT File_Origin, Sheet_Origin, COUNT(*) FROM master "
+                "GROUP BY File_Origin, Sheet_Origin ORDER BY 1, 2"
+            ).fetchall()
+            january = connection.execute(
+                "SELECT COUNT(*) FROM master WHERE Fecha BETWEEN '2020-01-01' AND '2020-01-31'"
+            ).fetchone()[0]
+        empresa_1 = str((input_dir / "EMPRESA_1.xlsx").resolve())
+        empresa_2 = str((input_dir / "EMPRESA_2.xlsx").resolve())
+        assert counts == [
+            (empresa_1, "Enero", 6), (empresa_1, "Febrero", 6),
+            (empresa_2, "Enero", 6), (empresa_2, "Febrero", 6),
+        ]
+        assert january == 12
+
+    def test_database_keeps_same_named_files_of_different_folders(self):
+        """Test 2020/diario.xlsx and 2021/diario.xlsx do not replace each other's rows"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        for year in ("2020", "2021"):
+            (self.temp_dir / year).mkdir()
+            shutil.copy(self.test_file_path, self.temp_dir / year / "diario.xlsx")
+        database = self.temp_dir / "diarios.db"
+
+        exit_code = cli.main([
+            str(self.temp_dir / "2020"), str(self.temp_dir / "2021"), "--database", str(database),
+            "--workers", "1", "--report", str(self.temp_dir / "informe.json"),
+        ])
+        assert exit_code == 0
+
+        with sqlite3.connect(database) as connection:
+            counts = connection.execute(
+                "SELECT File_Origin, COUNT(*) FROM master GROUP BY File_Origin ORDER BY 1"
+            ).fetchall()
+        assert counts == [
+            (str((self.temp_dir / "2020" / "diario.xlsx").resolve()), 12),
+            (str((self.temp_dir / "2021" / "diario.xlsx").resolve()), 12),
+        ]
@@ -5,11 +5,16 @@ from pathlib import Path
 import os
 import sys
 import tempfile
+import io
+import zipfile
 
 # Add parent directory to path to import consolidator
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from app.consolidator import ExcelConsolidator
+from app.cache import ResultCache
+from app.consolidator import ExcelConsolidator, calamine_available
+from app.instrumentation import Instrumentation
+from app.preview import MasterIndex
 
 
 class TestExcelConsolidator:
@@ -28,6 +33,27 @@ class TestExcelConsolidator:
         """Test that the required test file exists"""
         assert self.test_file_path.exists(), f"Test file {self.test_file_path} should exist in tests/data directory"
 
+    def test_frame_from_raw_matches_read_excel(self):
+        """Test that the single-parse path gives the same frame as re-reading with a header"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        excel_file = pd.ExcelFile(io.BytesIO(file_bytes))
+        for sheet_name in excel_file.sheet_names:
+            df_raw = self.consolidator.load_sheet(excel_file, sheet_name)
+            header_row = self.consolidator.find_header_row(df_raw)
+            assert header_row is not None
+
+            expected = pd.read_excel(
+                io.BytesIO(file_bytes), sheet_name=sheet_name, header=header_row
+            )
+            pd.testing.assert_frame_equal(
+                self.consolidator.frame_from_raw(df_raw, header_row), expected
+            )
+
     def test_process_excel_file_with_real_file(self):
         """Test processing the actual Excel file from data directory"""
         if not self.test_file_path.exists():
@@ -170,4 +196,460 @@ class TestExcelConsolidator:
         
         entry_count = int(match.group(1))
         assert entry_count < 20, f"January should have reasonable number of entries, got {entry_count}"
-        assert entry_count > 0, "January should have at least some entries"
\ No newline at end of file
+        assert entry_count > 0, "January should have at least some entries"
+
+    def test_stream_excel_file_matches_process_excel_file(self):
+        """Test that streaming mode writes the same MASTER data as the in-memory mode"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        output_workbook, master_df = self.consolidator.process_excel_file(
+            file_bytes, self.test_file_path.name
+        )
+        expected_output = io.BytesIO()
+        output_workbook.save(expected_output)
+        expected_output.seek(0)
+
+        streamed_output = io.BytesIO()
+        master_rows = self.consolidator.stream_excel_file(
+            file_bytes, self.test_file_path.name, streamed_output
+        )
+        streamed_output.seek(0)
+
+        assert master_rows == len(master_df)
+        streamed_sheets = pd.read_excel(streamed_output, sheet_name=None)
+        assert list(streamed_sheets) == output_workbook.sheetnames
+        pd.testing.assert_frame_equal(
+            streamed_sheets["MASTER"], pd.read_excel(expected_output, sheet_name="MASTER")
+        )
+
+    def test_process_excel_file_parallel_matches_serial(self):
+        """Test that processing sheets in a process pool keeps MASTER and messages in order"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        serial_messages = []
+        serial_workbook, serial_df = self.consolidator.process_excel_file(
+            file_bytes, self.test_file_path.name, progress_callback=serial_messages.append
+        )
+
+        parallel_messages = []
+        parallel_workbook, parallel_df = ExcelConsolidator(workers=2).process_excel_file(
+            file_bytes, self.test_file_path.name, progress_callback=parallel_messages.append
+        )
+
+        pd.testing.assert_frame_equal(parallel_df, serial_df)
+        assert parallel_messages == serial_messages
+        assert parallel_workbook.sheetnames == serial_workbook.sheetnames
+
+    def test_sheet_workers_only_return_raw_sheets_when_needed(self):
+        """Test extraction in a process pool does not send the raw sheets back"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        consolidator = ExcelConsolidator(workers=2)
+        results = list(consolidator._iter_sheet_results(file_bytes, self.test_file_path.name, need_raw=False))
+        assert [sheet_name for sheet_name, _, _ in results] == ["Enero", "Febrero"]
+        assert all(df_raw is None for _, df_raw, _ in results)
+
+        parallel_df = consolidator.extract_master_df(file_bytes, self.test_file_path.name)
+        serial_df = self.consolidator.extract_master_df(file_bytes, self.test_file_path.name)
+        pd.testing.assert_frame_equal(parallel_df, serial_df)
+
+    def test_consolidate_reuses_cached_result(self):
+        """Test that a repeated upload is answered from the cache without processing"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        consolidator = ExcelConsolidator(cache=ResultCache())
+        output_bytes, master_df = consolidator.consolidate(file_bytes, self.test_file_path.name)
+
+        def fail_if_called(*args, **kwargs):
+            raise AssertionError("process_excel_file should not run on a cache hit")
+
+        consolidator.process_excel_file = fail_if_called
+        cached_bytes, cached_df = consolidator.consolidate(file_bytes, self.test_file_path.name)
+
+        assert cached_bytes == output_bytes
+        pd.testing.assert_frame_equal(cached_df, master_df)
+        reloaded_df = pd.read_excel(io.BytesIO(cached_bytes), sheet_name="MASTER")
+        assert len(reloaded_df) == len(master_df)
+
+    def test_process_excel_file_without_original_sheets(self):
+        """Test that only MASTER is built when the original sheets are not needed"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        output_workbook, master_df = ExcelConsolidator(
+            copy_original_sheets=False
+        ).process_excel_file(file_bytes, self.test_file_path.name)
+
+        assert output_workbook.sheetnames == ["MASTER"]
+        assert len(master_df) > 0
+
+    def test_export_master_csv_matches_master_df(self):
+        """Test exporting MASTER to CSV without building the workbook"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        _, master_df = self.consolidator.process_excel_file(file_bytes, self.test_file_path.name)
+
+        output = io.BytesIO()
+        exported_df = self.consolidator.export_master(
+            file_bytes, self.test_file_path.name, output, fmt="csv"
+        )
+        output.seek(0)
+
+        pd.testing.assert_frame_equal(exported_df, master_df)
+        reloaded = pd.read_csv(output)
+        assert len(reloaded) == len(master_df)
+        assert reloaded["Asiento"].tolist() == master_df["Asiento"].astype(int).tolist()
+
+    def test_package_output_keeps_original_sheet_parts(self):
+        """Test the package engine copies original sheets untouched and adds MASTER first"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        _, expected_df = self.consolidator.process_excel_file(file_bytes, self.test_file_path.name)
+        output_bytes, master_df = ExcelConsolidator(output_engine="package").consolidate(
+            file_bytes, self.test_file_path.name
+        )
+
+        with zipfile.ZipFile(io.BytesIO(file_bytes)) as original, \
+                zipfile.ZipFile(io.BytesIO(output_bytes)) as output:
+            for name in original.namelist():
+                if name.startswith("xl/worksheets/") or name == "xl/sharedStrings.xml":
+                    assert output.read(name) == original.read(name), f"{name} should be copied untouched"
+
+        reloaded = openpyxl.load_workbook(io.BytesIO(output_bytes))
+        assert reloaded.sheetnames[0] == "MASTER"
+        assert reloaded.sheetnames[1:] == pd.ExcelFile(io.BytesIO(file_bytes)).sheet_names
+
+        master_sheet = pd.read_excel(io.BytesIO(output_bytes), sheet_name="MASTER")
+        assert len(master_sheet) == len(expected_df)
+        assert list(master_sheet.columns) == list(expected_df.columns)
+        pd.testing.assert_series_equal(master_sheet["Fecha"], expected_df["Fecha"])
+
+    def test_instrumentation_reports_every_stage_per_sheet(self):
+        """Test the per-stage events, including those recorded in worker processes"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        _, expected_df = self.consolidator.consolidate(file_bytes, self.test_file_path.name)
+        sheet_names = pd.ExcelFile(io.BytesIO(file_bytes)).sheet_names
+
+        for workers in (1, 2):
+            instrumentation = Instrumentation()
+            _, master_df = ExcelConsolidator(workers=workers, instrumentation=instrumentation).consolidate(
+                file_bytes, self.test_file_path.name
+            )
+            pd.testing.assert_frame_equal(master_df, expected_df)
+
+            events = instrumentation.events
+            for sheet_name in sheet_names:
+                sheet_stages = [e["stage"] for e in events if e["sheet"] == sheet_name]
+                assert sheet_stages == ["parse", "header", "frame", "ffill", "filters", "workbook"]
+            filters_out = sum(e["rows_out"] for e in events if e["stage"] == "filters")
+            assert filters_out == len(master_df)
+            assert [e["stage"] for e in events if e["sheet"] is None] == ["concat", "dtypes", "save"]
+
+    def test_consolidate_to_file_writes_output_to_disk(self):
+        """Test the spill-to-disk path writes the same workbook and caches it"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        output_path = Path(tempfile.mktemp(suffix=".xlsx"))
+        self.temp_files.append(output_path)
+        consolidator = ExcelConsolidator(cache=ResultCache())
+        master_df = consolidator.consolidate_to_file(file_bytes, self.test_file_path.name, output_path)
+
+        _, expected_df = self.consolidator.consolidate(file_bytes, self.test_file_path.name)
+        pd.testing.assert_frame_equal(master_df, expected_df)
+        reloaded = pd.read_excel(output_path, sheet_name="MASTER")
+        assert len(reloaded) == len(expected_df)
+
+        # A repeated call is served from the cache with the bytes written the first time
+        written = output_path.read_bytes()
+        output_path.unlink()
+        consolidator.process_excel_file = None
+        consolidator.consolidate_to_file(file_bytes, self.test_file_path.name, output_path)
+        assert output_path.read_bytes() == written
+
+    def test_compact_dtypes_keep_the_excel_output_identical(self):
+        """Test the dtype compaction shrinks master_df without changing any written sheet"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        def sheet_parts(consolidator):
+            output_bytes, master_df = consolidator.consolidate(file_bytes, self.test_file_path.name)
+            with zipfile.ZipFile(io.BytesIO(output_bytes)) as output:
+                parts = {name: output.read(name) for name in output.namelist() if name.startswith("xl/worksheets/")}
+            return parts, master_df
+
+        compact = ExcelConsolidator()
+        compact_parts, compact_df = sheet_parts(compact)
+        plain_parts, plain_df = sheet_parts(ExcelConsolidator(compact_dtypes=False))
+
+        assert compact_parts == plain_parts
+        assert compact_df["Sheet_Origin"].dtype == "category"
+        assert compact.master_memory_bytes["after"] < compact.master_memory_bytes["before"]
+        pd.testing.assert_frame_equal(compact_df, plain_df, check_dtype=False, check_categorical=False)
+
+
+    def test_merge_files_writes_one_master_with_file_origin(self):
+        """Test merging two companies and a broken file into a single MASTER"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+        _, expected_df = self.consolidator.consolidate(file_bytes, self.test_file_path.name)
+
+        inputs = [
+            ("EMPRESA_1.xlsx", file_bytes),
+            ("ROTO.xlsx", b"not an excel file"),
+            ("EMPRESA_2.xlsx", file_bytes),
+        ]
+        for fmt in ("xlsx", "csv"):
+            output_path = Path(tempfile.mktemp(suffix=f".{fmt}"))
+            self.temp_files.append(output_path)
+            summary = self.consolidator.merge_files(inputs, output_path, fmt=fmt)
+
+            assert summary["master_rows"] == 2 * len(expected_df)
+            assert summary["rows_per_file"] == {"EMPRESA_1.xlsx": len(expected_df), "EMPRESA_2.xlsx": len(expected_df)}
+            assert list(summary["errors"]) == ["ROTO.xlsx"]
+
+            if fmt == "xlsx":
+                merged = pd.read_excel(output_path, sheet_name="MASTER")
+            else:
+                merged = pd.read_csv(output_path)
+            assert list(merged.columns) == list(expected_df.columns[:-1]) + ["File_Origin", "Sheet_Origin"]
+            assert merged["File_Origin"].tolist() == ["EMPRESA_1.xlsx"] * len(expected_df) + ["EMPRESA_2.xlsx"] * len(expected_df)
+            assert merged["Sheet_Origin"].tolist() == expected_df["Sheet_Origin"].astype(str).tolist() * 2
+
+    def test_calamine_read_engine_matches_pandas_engine(self):
+        """Test the calamine fast path produces the same workbook and master_df as openpyxl"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+        if not calamine_available():
+            pytest.skip("python-calamine is not installed")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        results = {}
+        for engine in ("pandas", "calamine"):
+            consolidator = ExcelConsolidator(read_engine=engine)
+            excel_file = consolidator.open_excel_file(file_bytes)
+            raw_sheets = {name: consolidator.load_sheet(excel_file, name) for name in excel_file.sheet_names}
+            output_bytes, master_df = consolidator.consolidate(file_bytes, self.test_file_path.name)
+            with zipfile.ZipFile(io.BytesIO(output_bytes)) as output:
+                parts = {name: output.read(name) for name in output.namelist() if name.startswith("xl/worksheets/")}
+            results[engine] = (raw_sheets, parts, master_df)
+
+        pandas_sheets, pandas_parts, pandas_df = results["pandas"]
+        calamine_sheets, calamine_parts, calamine_df = results["calamine"]
+        assert list(calamine_sheets) == list(pandas_sheets)
+        for name, df_raw in pandas_sheets.items():
+            pd.testing.assert_frame_equal(calamine_sheets[name], df_raw)
+        assert calamine_parts == pandas_parts
+        pd.testing.assert_frame_equal(calamine_df, pandas_df)
+
+    def test_chunked_reading_matches_whole_sheets(self):
+        """Test reading the sheets in small windows extracts the same master_df"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        consolidator = ExcelConsolidator(copy_original_sheets=False)
+        _, expected_df = consolidator.process_excel_file(file_bytes, self.test_file_path.name)
+
+        # Window sizes that split asientos and their continuation rows differently
+        for chunk_rows in (1, 2, 5, 1000):
+            chunked = ExcelConsolidator(copy_original_sheets=False, chunk_rows=chunk_rows)
+            _, master_df = chunked.process_excel_file(file_bytes, self.test_file_path.name)
+            pd.testing.assert_frame_equal(master_df, expected_df)
+            assert chunked.total_rows_dropped == consolidator.total_rows_dropped
+
+        chunks = list(ExcelConsolidator(chunk_rows=2).iter_sheet_chunks(file_bytes, self.test_file_path.name))
+        assert all(len(valid_rows) <= 2 for _, valid_rows in chunks)
+        assert sum(len(valid_rows) for _, valid_rows in chunks) == len(expected_df)
+
+    def test_auto_profile_reads_a3_and_sage_exports(self):
+        """Test a ContaPlus-style export and the A3 file go through the same pipeline"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        workbook = openpyxl.Workbook()
+        ws = workbook.active
+        ws.title = "Enero"
+        ws.append(["Listado de diario"])
+        ws.append(["Asto.", "Fecha", "Subcuenta", "Título subcuenta", "Concepto", "Debe", "Haber"])
+        ws.append(["1", "02/01/2020", "4300001", "CLIENTE", "Factura 1", "1.210,00", None])
+        ws.append([None, None, "7000000", "VENTAS", "Factura 1", None, "1.000,00"])
+        ws.append([None, None, "4770000", "IVA REPERCUTIDO", "Factura 1", None, "210,00"])
+        ws.append([None, None, None, None, "Suma y sigue", "1.210,00", "1.210,00"])
+        sage_output = io.BytesIO()
+        workbook.save(sage_output)
+
+        consolidator = ExcelConsolidator(copy_original_sheets=False)
+        _, sage_df = consolidator.process_excel_file(sage_output.getvalue(), "sage.xlsx")
+        assert sage_df["Asto."].tolist() == [1, 1, 1]
+        assert sage_df["Fecha"].tolist() == [pd.Timestamp("2020-01-02")] * 3
+        assert sage_df["Debe"].fillna(0).tolist() == [1210.0, 0.0, 0.0]
+        assert sage_df["Haber"].fillna(0).sum() == 1210.0
+        assert consolidator.total_rows_dropped == {"Enero": 1}
+
+        # With canonical_columns the resolved columns take the A3 names, in MASTER and streaming
+        consolidator = ExcelConsolidator(copy_original_sheets=False, canonical_columns=True)
+        canonical_columns = [
+            "Asiento", "Fecha", "Cuenta", "Descripción de la cuenta", "Concepto",
+            "Importe debe", "Importe haber", "Sheet_Origin",
+        ]
+        _, canonical_df = consolidator.process_excel_file(sage_output.getvalue(), "sage.xlsx")
+        assert list(canonical_df.columns) == canonical_columns
+        assert canonical_df["Importe debe"].fillna(0).tolist() == [1210.0, 0.0, 0.0]
+        streamed_output = io.BytesIO()
+        consolidator.stream_excel_file(sage_output.getvalue(), "sage.xlsx", streamed_output)
+        streamed_output.seek(0)
+        assert list(pd.read_excel(streamed_output, sheet_name="MASTER").columns) == canonical_columns
+
+        # Forcing A3 finds no header in the Sage export; the A3 file is unchanged by auto
+        assert ExcelConsolidator(profile="a3").extract_master_df(sage_output.getvalue(), "sage.xlsx") is None
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+        pd.testing.assert_frame_equal(
+            ExcelConsolidator(profile="auto").extract_master_df(file_bytes, self.test_file_path.name),
+            ExcelConsolidator(profile="a3").extract_master_df(file_bytes, self.test_file_path.name),
+        )
+
+    def test_master_keeps_the_source_headers(self):
+        """Test MASTER has the headers of a sheet with Descripción/Debe/Haber columns, in every mode"""
+        header = ["Fecha", "Asiento", "Concepto", "Cuenta", "Descripción", "Debe", "Haber"]
+        workbook = openpyxl.Workbook()
+        ws = workbook.active
+        ws.title = "Enero"
+        ws.append(header)
+        ws.append([pd.Timestamp("2020-01-02").to_pydatetime(), 1, "Factura 1", 43000001, "Cliente", 121.0, None])
+        ws.append([None, None, "Factura 1", 70000000, "Ventas", None, 121.0])
+        output = io.BytesIO()
+        workbook.save(output)
+        file_bytes = output.getvalue()
+
+        _, master_df = self.consolidator.process_excel_file(file_bytes, "diario.xlsx")
+        assert list(master_df.columns) == header + ["Sheet_Origin"]
+        chunked_df = ExcelConsolidator(chunk_rows=1).extract_master_df(file_bytes, "diario.xlsx")
+        assert list(chunked_df.columns) == header + ["Sheet_Origin"]
+        streamed_output = io.BytesIO()
+        self.consolidator.stream_excel_file(file_bytes, "diario.xlsx", streamed_output)
+        streamed_output.seek(0)
+        assert list(pd.read_excel(streamed_output, sheet_name="MASTER").columns) == header + ["Sheet_Origin"]
+
+    def test_auto_profile_keeps_plain_debe_haber_sheets_as_read(self):
+        """Test a sheet with plain Debe/Haber headers is not converted by the Sage profile"""
+        workbook = openpyxl.Workbook()
+        ws = workbook.active
+        ws.title = "Enero"
+        ws.append(["Fecha", "Asiento", "Concepto", "Debe", "Haber"])
+        ws.append(["02/01/2020", "A-001", "Factura 1", "1.000,50", None])
+        ws.append([None, None, "Factura 1", None, "1.000,50"])
+        ws.append(["03/01/2020", "A-002", "Cobro", 20.0, None])
+        output = io.BytesIO()
+        workbook.save(output)
+
+        master_df = ExcelConsolidator().extract_master_df(output.getvalue(), "diario.xlsx")
+        assert master_df["Asiento"].tolist() == ["A-001", "A-001", "A-002"]
+        assert master_df["Fecha"].tolist() == ["02/01/2020", "02/01/2020", "03/01/2020"]
+        assert master_df["Debe"].tolist()[0] == "1.000,50"
+
+    def test_sage_export_is_validated_indexed_and_streamed(self):
+        """Test a Sage export gets the checks, preview filters and dtypes of an A3 one"""
+        workbook = openpyxl.Workbook()
+        ws = workbook.active
+        ws.title = "Enero"
+        ws.append(["Asto.", "Fecha", "Subcuenta", "Concepto", "Debe", "Haber"])
+        ws.append(["1", "02/01/2020", "4300001", "Factura 1", "1.210,00", None])
+        ws.append([None, None, "7000000", "Factura 1", None, "1.210,00"])
+        ws.append(["2", "31/01/2020", "5720001", "Cobro", "50,50", None])
+        ws.append([None, None, "4300001", "Cobro", None, "50,00"])
+        sage_output = io.BytesIO()
+        workbook.save(sage_output)
+        file_bytes = sage_output.getvalue()
+
+        consolidator = ExcelConsolidator(copy_original_sheets=False, validate=True)
+        output_workbook, master_df = consolidator.process_excel_file(file_bytes, "sage.xlsx")
+        assert consolidator.validation.skipped == []
+        assert consolidator.validation.unbalanced["Asiento"].tolist() == [2]
+
+        index = MasterIndex(master_df)
+        assert (index.fecha_col, index.asiento_col, index.account_col) == ("Fecha", "Asto.", "Subcuenta")
+        assert index.filter(asiento_from=2, asiento_to=2).tolist() == [2, 3]
+        assert index.filter(account="430").tolist() == [0, 3]
+
+        expected_output = io.BytesIO()
+        output_workbook.save(expected_output)
+        expected_output.seek(0)
+        streamed_output = io.BytesIO()
+        assert consolidator.stream_excel_file(file_bytes, "sage.xlsx", streamed_output) == 4
+        streamed_output.seek(0)
+        streamed_master = pd.read_excel(streamed_output, sheet_name="MASTER")
+        assert streamed_master["Debe"].fillna(0).tolist() == [1210.0, 0.0, 50.5, 0.0]
+        pd.testing.assert_frame_equal(
+            streamed_master, pd.read_excel(expected_output, sheet_name="MASTER")
+        )
+
+    def test_validation_sheet_follows_master(self):
+        """Test the validation stage reports the fixture's unbalanced opening asiento"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        with open(self.test_file_path, "rb") as f:
+            file_bytes = f.read()
+
+        consolidator = ExcelConsolidator(validate=True)
+        output_bytes, master_df = consolidator.consolidate(file_bytes, self.test_file_path.name)
+
+        assert consolidator.validation.summary() == {
+            "asientos": 6,
+            "unbalanced_asientos": 1,
+            "cross_sheet_asientos": 0,
+            "date_mismatch_rows": 0,
+            "skipped_checks": [],
+        }
+        workbook = openpyxl.load_workbook(io.BytesIO(output_bytes))
+        assert workbook.sheetnames == ["MASTER", "VALIDATION", "Enero", "Febrero"]
+        rows = list(workbook["VALIDATION"].iter_rows(values_only=True))
+        assert rows[2][:2] == ("Asientos descuadrados", 1)
+        assert ("Asiento", "Debe", "Haber", "Diferencia", "Hojas") in [row[:5] for row in rows]
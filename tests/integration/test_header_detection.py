@@ -0,0 +1,129 @@
+import pytest
+import pandas as pd
+import numpy as np
+import openpyxl
+import datetime
+import io
+from pathlib import Path
+import os
+import sys
+
+# Add parent directory to path to import consolidator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.consolidator import ExcelConsolidator
+
+
+TEST_FILE_PATH = Path(__file__).parent.parent / "data" / "EMPRESA_1-A3_TODO_EJERCICIO_2020.xlsx"
+
+
+def legacy_find_header_row(df_raw):
+    """Row-by-row implementation the vectorized detector must stay compatible with"""
+    for idx, row in df_raw.iterrows():
+        row_str = [str(val).lower() if pd.notna(val) else "" for val in row]
+        has_fecha = any("fecha" in val for val in row_str)
+        has_asiento = any("asiento" in val for val in row_str)
+
+        if has_fecha and has_asiento:
+            return idx
+    return None
+
+
+def synthetic_frames():
+    header = ["Fecha", "Asiento", "Apunte", "Concepto", "Importe debe"]
+    data = [pd.Timestamp("2020-01-01"), 1.0, 1, "Factura", 100.0]
+    preamble = [["Diario.", None, None, None, None], [None] * 5, ["Fecha: 21/12/2024", None, None, None, None]]
+    return {
+        "header_first_row": pd.DataFrame([header, data]),
+        "a3_preamble": pd.DataFrame(preamble + [header, data, data]),
+        "long_preamble": pd.DataFrame([["Texto", i, None, None, None] for i in range(80)] + [header, data]),
+        "preamble_past_first_window": pd.DataFrame(
+            [["Texto", i, None, None, None] for i in range(150)] + [header, data]
+        ),
+        "no_header": pd.DataFrame([data] * 50),
+        "split_across_rows": pd.DataFrame([["Fecha", None, None, None, None], [None, "Asiento", None, None, None], data]),
+        "numeric_only": pd.DataFrame(np.arange(40, dtype=float).reshape(8, 5)),
+        "empty": pd.DataFrame(),
+        "non_range_index": pd.DataFrame(preamble + [header, data], index=[10, 11, 12, 13, 14]),
+        "mixed_case_partial": pd.DataFrame(preamble + [["FECHA valor", "Núm. ASIENTO", None, None, None], data]),
+    }
+
+
+class TestHeaderDetectionParity:
+    def setup_method(self):
+        self.consolidator = ExcelConsolidator(header_search_rows=None)
+
+    def test_parity_on_fixture_sheets(self):
+        """Test vectorized detection returns the legacy index for every fixture sheet"""
+        if not TEST_FILE_PATH.exists():
+            pytest.skip(f"Test file {TEST_FILE_PATH} not found")
+
+        excel_file = pd.ExcelFile(TEST_FILE_PATH)
+        for sheet_name in excel_file.sheet_names:
+            df_raw = self.consolidator.load_sheet(excel_file, sheet_name)
+            expected = legacy_find_header_row(df_raw)
+            assert expected is not None
+            assert self.consolidator.find_header_row(df_raw) == expected
+            assert ExcelConsolidator().find_header_row(df_raw) == expected
+
+    @pytest.mark.parametrize("name", list(synthetic_frames()))
+    def test_parity_on_synthetic_frames(self, name):
+        """Test vectorized detection returns the legacy index on edge-case layouts"""
+        df_raw = synthetic_frames()[name]
+        assert self.consolidator.find_header_row(df_raw) == legacy_find_header_row(df_raw)
+
+    @pytest.mark.parametrize("name", list(synthetic_frames()))
+    def test_parity_with_default_settings(self, name):
+        """Test the default consolidator finds the legacy index, past its first window too"""
+        df_raw = synthetic_frames()[name]
+        assert ExcelConsolidator().find_header_row(df_raw) == legacy_find_header_row(df_raw)
+
+    def test_header_past_first_window_is_consolidated(self):
+        """Test a sheet whose header follows a 150-row preamble still reaches MASTER"""
+        workbook = openpyxl.Workbook()
+        ws = workbook.active
+        ws.title = "Enero"
+        for i in range(150):
+            ws.append(["Texto", i])
+        ws.append(["Fecha", "Asiento", "Apunte", "Concepto", "Importe debe"])
+        for asiento in range(1, 7):
+            ws.append([datetime.datetime(2020, 1, asiento), asiento, 1, "Factura", 100.0])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+
+        master_df = ExcelConsolidator().extract_master_df(buffer.getvalue(), "diario.xlsx")
+        assert master_df is not None
+        assert len(master_df) == 6
+
+    def test_search_window_bounds_detection(self):
+        """Test that a header beyond the search window is not found"""
+        df_raw = synthetic_frames()["long_preamble"]
+
+        assert ExcelConsolidator(header_search_rows=50).find_header_row(df_raw) is None
+        assert ExcelConsolidator(header_search_rows=81).find_header_row(df_raw) == 80
+
+    def test_empty_header_cells_are_named_like_read_excel(self):
+        """Test an empty header cell becomes "Unnamed: n" in every mode, as pd.read_excel names it"""
+        workbook = openpyxl.Workbook()
+        ws = workbook.active
+        ws.title = "Enero"
+        ws.append(["Diario."])
+        ws.append(["Fecha", "Asiento", None, "Concepto", "Importe debe"])
+        ws.append([datetime.datetime(2020, 1, 2), 1, "x", "Factura", 100.0])
+        ws.append([datetime.datetime(2020, 1, 3), 2, None, "Cobro", 50.0])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        file_bytes = buffer.getvalue()
+
+        expected = list(pd.read_excel(io.BytesIO(file_bytes), header=1).columns) + ["Sheet_Origin"]
+        assert expected[2] == "Unnamed: 2"
+
+        consolidator = ExcelConsolidator()
+        _, master_df = consolidator.process_excel_file(file_bytes, "diario.xlsx")
+        assert list(master_df.columns) == expected
+        chunked_df = ExcelConsolidator(chunk_rows=1).extract_master_df(file_bytes, "diario.xlsx")
+        assert list(chunked_df.columns) == expected
+        streamed_output = io.BytesIO()
+        consolidator.stream_excel_file(file_bytes, "diario.xlsx", streamed_output)
+        streamed_output.seek(0)
+        assert list(pd.read_excel(streamed_output, sheet_name="MASTER").columns) == expected
@@ -0,0 +1,83 @@
+import pytest
+import pandas as pd
+import openpyxl
+import io
+import shutil
+import tempfile
+from pathlib import Path
+import os
+import sys
+
+# Add parent directory to path to import consolidator
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.consolidator import ExcelConsolidator
+from app.incremental import SheetStore, sheet_fingerprints
+
+
+class TestIncrementalConsolidation:
+    def setup_method(self):
+        self.test_file_path = Path(__file__).parent.parent / "data" / "EMPRESA_1-A3_TODO_EJERCICIO_2020.xlsx"
+        self.store_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def _weekly_exports(self):
+        """Two exports of the same workbook where only Febrero changes"""
+        # Round-trip once through openpyxl so both exports are written the same way
+        base = io.BytesIO()
+        openpyxl.load_workbook(self.test_file_path).save(base)
+
+        first = io.BytesIO()
+        openpyxl.load_workbook(base).save(first)
+
+        workbook = openpyxl.load_workbook(base)
+        febrero = workbook["Febrero"]
+        for row in febrero.iter_rows(min_row=8):
+            if isinstance(row[3].value, str):
+                row[3].value = row[3].value + " corregido"
+                break
+        second = io.BytesIO()
+        workbook.save(second)
+        return first.getvalue(), second.getvalue()
+
+    def test_fingerprints_only_change_for_modified_sheet(self):
+        """Test that editing one sheet only changes that sheet's fingerprint"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        first, second = self._weekly_exports()
+        before = sheet_fingerprints(first, {})
+        after = sheet_fingerprints(second, {})
+
+        assert before["Enero"] == after["Enero"]
+        assert before["Febrero"] != after["Febrero"]
+        assert sheet_fingerprints(first, {"header_search_rows": 5})["Enero"] != before["Enero"]
+
+    def test_only_changed_sheets_are_reprocessed(self):
+        """Test that a rerun reuses unchanged sheets and gives the same MASTER"""
+        if not self.test_file_path.exists():
+            pytest.skip(f"Test file {self.test_file_path} not found")
+
+        first, second = self._weekly_exports()
+        consolidator = ExcelConsolidator(sheet_store=SheetStore(self.store_dir))
+        consolidator.extract_master_df(first, "diario.xlsx")
+
+        processed = []
+        original_process_sheet = consolidator.process_sheet
+
+        def tracking_process_sheet(df_raw, sheet_name):
+            processed.append(sheet_name)
+            return original_process_sheet(df_raw, sheet_name)
+
+        consolidator.process_sheet = tracking_process_sheet
+        messages = []
+        master_df = consolidator.extract_master_df(second, "diario.xlsx", progress_callback=messages.append)
+
+        assert processed == ["Febrero"]
+        assert any("Enero (sin cambios)" in message for message in messages)
+        pd.testing.assert_frame_equal(
+            master_df, ExcelConsolidator().extract_master_df(second, "diario.xlsx")
+        )
+        assert (master_df["Concepto"].str.contains("corregido")).sum() == 1
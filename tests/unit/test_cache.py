@@ -0,0 +1,85 @@
+import pytest
+import pandas as pd
+import shutil
+import tempfile
+from pathlib import Path
+import sys
+import os
+
+# Add parent directory to path to import the cache
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.cache import ResultCache, content_hash
+
+
+class TestResultCache:
+    def setup_method(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.master_df = pd.DataFrame({"Asiento": [1, 2], "Sheet_Origin": ["Enero", "Enero"]})
+
+    def teardown_method(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_content_hash_depends_on_bytes_and_settings(self):
+        """Test that the key changes with the input bytes and with the settings"""
+        key = content_hash(b"diario", {"header_search_rows": 100})
+        assert key == content_hash(b"diario", {"header_search_rows": 100})
+        assert key != content_hash(b"diario 2", {"header_search_rows": 100})
+        assert key != content_hash(b"diario", {"header_search_rows": None})
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        """Test the in-process LRU keeps only the most recently used entries"""
+        cache = ResultCache(max_entries=2)
+        cache.put("a", b"A", self.master_df)
+        cache.put("b", b"B", self.master_df)
+        cache.get("a")
+        cache.put("c", b"C", self.master_df)
+
+        assert cache.get("a")[0] == b"A"
+        assert cache.get("b") is None
+        assert cache.get("c")[0] == b"C"
+
+    def test_disk_tier_survives_new_instances(self):
+        """Test that results written to disk are found by a fresh cache"""
+        ResultCache(cache_dir=self.cache_dir).put("a", b"A", self.master_df)
+
+        output_bytes, master_df = ResultCache(cache_dir=self.cache_dir).get("a")
+        assert output_bytes == b"A"
+        pd.testing.assert_frame_equal(master_df, self.master_df)
+
+    def test_disk_tier_respects_size_cap(self):
+        """Test that the oldest disk entries are evicted past the size cap"""
+        cache = ResultCache(max_entries=1, cache_dir=self.cache_dir, max_disk_bytes=3000)
+        for key in ("a", "b", "c"):
+            cache.put(key, b"x" * 1000, self.master_df)
+            # Make sure the entries get distinct modification times
+            os.utime(self.cache_dir / key, (len(os.listdir(self.cache_dir)),) * 2)
+
+        remaining = sorted(p.name for p in self.cache_dir.iterdir())
+        assert "c" in remaining
+        assert "a" not in remaining
+
+    def test_memory_tier_is_capped_by_bytes(self):
+        """Test results past the memory budget are evicted or never kept in memory"""
+        size = 1000 + int(self.master_df.memory_usage(index=True, deep=True).sum())
+        cache = ResultCache(max_entries=8, max_memory_bytes=2 * size)
+        for key in ("a", "b", "c"):
+            cache.put(key, b"x" * 1000, self.master_df)
+        cache.put("big", b"x" * (3 * size), self.master_df)
+
+        assert cache.get("a") is None
+        assert cache.get("b") is not None and cache.get("c") is not None
+        assert cache.get("big") is None
+
+    def test_large_output_files_are_cached_on_disk_only(self):
+        """Test put_file copies a large output to disk without keeping it in memory"""
+        output_path = self.cache_dir / "salida.xlsx"
+        output_path.write_bytes(b"x" * 5000)
+        cache = ResultCache(cache_dir=self.cache_dir / "cache", max_memory_bytes=1000)
+        cache.put_file("a", output_path, self.master_df)
+
+        assert not cache._memory
+        copy_path = self.cache_dir / "copia.xlsx"
+        pd.testing.assert_frame_equal(cache.get_file("a", copy_path), self.master_df)
+        assert copy_path.read_bytes() == b"x" * 5000
+        assert cache.get_file("b", copy_path) is None
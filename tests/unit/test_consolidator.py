@@ -19,6 +19,11 @@ class TestExcelConsolidator:
         assert self.consolidator.input_file is None
         assert self.consolidator.output_file is None
 
+    def test_unknown_read_engine_is_rejected(self):
+        """Test that only the supported read engines are accepted"""
+        with pytest.raises(ValueError):
+            ExcelConsolidator(read_engine="xlrd")
+
     def test_find_header_row(self):
         """Test header row detection"""
         # Create a test dataframe with headers in row 2
@@ -65,4 +70,104 @@ class TestExcelConsolidator:
         df = pd.DataFrame(test_data)
 
         header_row = self.consolidator.find_header_row(df)
-        assert header_row == 0
\ No newline at end of file
+        assert header_row == 0
+
+    def test_frame_from_raw_uses_header_row(self):
+        """Test that the headered frame is sliced from the raw frame at the header row"""
+        test_data = [
+            ["Diario.", None, None],
+            ["Fecha", "Asiento", "Importe"],
+            ["2020-01-01", 1, 100.0],
+            [None, None, 50.0],
+        ]
+        df_raw = pd.DataFrame(test_data)
+
+        df = self.consolidator.frame_from_raw(df_raw, 1)
+        assert list(df.columns) == ["Fecha", "Asiento", "Importe"]
+        assert len(df) == 2
+        assert df["Importe"].tolist() == [100.0, 50.0]
+
+    def test_stream_valid_rows_filters_like_process_excel_file(self):
+        """Test forward fill, empty-row and total-row filtering in streaming mode"""
+        columns = ["Fecha", "Asiento", "Concepto", "Importe"]
+        layout = (0, columns, 0, 1, self.consolidator.resolve_columns(columns))
+        rows = [
+            ("2020-01-01", 1, "Factura", 100.0),
+            (None, None, "Pago", 100.0),
+            (None, None, None, None),
+            (None, None, "Total", 200.0),
+        ]
+
+        valid_rows = list(
+            self.consolidator._stream_valid_rows(iter(rows), layout, "Enero")
+        )
+        assert valid_rows == [
+            ["2020-01-01", 1, "Factura", 100.0],
+            ["2020-01-01", 1, "Pago", 100.0],
+        ]
+        assert self.consolidator.total_rows_dropped == {"Enero": 1}
+
+    def test_sheet_windows_carry_fecha_and_asiento_across_windows(self):
+        """Test continuation rows at the start of a window take the previous window's values"""
+        consolidator = ExcelConsolidator(chunk_rows=2)
+        columns = ["Fecha", "Asiento", "Concepto", "Importe"]
+        layout = (0, columns, 0, 1, consolidator.resolve_columns(columns))
+        rows = [
+            ("2020-01-01", 1, "Factura", 100.0),
+            ("2020-01-02", 2, "Factura", 50.0),
+            (None, None, None, None),
+            (None, None, "Pago", 50.0),
+            (None, None, "Suma y sigue", 150.0),
+            ("2020-01-03", None, "Cobro", 25.0),
+        ]
+
+        windows = list(consolidator._iter_sheet_windows(iter(rows), layout, "Enero"))
+        valid_rows = pd.concat(windows, ignore_index=True)
+        assert len(windows) == 3
+        assert valid_rows["Fecha"].tolist() == ["2020-01-01", "2020-01-02", "2020-01-02", "2020-01-03"]
+        assert valid_rows["Asiento"].tolist() == [1, 2, 2, 2]
+        assert valid_rows["Concepto"].tolist() == ["Factura", "Factura", "Pago", "Cobro"]
+        assert set(valid_rows["Sheet_Origin"]) == {"Enero"}
+        assert consolidator.total_rows_dropped == {"Enero": 1}
+
+    def test_invalid_chunk_rows_is_rejected(self):
+        """Test the chunk size must be a positive number of rows"""
+        with pytest.raises(ValueError):
+            ExcelConsolidator(chunk_rows=0)
+
+    def test_chunked_reading_only_applies_to_plain_xlsx_extraction(self):
+        """Test .xls input, raw sheets, a sheet store or workers fall back to whole sheets"""
+        xlsx_bytes = b"PK\x03\x04" + b"\x00" * 10
+        xls_bytes = b"\xd0\xcf\x11\xe0" + b"\x00" * 10
+
+        assert ExcelConsolidator(chunk_rows=10)._reads_in_chunks(xlsx_bytes, need_raw=False)
+        assert not ExcelConsolidator(chunk_rows=10)._reads_in_chunks(xls_bytes, need_raw=False)
+        assert not ExcelConsolidator(chunk_rows=10)._reads_in_chunks(xlsx_bytes, need_raw=True)
+        assert not ExcelConsolidator(chunk_rows=10, workers=2)._reads_in_chunks(xlsx_bytes, need_raw=False)
+        assert not ExcelConsolidator(chunk_rows=10, sheet_store={})._reads_in_chunks(xlsx_bytes, need_raw=False)
+        assert not ExcelConsolidator()._reads_in_chunks(xlsx_bytes, need_raw=False)
+
+    def test_filter_total_rows(self):
+        """Test total rows are dropped case-insensitively and counted"""
+        df = pd.DataFrame({
+            "Concepto": ["Factura 1", "SUMA y sigue", "Pago"],
+            "Cuenta": ["4000", "4000", "Totales"],
+            "Importe": [100.0, 100.0, 50.0],
+        })
+
+        filtered, dropped = self.consolidator.filter_total_rows(df)
+        assert filtered["Concepto"].tolist() == ["Factura 1"]
+        assert dropped == 2
+
+    def test_filter_total_rows_custom_keywords_and_columns(self):
+        """Test configurable keywords and restricting the check to given columns"""
+        consolidator = ExcelConsolidator(total_keywords=["saldo"], total_columns=["Concepto"])
+        df = pd.DataFrame({
+            "Concepto": ["Saldo anterior", "Total", "Pago"],
+            "Cuenta": ["4000", "4000", "Saldo"],
+        })
+
+        filtered, dropped = consolidator.filter_total_rows(df)
+        assert filtered["Concepto"].tolist() == ["Total", "Pago"]
+        assert dropped == 1
+
@@ -0,0 +1,87 @@
+import shutil
+import sqlite3
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# Add parent directory to path to import the database export
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.database import _index_columns, write_master_db
+
+
+def master(sheet, asientos, cuenta="57200001"):
+    return pd.DataFrame({
+        "Fecha": pd.to_datetime(["2020-01-31"] * len(asientos)),
+        "Asiento": pd.array(asientos, dtype="Int32"),
+        "Cuenta": [cuenta] * len(asientos),
+        "Importe debe": [10.0] * len(asientos),
+        "Importe haber": [None] * len(asientos),
+        "Sheet_Origin": pd.Categorical([sheet] * len(asientos)),
+    })
+
+
+class TestWriteMasterDb:
+    def setup_method(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.db_path = self.temp_dir / "diarios.db"
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def query(self, sql):
+        with sqlite3.connect(self.db_path) as connection:
+            return connection.execute(sql).fetchall()
+
+    def test_rows_are_stored_with_iso_dates_and_nulls(self):
+        """Test values keep their types, Fecha as ISO text and gaps as NULL"""
+        loaded = write_master_db(master("Enero", [1, 2]), self.db_path, "EMPRESA_1.xlsx", batch_size=1)
+
+        assert loaded == {("EMPRESA_1.xlsx", "Enero"): 2}
+        assert self.query("SELECT Fecha, Asiento, \"Importe debe\", \"Importe haber\", File_Origin FROM master") == [
+            ("2020-01-31", 1, 10.0, None, "EMPRESA_1.xlsx"),
+            ("2020-01-31", 2, 10.0, None, "EMPRESA_1.xlsx"),
+        ]
+        indexes = {row[0] for row in self.query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {
+            "master_fecha_idx", "master_asiento_idx", "master_cuenta_idx", "master_sheet_origin_idx",
+        } <= indexes
+
+    def test_reloading_a_sheet_replaces_only_its_rows(self):
+        """Test a load upserts the file's sheets and keeps other sheets and files"""
+        write_master_db(
+            pd.concat([master("Enero", [1, 2]), master("Febrero", [3])], ignore_index=True),
+            self.db_path, "EMPRESA_1.xlsx",
+        )
+        write_master_db(master("Enero", [1]), self.db_path, "EMPRESA_2.xlsx")
+        write_master_db(master("Enero", [5, 6, 7]), self.db_path, "EMPRESA_1.xlsx")
+
+        assert self.query(
+            "SELECT File_Origin, Sheet_Origin, COUNT(*) FROM master GROUP BY 1, 2 ORDER BY 1, 2"
+        ) == [("EMPRESA_1.xlsx", "Enero", 3), ("EMPRESA_1.xlsx", "Febrero", 1), ("EMPRESA_2.xlsx", "Enero", 1)]
+        assert self.query("SELECT File_Origin, Sheet_Origin, rows FROM sheets ORDER BY 1, 2") == [
+            ("EMPRESA_1.xlsx", "Enero", 3), ("EMPRESA_1.xlsx", "Febrero", 1), ("EMPRESA_2.xlsx", "Enero", 1),
+        ]
+
+    def test_new_columns_are_added_to_the_table(self):
+        """Test a file with an extra column (a Sage export with Contrapartida after A3 ones) can be loaded"""
+        write_master_db(master("Enero", [1]), self.db_path, "A3.xlsx")
+        sage_df = master("Enero", [1]).assign(Contrapartida="43000001")
+        write_master_db(sage_df, self.db_path, "SAGE.xlsx")
+
+        assert self.query("SELECT File_Origin, Cuenta, Contrapartida FROM master ORDER BY 1") == [
+            ("A3.xlsx", "57200001", None), ("SAGE.xlsx", "57200001", "43000001"),
+        ]
+
+    def test_indexes_follow_the_resolved_columns(self):
+        """Test Sage column names are indexed by role and non-text column names are skipped"""
+        sage_df = master("Enero", [1]).rename(columns={"Asiento": "Asto.", "Cuenta": "Subcuenta"})
+        sage_df[2020] = "extra"
+        write_master_db(sage_df, self.db_path, "SAGE.xlsx")
+
+        indexes = {row[0] for row in self.query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"master_fecha_idx", "master_asto__idx", "master_subcuenta_idx", "master_sheet_origin_idx"} <= indexes
+        assert _index_columns([2020, "Asto."]) == ["Asto.", "Sheet_Origin"]
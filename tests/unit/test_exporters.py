@@ -0,0 +1,83 @@
+import pytest
+import pandas as pd
+import io
+import sys
+import os
+
+# Add parent directory to path to import the exporters
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.exporters import compact_master_dtypes, normalize_master_dtypes, write_master
+
+
+class TestExporters:
+    def setup_method(self):
+        self.master_df = pd.DataFrame({
+            "Fecha": [pd.Timestamp("2020-01-01"), pd.Timestamp("2020-01-01"), "2020-02-03"],
+            "Asiento": [1.0, 1.0, 2.0],
+            "Documento": ["Apertura", 2, None],
+            "Importe debe": [100, "0", 50.5],
+            "Importe haber": [0.0, 100.0, None],
+            "Sheet_Origin": ["Enero", "Enero", "Febrero"],
+        }).astype({"Fecha": "object", "Importe debe": "object"})
+
+    def test_normalize_master_dtypes(self):
+        """Test Fecha, Asiento, amounts and mixed text columns get normalized dtypes"""
+        df = normalize_master_dtypes(self.master_df)
+
+        assert pd.api.types.is_datetime64_any_dtype(df["Fecha"])
+        assert str(df["Asiento"].dtype) == "Int64"
+        assert df["Importe debe"].dtype == "float64"
+        assert df["Importe haber"].dtype == "float64"
+        assert df["Documento"].tolist()[:2] == ["Apertura", "2"]
+        assert pd.isna(df["Documento"].iloc[2])
+        assert self.master_df["Asiento"].dtype == "float64", "The input frame is not modified"
+
+    def test_compact_master_dtypes_keeps_values(self):
+        """Test compact dtypes never change a value: text dates and amounts stay as they are"""
+        master_df = pd.DataFrame({
+            "Fecha": [pd.Timestamp("2020-01-01")] * 4,
+            "Asiento": [1.0, 1.0, 2.0, None],
+            "Apunte": [1.0, 2.0, 3.0, 4.0],
+            "Cuenta": [40000000.0, 57200001.0, 40000000.0, 40000000.0],
+            "Importe debe": [100, "0", 50.5, None],
+            "Sheet_Origin": ["Febrero", "Febrero", "Enero", "Enero"],
+        }).astype({"Importe debe": "object"})
+        df = compact_master_dtypes(master_df)
+
+        assert str(df["Asiento"].dtype) == "Int8"
+        assert str(df["Apunte"].dtype) == "Int8"
+        assert df["Cuenta"].dtype == "category"
+        assert list(df["Sheet_Origin"].cat.categories) == ["Febrero", "Enero"], "Order of appearance"
+        assert df["Importe debe"].dtype == "object", "Text amounts are not coerced"
+        assert df["Importe debe"].tolist() == master_df["Importe debe"].tolist()
+        assert df["Asiento"].astype("float64").equals(master_df["Asiento"])
+
+        df = compact_master_dtypes(self.master_df)
+        assert df["Fecha"].dtype == "object", "Text dates are not coerced"
+
+    def test_write_master_csv_in_chunks(self):
+        """Test chunked CSV output writes the header once and every row"""
+        output = io.BytesIO()
+        write_master(self.master_df, output, "csv", chunk_size=2)
+        output.seek(0)
+
+        reloaded = pd.read_csv(output)
+        assert list(reloaded.columns) == list(self.master_df.columns)
+        assert len(reloaded) == len(self.master_df)
+
+    def test_write_master_parquet_roundtrip(self):
+        """Test Parquet output keeps the normalized dtypes"""
+        pytest.importorskip("pyarrow")
+        output = io.BytesIO()
+        write_master(self.master_df, output, "parquet")
+        output.seek(0)
+
+        reloaded = pd.read_parquet(output)
+        assert str(reloaded["Asiento"].dtype) == "Int64"
+        assert pd.api.types.is_datetime64_any_dtype(reloaded["Fecha"])
+
+    def test_write_master_unknown_format(self):
+        """Test that an unknown output format is rejected"""
+        with pytest.raises(ValueError):
+            write_master(self.master_df, io.BytesIO(), "xml")
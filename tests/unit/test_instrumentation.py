@@ -0,0 +1,55 @@
+import json
+import pickle
+import sys
+import os
+
+# Add parent directory to path to import the instrumentation
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.instrumentation import EVENT_FIELDS, Instrumentation
+
+
+class TestInstrumentation:
+    def setup_method(self):
+        self.received = []
+        self.instrumentation = Instrumentation(callback=self.received.append)
+
+    def test_stage_records_event_fields(self):
+        """Test a stage records rows, elapsed time and memory delta and calls back"""
+        with self.instrumentation.stage("filters", "Enero", rows_in=10) as event:
+            event["rows_out"] = 7
+
+        assert len(self.instrumentation.events) == 1
+        event = self.instrumentation.events[0]
+        assert set(event) == set(EVENT_FIELDS)
+        assert (event["stage"], event["sheet"], event["rows_in"], event["rows_out"]) == ("filters", "Enero", 10, 7)
+        assert event["elapsed_ms"] >= 0
+        assert self.received == [event]
+
+    def test_drain_and_pickle_start_empty(self):
+        """Test drain empties the events and a pickled copy has no events nor callback"""
+        with self.instrumentation.stage("parse", "Enero"):
+            pass
+
+        copy = pickle.loads(pickle.dumps(self.instrumentation))
+        assert copy.events == [] and copy.callback is None
+        assert len(self.instrumentation.drain()) == 1
+        assert self.instrumentation.events == []
+
+    def test_exports_and_sheet_breakdown(self):
+        """Test the JSON/CSV exports and the per-sheet breakdown"""
+        for stage, sheet, ms in [("parse", "Enero", 5.0), ("header", "Enero", 1.0),
+                                 ("parse", "Febrero", 3.0), ("concat", None, 2.0)]:
+            self.instrumentation.record({
+                "stage": stage, "sheet": sheet, "rows_in": None, "rows_out": None,
+                "elapsed_ms": ms, "rss_delta_mb": 0.0,
+            })
+
+        assert json.loads(self.instrumentation.to_json()) == self.instrumentation.events
+        assert self.instrumentation.to_csv().splitlines()[0] == ",".join(EVENT_FIELDS)
+
+        breakdown = self.instrumentation.sheet_breakdown()
+        assert list(breakdown.index) == ["Enero", "Febrero", "(libro)"]
+        assert list(breakdown.columns) == ["parse", "header", "concat", "total"]
+        assert breakdown.loc["Enero", "total"] == 6.0
+        assert breakdown.loc["(libro)", "concat"] == 2.0
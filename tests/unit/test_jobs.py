@@ -0,0 +1,112 @@
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path to import the job queue
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+def wait_until_finished(queue, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobQueue:
+    def setup_method(self):
+        self.queue = JobQueue(max_workers=1)
+
+    def teardown_method(self):
+        self.queue.shutdown()
+
+    def test_job_reports_progress_and_result(self):
+        """Test a job receives its bytes and arguments and keeps messages and result"""
+        def task(input_bytes, suffix, progress_callback=None):
+            progress_callback("Procesando hoja: **Enero**")
+            return input_bytes + suffix
+
+        job_id = self.queue.submit("diario.xlsx", b"datos", task, b"!")
+        job = wait_until_finished(self.queue, job_id)
+
+        assert job["status"] == DONE
+        assert job["result"] == b"datos!"
+        assert job["messages"] == ["Procesando hoja: **Enero**"]
+        assert job["finished_at"] is not None
+
+    def test_failed_job_keeps_error(self):
+        """Test an exception in the task marks the job as failed"""
+        def task(input_bytes, progress_callback=None):
+            raise ValueError("archivo dañado")
+
+        job = wait_until_finished(self.queue, self.queue.submit("x.xlsx", b"", task))
+
+        assert job["status"] == FAILED
+        assert job["error"] == "archivo dañado"
+
+    def test_jobs_wait_for_a_free_worker(self):
+        """Test jobs beyond max_workers stay queued while another one runs"""
+        release = threading.Event()
+
+        def blocking_task(input_bytes, progress_callback=None):
+            release.wait(5)
+            return input_bytes
+
+        first = self.queue.submit("a.xlsx", b"a", blocking_task)
+        second = self.queue.submit("b.xlsx", b"b", blocking_task)
+        deadline = time.time() + 5
+        while self.queue.get(first)["status"] != RUNNING and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert self.queue.get(second)["status"] == QUEUED
+        release.set()
+        assert wait_until_finished(self.queue, first)["result"] == b"a"
+        assert wait_until_finished(self.queue, second)["result"] == b"b"
+
+    def test_finished_jobs_are_pruned_and_discarded(self):
+        """Test only the newest max_finished results are kept and discard forgets a job"""
+        queue = JobQueue(max_workers=1, max_finished=1)
+        try:
+            def task(input_bytes, progress_callback=None):
+                return input_bytes
+
+            first = queue.submit("a.xlsx", b"a", task)
+            wait_until_finished(queue, first)
+            second = queue.submit("b.xlsx", b"b", task)
+            wait_until_finished(queue, second)
+            third = queue.submit("c.xlsx", b"c", task)
+            wait_until_finished(queue, third)
+
+            # Pruning runs on submit: only the newest finished job before "c" is kept
+            assert queue.get(first) is None
+            assert queue.get(second)["result"] == b"b"
+            queue.discard(second)
+            assert queue.get(second) is None
+            assert queue.get(third)["result"] == b"c"
+        finally:
+            queue.shutdown()
+
+    def test_cleanup_runs_for_discarded_results(self):
+        """Test the cleanup hook receives the result of discarded and shut down jobs"""
+        cleaned = []
+        queue = JobQueue(max_workers=1, cleanup=cleaned.append)
+
+        def task(input_bytes, progress_callback=None):
+            return input_bytes
+
+        first = queue.submit("a.xlsx", b"a", task)
+        wait_until_finished(queue, first)
+        second = queue.submit("b.xlsx", b"b", task)
+        wait_until_finished(queue, second)
+
+        queue.discard(first)
+        assert cleaned == [b"a"]
+        queue.shutdown()
+        assert cleaned == [b"a", b"b"]
+
@@ -0,0 +1,40 @@
+import socket
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add parent directory to path to import the launcher
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from launcher import wait_for_server
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == "/_stcore/health" else 404)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWaitForServer:
+    def test_returns_once_the_health_endpoint_answers(self):
+        """Test the readiness probe succeeds as soon as the server is up"""
+        server = HTTPServer(("localhost", 0), _HealthHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            assert wait_for_server("localhost", server.server_address[1], timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_gives_up_after_the_timeout(self):
+        """Test the readiness probe stops waiting when nothing listens on the port"""
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            port = sock.getsockname()[1]
+        assert not wait_for_server("localhost", port, timeout=0.3)
@@ -0,0 +1,69 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import preview
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.preview import MasterIndex
+
+
+class TestMasterIndex:
+    def setup_method(self):
+        self.master_df = pd.DataFrame({
+            "Fecha": pd.to_datetime([
+                "2020-01-15", "2020-01-15", "2020-02-03", "2020-02-03", "2020-01-20", "2020-03-01",
+            ]),
+            "Asiento": pd.array([3, 3, 10, 10, 4, None], dtype="Int16"),
+            "Cuenta": pd.Categorical([57200001, 40000006, 57200033, 62900012, 57200001, 10000000]),
+            "Descripción de la cuenta": ["BANCO", "LINKEDIN", "CAJA", "OTROS", "BANCO", "CAPITAL"],
+            "Sheet_Origin": pd.Categorical(["Enero", "Enero", "Febrero", "Febrero", "Enero", "Marzo"]),
+        })
+        self.index = MasterIndex(self.master_df)
+
+    def test_columns_are_found_by_name(self):
+        """Test the account column is the code, not its description"""
+        assert self.index.fecha_col == "Fecha"
+        assert self.index.asiento_col == "Asiento"
+        assert self.index.account_col == "Cuenta"
+        assert self.index.sheets == ["Enero", "Febrero", "Marzo"]
+        assert self.index.fecha_bounds == (pd.Timestamp("2020-01-15"), pd.Timestamp("2020-03-01"))
+
+    def test_no_filter_returns_every_row_in_order(self):
+        """Test an empty filter keeps every row in master_df order"""
+        assert self.index.filter().tolist() == [0, 1, 2, 3, 4, 5]
+
+    def test_fecha_range_includes_the_whole_last_day(self):
+        """Test the Fecha range is inclusive on both dates"""
+        assert self.index.filter(fecha_from="2020-01-16", fecha_to="2020-02-03").tolist() == [2, 3, 4]
+        assert self.index.filter(fecha_to="2020-01-15").tolist() == [0, 1]
+
+    def test_asiento_range_skips_missing_values(self):
+        """Test Asiento bounds are inclusive and rows without Asiento never match"""
+        assert self.index.filter(asiento_from=4).tolist() == [2, 3, 4]
+        assert self.index.filter(asiento_from=3, asiento_to=3).tolist() == [0, 1]
+
+    def test_account_prefix_and_sheets(self):
+        """Test the account code prefix and the Sheet_Origin filter"""
+        assert self.index.filter(account="572").tolist() == [0, 2, 4]
+        assert self.index.filter(account="57200001").tolist() == [0, 4]
+        assert self.index.filter(sheets=["Febrero", "Marzo"]).tolist() == [2, 3, 5]
+
+    def test_filters_are_combined(self):
+        """Test every given filter must match"""
+        positions = self.index.filter(account="572", sheets=["Enero"], fecha_from="2020-01-16")
+        assert positions.tolist() == [4]
+        assert self.index.filter(account="9").tolist() == []
+
+    def test_page_returns_only_the_requested_rows(self):
+        """Test a page keeps the master_df index of its rows"""
+        positions = self.index.filter(account="572")
+        assert self.index.page(positions, 0, 2).index.tolist() == [0, 2]
+        assert self.index.page(positions, 1, 2).index.tolist() == [4]
+
+    def test_float_account_codes_match_without_decimals(self):
+        """Test accounts read as floats are searched by their integer code"""
+        index = MasterIndex(pd.DataFrame({"Cuenta": [57200001.0, np.nan, 40000006.0]}))
+        assert index.filter(account="5720").tolist() == [0]
+        assert index.fecha_bounds == (None, None)
@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import profiles
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.profiles import A3_PROFILE, SAGE_PROFILE, ColumnProfile, best_profile, get_profiles, parse_amounts
+
+A3_HEADER = [
+    "Fecha", "Asiento", "Apunte", "Concepto", "Documento", "Cuenta",
+    "Descripción de la cuenta", "Importe debe", "Importe haber",
+]
+SAGE_HEADER = ["Asto.", "Fecha", "Subcuenta", "Título subcuenta", "Concepto", "Debe", "Haber"]
+
+
+class TestColumnProfiles:
+    def test_resolve_takes_the_first_match_and_one_role_per_column(self):
+        """Test every role maps to the first matching column and no column is reused"""
+        mapping = A3_PROFILE.resolve(A3_HEADER + ["Fecha valor"])
+        assert mapping.fecha_col == "Fecha"
+        assert mapping.asiento_col == "Asiento"
+        assert mapping.get("descripcion") == "Descripción de la cuenta"
+        assert mapping.get("cuenta") == "Cuenta"
+        assert mapping.complete
+
+    def test_best_profile_fits_the_header(self):
+        """Test auto detection picks A3 for A3 headers and Sage for ContaPlus headers"""
+        profiles = get_profiles("auto")
+        assert best_profile(profiles, A3_HEADER) is A3_PROFILE
+        assert best_profile(profiles, SAGE_HEADER) is SAGE_PROFILE
+        assert best_profile(profiles, ["Fecha", "Cuenta", "Debe"]) is None
+
+    def test_auto_keeps_plain_debe_haber_headers_on_a3(self):
+        """Test Sage is only detected with one of its own columns, not by Debe/Haber alone"""
+        profiles = get_profiles("auto")
+        assert best_profile(profiles, ["Fecha", "Asiento", "Concepto", "Debe", "Haber"]) is A3_PROFILE
+        assert best_profile(profiles, ["Fecha", "Asiento", "Subcuenta", "Debe", "Haber"]) is SAGE_PROFILE
+        assert best_profile([SAGE_PROFILE], ["Fecha", "Asiento", "Debe", "Haber"]) is SAGE_PROFILE
+
+    def test_header_detection(self):
+        """Test header rows are recognized with each profile's synonyms"""
+        assert A3_PROFILE.is_header(A3_HEADER)
+        assert not A3_PROFILE.is_header(SAGE_HEADER)
+        assert SAGE_PROFILE.is_header(SAGE_HEADER)
+        assert not SAGE_PROFILE.is_header(["Fecha: 21/12/2024", None, "Gastos"])
+
+    def test_sage_dtypes_and_total_columns(self):
+        """Test Sage text dates and decimal-comma amounts are converted"""
+        df = pd.DataFrame({
+            "Asto.": ["12", "12"],
+            "Fecha": ["31/01/2020", "31/01/2020"],
+            "Subcuenta": ["4300001", "7000000"],
+            "Concepto": ["Factura 1", "Factura 1"],
+            "Debe": ["1.234,56", None],
+            "Haber": [None, "1.234,56"],
+        })
+        mapping = SAGE_PROFILE.resolve(df.columns)
+        SAGE_PROFILE.convert_dtypes(df, mapping)
+        assert df["Fecha"].tolist() == [pd.Timestamp("2020-01-31")] * 2
+        assert df["Asto."].tolist() == [12, 12]
+        assert df["Debe"].fillna(0).tolist() == [1234.56, 0.0]
+        assert mapping.total_columns == ["Concepto", "Subcuenta"]
+
+    def test_values_that_do_not_convert_are_kept(self):
+        """Test text that is no number or date is kept as read instead of becoming missing"""
+        df = pd.DataFrame({
+            "Asto.": ["A-001", "12"],
+            "Fecha": ["31/01/2020", "pendiente"],
+            "Debe": ["1,000.50", "10,5"],
+            "Haber": [None, None],
+        })
+        mapping = SAGE_PROFILE.resolve(df.columns)
+        SAGE_PROFILE.convert_dtypes(df, mapping)
+        assert df["Asto."].tolist() == ["A-001", 12]
+        assert df["Fecha"].tolist() == [pd.Timestamp("2020-01-31"), "pendiente"]
+        assert df["Debe"].tolist() == ["1,000.50", 10.5]
+        assert df["Haber"].isna().all()
+        converters = dict(SAGE_PROFILE.row_converters(list(df.columns), mapping))
+        assert converters[0]("A-001") == "A-001"
+        assert converters[1]("pendiente") == "pendiente"
+        assert converters[2]("1,000.50") == "1,000.50"
+
+    def test_parse_amounts_keeps_numbers(self):
+        """Test numeric cells and dot-decimal text are read unchanged"""
+        values = pd.Series([10.5, "3,5", "-1.000,25", "7.25", None], dtype=object)
+        assert parse_amounts(values).fillna(0).tolist() == [10.5, 3.5, -1000.25, 7.25, 0.0]
+
+    def test_invalid_profiles_are_rejected(self):
+        """Test profiles must define fecha/asiento and use known dtypes"""
+        with pytest.raises(ValueError):
+            ColumnProfile("x", "X", {"fecha": "fecha"})
+        with pytest.raises(ValueError):
+            ColumnProfile("x", "X", {"fecha": "fecha", "asiento": "asiento"}, dtypes={"fecha": "str"})
+        with pytest.raises(ValueError):
+            get_profiles("holded")
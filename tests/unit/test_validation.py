@@ -0,0 +1,81 @@
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path to import validation
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.validation import sheet_month, validate_master
+
+
+class TestValidateMaster:
+    def setup_method(self):
+        self.master_df = pd.DataFrame({
+            "Fecha": pd.to_datetime([
+                "2020-01-02", "2020-01-02", "2020-01-20", "2020-01-20",
+                "2020-02-03", "2020-02-03", "2020-03-01", "2020-02-10", "2020-02-10",
+            ]),
+            "Asiento": [1, 1, 2, 2, 3, 3, 3, 2, 2],
+            "Importe debe": [100.0, 0.0, 50.0, 0.0, 10.0, 0.0, 0.0, 50.0, 0.0],
+            "Importe haber": [0.0, 100.0, 0.0, 50.0, 0.0, 7.5, 2.0, 0.0, 50.0],
+            "Sheet_Origin": pd.Categorical(
+                ["Enero", "Enero", "Enero", "Enero", "Febrero", "Febrero", "Febrero", "Febrero", "Febrero"]
+            ),
+        })
+
+    def test_unbalanced_asientos(self):
+        """Test asientos whose Debe and Haber totals differ are reported with their sheets"""
+        report = validate_master(self.master_df)
+        assert report.asientos == 3
+        assert report.unbalanced.to_dict("records") == [
+            {"Asiento": 3, "Debe": 10.0, "Haber": 9.5, "Diferencia": 0.5, "Hojas": "Febrero"}
+        ]
+
+    def test_cross_sheet_duplicates(self):
+        """Test an asiento found in two sheets is reported once, with every row counted"""
+        report = validate_master(self.master_df)
+        assert report.cross_sheet.to_dict("records") == [
+            {"Asiento": 2, "Hojas": "Enero, Febrero", "Filas": 4}
+        ]
+
+    def test_date_sheet_mismatches(self):
+        """Test rows dated outside the month of their sheet are reported with their MASTER row"""
+        report = validate_master(self.master_df)
+        assert report.date_mismatches[["Fila", "Hoja", "Asiento", "Mes de la hoja"]].to_dict("records") == [
+            {"Fila": 8, "Hoja": "Febrero", "Asiento": 3, "Mes de la hoja": "febrero"}
+        ]
+        assert not report.ok
+
+    def test_rounding_noise_is_not_unbalanced(self):
+        """Test differences below half a cent are accepted"""
+        master_df = pd.DataFrame({
+            "Asiento": [1, 1, 1],
+            "Debe": [0.1, 0.2, 0.0],
+            "Haber": [0.0, 0.0, 0.3],
+        })
+        report = validate_master(master_df)
+        assert report.unbalanced.empty
+        assert report.skipped == ["cross_sheet", "dates"]
+
+    def test_skipped_checks_are_not_ok(self):
+        """Test a report whose checks could not run is not reported as passing"""
+        master_df = pd.DataFrame({"Número": [1, 1], "Debe": [5.0, 0.0], "Haber": [0.0, 5.0]})
+        report = validate_master(master_df)
+        assert report.skipped == ["balance", "cross_sheet", "dates"]
+        assert report.unbalanced.empty and report.cross_sheet.empty and report.date_mismatches.empty
+        assert not report.ok
+        assert len(report.skipped_labels()) == 3
+
+    def test_sheet_month(self):
+        """Test sheet names are mapped to months by their Spanish name or abbreviation"""
+        assert sheet_month("Enero") == 1
+        assert sheet_month("02-FEB 2020") == 2
+        assert sheet_month("Setiembre") == 9
+        assert sheet_month("Diario") is None
+        assert sheet_month("Hoja1") is None
+        assert sheet_month("Marzo2020") == 3
+        assert sheet_month("Sept.") == 9
+        assert sheet_month("Mayor") is None
+        assert sheet_month("Juntas") is None
+        assert sheet_month("Sumas y saldos") is None
+        assert sheet_month("Mayor de Enero") == 1
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to import the worker pool
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.worker_pool import WorkerPool
+
+# Tasks and the initializer run in the spawned workers, so they are module-level
+_initialized = 0
+
+
+def count_initialization():
+    global _initialized
+    _initialized += 1
+
+
+def worker_state(progress_callback=None):
+    return os.getpid(), _initialized
+
+
+def report_steps(steps, progress_callback=None):
+    for step in range(steps):
+        progress_callback(f"Paso {step}")
+    return steps
+
+
+def fail(message, progress_callback=None):
+    progress_callback("Antes del error")
+    raise ValueError(message)
+
+
+class TestWorkerPool:
+    def setup_method(self):
+        self.pool = WorkerPool(max_workers=1, initializer=count_initialization)
+
+    def teardown_method(self):
+        self.pool.shutdown()
+
+    def test_tasks_reuse_one_warm_worker(self):
+        """Test tasks run outside the caller in a worker initialized only once"""
+        first_pid, first_count = self.pool.run(worker_state)
+        second_pid, second_count = self.pool.run(worker_state)
+
+        assert first_pid != os.getpid()
+        assert second_pid == first_pid
+        assert first_count == second_count == 1
+
+    def test_progress_arrives_in_order_before_the_result(self):
+        """Test every progress message reaches the callback before run returns"""
+        messages = []
+
+        assert self.pool.run(report_steps, 50, progress_callback=messages.append) == 50
+        assert messages == [f"Paso {step}" for step in range(50)]
+
+    def test_task_errors_are_raised_in_the_caller(self):
+        """Test a failing task raises its exception after sending its messages"""
+        messages = []
+
+        with pytest.raises(ValueError, match="hoja rota"):
+            self.pool.run(fail, "hoja rota", progress_callback=messages.append)
+        assert messages == ["Antes del error"]
+        # The worker keeps serving the next tasks
+        assert self.pool.run(report_steps, 1) == 1
@@ -0,0 +1,123 @@
+import pytest
+import pandas as pd
+import numpy as np
+import datetime
+import io
+import sys
+import os
+import zipfile
+
+import openpyxl
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, MAC_EPOCH
+
+# Add parent directory to path to import the package writer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app import xlsx_package
+from app.xlsx_package import _cell_xml, insert_master_sheet, raw_copy_supported, unique_sheet_name
+
+
+class TestCellXml:
+    def test_missing_values_are_empty_cells(self):
+        """Test None, NaN, NaT and pd.NA produce no cell"""
+        for value in (None, np.nan, pd.NaT, pd.NA):
+            assert _cell_xml("A1", value, 5) == ""
+
+    def test_text_is_escaped_inline(self):
+        """Test strings are written inline with XML escaping and no control characters"""
+        xml = _cell_xml("B2", "Pago <A&B>\x01", 5)
+        assert xml == '<c r="B2" t="inlineStr"><is><t>Pago &lt;A&amp;B&gt;</t></is></c>'
+
+    def test_numbers_and_dates(self):
+        """Test numbers keep their value and dates use the datetime style"""
+        assert _cell_xml("C3", 122.45, 5) == '<c r="C3"><v>122.45</v></c>'
+        assert _cell_xml("C3", np.int64(7), 5) == '<c r="C3"><v>7</v></c>'
+        assert _cell_xml("D4", pd.Timestamp("2020-01-01"), 5) == '<c r="D4" s="5"><v>43831.0</v></c>'
+        assert _cell_xml("D4", datetime.datetime(2020, 1, 1, 12), 5) == '<c r="D4" s="5"><v>43831.5</v></c>'
+        assert _cell_xml("D4", pd.Timestamp("2020-01-01"), 5, MAC_EPOCH) == '<c r="D4" s="5"><v>42369.0</v></c>'
+
+
+class TestInsertMasterSheet:
+    def setup_method(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.title = "Master"
+        workbook.active.append(["Hoja", "del cliente"])
+        workbook.create_sheet("Enero").append(["Fecha", "Asiento"])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        self.file_bytes = buffer.getvalue()
+        self.master_df = pd.DataFrame({"Asiento": [1, 2], "Sheet_Origin": ["Enero", "Enero"]})
+
+    def test_existing_master_sheet_gets_a_unique_name(self):
+        """Test the new sheet does not repeat a sheet name, which Excel rejects"""
+        assert unique_sheet_name("MASTER", ["Enero"]) == "MASTER"
+        assert unique_sheet_name("MASTER", ["master", "MASTER1", "Enero"]) == "MASTER2"
+
+        output = io.BytesIO()
+        assert insert_master_sheet(self.file_bytes, self.master_df, output) == "MASTER1"
+
+        workbook = openpyxl.load_workbook(output)
+        assert workbook.sheetnames == ["MASTER1", "Master", "Enero"]
+        assert workbook["Master"]["A1"].value == "Hoja"
+        assert workbook["MASTER1"]["A2"].value == 1
+
+    def test_original_parts_are_copied_compressed(self):
+        """Test untouched parts keep their compressed bytes, CRC and sizes"""
+        output = io.BytesIO()
+        insert_master_sheet(self.file_bytes, self.master_df, output)
+
+        with zipfile.ZipFile(io.BytesIO(self.file_bytes)) as original, zipfile.ZipFile(output) as result:
+            assert result.testzip() is None
+            for info in original.infolist():
+                if not info.filename.startswith("xl/worksheets/"):
+                    continue
+                copied = result.getinfo(info.filename)
+                assert (copied.CRC, copied.compress_size, copied.file_size) == \
+                    (info.CRC, info.compress_size, info.file_size)
+                assert result.read(info.filename) == original.read(info.filename)
+
+    @pytest.mark.parametrize("raw_copy", [True, False])
+    def test_raw_and_public_copies_give_the_same_package(self, raw_copy):
+        """Test the compressed copy and the public ZipFile fallback write the same parts"""
+        output = io.BytesIO()
+        insert_master_sheet(self.file_bytes, self.master_df, output, raw_copy=raw_copy)
+
+        with zipfile.ZipFile(io.BytesIO(self.file_bytes)) as original, zipfile.ZipFile(output) as result:
+            assert result.testzip() is None
+            for info in original.infolist():
+                if info.filename.startswith("xl/worksheets/"):
+                    assert result.read(info.filename) == original.read(info.filename)
+        workbook = openpyxl.load_workbook(output)
+        assert workbook.sheetnames == ["MASTER1", "Master", "Enero"]
+        assert [cell.value for cell in workbook["MASTER1"]["A"]] == ["Asiento", 1, 2]
+
+    def test_raw_copy_needs_the_zipfile_internals(self, monkeypatch):
+        """Test a zipfile without the internals the raw copy writes to falls back to the public API"""
+        with zipfile.ZipFile(io.BytesIO(), "w") as zout:
+            assert raw_copy_supported(zout)
+            monkeypatch.setattr(xlsx_package, "_ZIPFILE_WRITE_STATE", ("_renamed_in_a_future_release",))
+            assert not raw_copy_supported(zout)
+
+        output = io.BytesIO()
+        insert_master_sheet(self.file_bytes, self.master_df, output)
+        with zipfile.ZipFile(output) as result:
+            assert result.testzip() is None
+
+    def test_dates_follow_the_1904_date_system(self):
+        """Test MASTER dates of a 1904-based workbook are not shifted by 1462 days"""
+        workbook = openpyxl.Workbook()
+        workbook.epoch = CALENDAR_MAC_1904
+        workbook.active.title = "Enero"
+        workbook.active.append(["Fecha", "Asiento"])
+        workbook.active.append([datetime.datetime(2020, 1, 31), 1])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        master_df = pd.DataFrame({"Fecha": [pd.Timestamp("2020-01-31")], "Asiento": [1]})
+
+        output = io.BytesIO()
+        insert_master_sheet(buffer.getvalue(), master_df, output)
+
+        result = openpyxl.load_workbook(output)
+        assert result.epoch == CALENDAR_MAC_1904
+        assert result["MASTER"]["A2"].value == datetime.datetime(2020, 1, 31)
+        assert result["Enero"]["A2"].value == datetime.datetime(2020, 1, 31)